@@ -11,15 +11,24 @@ from audio_api.cores.config import settings
 from audio_api.cores.redis import get_redis_client
 from audio_api.services.upload_flow import UploadFlowService
 from shared_messaging.producer import RabbitMQProducer
+from shared_storage.factory import create_s3_client
 from shared_storage.s3 import S3Client
 
+_S3: S3Client | None = None
+
+
 def get_s3_client() -> S3Client:
-    return S3Client(
-        bucket=settings.S3_BUCKET_NAME,
-        endpoint=settings.S3_ENDPOINT,
-        access_key=settings.S3_ACCESS_KEY,
-        secret_key=settings.S3_SECRET_KEY
-    )
+    # One client per process so the connection pool is reused across requests.
+    global _S3
+    if _S3 is None:
+        _S3 = create_s3_client(
+            settings.S3_BACKEND,
+            bucket=settings.S3_BUCKET_NAME,
+            endpoint=settings.S3_ENDPOINT,
+            access_key=settings.S3_ACCESS_KEY,
+            secret_key=settings.S3_SECRET_KEY
+        )
+    return _S3
 
 async def get_redis() -> AsyncGenerator[Redis, Any]:
     client = get_redis_client()
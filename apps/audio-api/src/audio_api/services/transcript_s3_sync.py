@@ -1,8 +1,5 @@
 from __future__ import annotations
 
-import json
-import os
-import tempfile
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Iterable, List
@@ -77,39 +74,10 @@ class TranscriptS3SyncService:
         existing_meta.setdefault("results", {})
         existing_meta["results"]["transcript_aligned"] = transcript_dicts
         existing_meta["processed_at"] = processed_at_str
-        with tempfile.NamedTemporaryFile(mode="w+", delete=False, encoding="utf-8") as tmp:
-            json.dump(existing_meta, tmp, ensure_ascii=False, indent=2)
-            tmp_meta_path = tmp.name
-        try:
-            await self.s3.upload_file(tmp_meta_path, key_final_json)
-        finally:
-            try:
-                os.remove(tmp_meta_path)
-            except OSError:
-                pass
-
+        await self.s3.put_json(existing_meta, key_final_json, indent=2)
         txt_content = self._transcript_txt(job_id, transcript_segments)
-        with tempfile.NamedTemporaryFile(mode="w+", delete=False, encoding="utf-8") as tmp:
-            tmp.write(txt_content)
-            tmp_txt_path = tmp.name
-        try:
-            await self.s3.upload_file(tmp_txt_path, key_final_txt)
-        finally:
-            try:
-                os.remove(tmp_txt_path)
-            except OSError:
-                pass
-
-        with tempfile.NamedTemporaryFile(mode="w+", delete=False, encoding="utf-8") as tmp:
-            json.dump(transcript_dicts, tmp, ensure_ascii=False, indent=2)
-            tmp_analysis_path = tmp.name
-        try:
-            await self.s3.upload_file(tmp_analysis_path, key_analysis_final)
-        finally:
-            try:
-                os.remove(tmp_analysis_path)
-            except OSError:
-                pass
+        await self.s3.put_text(txt_content, key_final_txt)
+        await self.s3.put_json(transcript_dicts, key_analysis_final, indent=2)
 
         return TranscriptS3SyncResult(
             job_id=job_id,
@@ -12,7 +12,6 @@ from audio_api.router.router import api_router
 
 from shared_messaging.producer import RabbitMQProducer
 from shared_messaging.consumer import RabbitMQConsumer
-from shared_storage.s3 import S3Client
 from audio_api.services.handle_upload_finished import HandleUploadFinishedService
 
 
@@ -26,12 +25,7 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("Database Connected")
 
-    s3_client = S3Client(
-        bucket=settings.S3_BUCKET_NAME,
-        endpoint=settings.S3_ENDPOINT,
-        access_key=settings.S3_ACCESS_KEY,
-        secret_key=settings.S3_SECRET_KEY
-    )
+    s3_client = injectable.get_s3_client()
 
     producer = RabbitMQProducer(settings.RABBITMQ_URL)
     await producer.connect()
@@ -68,6 +62,8 @@ async def lifespan(app: FastAPI):
     if producer:
         await producer.close()
     injectable._Producer = None
+    await s3_client.close()
+    injectable._S3 = None
 
 
 app = FastAPI(
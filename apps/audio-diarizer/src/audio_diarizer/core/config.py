@@ -12,6 +12,7 @@ class Settings(BaseSettings):
     S3_ACCESS_KEY: str = "S3_ACCESS_KEY"
     S3_SECRET_KEY: str = "S3_SECRET_KEY"
     S3_BUCKET_NAME: str = "audio-management"
+    S3_BACKEND: str = "boto3"
 
     HF_TOKEN: str = "HF_TOKEN"
 
@@ -6,7 +6,7 @@ from audio_diarizer.core.config import settings
 from audio_diarizer.services.diarizer_service import DiarizerService
 from shared_messaging.consumer import RabbitMQConsumer
 from shared_messaging.producer import RabbitMQProducer
-from shared_storage.s3 import S3Client
+from shared_storage.factory import create_s3_client
 
 
 logging.basicConfig(
@@ -23,7 +23,8 @@ async def main():
     else:
         logger.warning("No GPU found! Diarization will be extremely slow on CPU.")
 
-    s3 = S3Client(
+    s3 = create_s3_client(
+        settings.S3_BACKEND,
         bucket=settings.S3_BUCKET_NAME,
         endpoint=settings.S3_ENDPOINT,
         access_key=settings.S3_ACCESS_KEY,
@@ -0,0 +1,163 @@
+"""Check the Sepformer peak-memory estimate against measured forward passes.
+
+Usage, from apps/audio-enhancer:
+
+    python benchmarks/bench_memory.py [--seconds 1,2,4,8,15,22] [--batch 1] [--random-weights]
+
+Loads the real Sepformer through AudioEnhancerModel, on CUDA when available,
+as the worker does (downloaded to HF_HOME on first use). --random-weights
+builds the same architecture from the model card's hyperparameters instead,
+for hosts that cannot reach the hub; activations, and so the peak, do not
+depend on the weight values.
+
+Each length runs in a fresh subprocess, because ru_maxrss is a process-wide
+high-water mark. The peak is ru_maxrss after the pass minus ru_maxrss after
+loading the model and a short warm-up pass. On CUDA it is
+torch.cuda.max_memory_allocated instead. tracemalloc is not used because it
+does not see the tensor allocator.
+
+Prints measured vs estimated peaks, fits the two per-sample constants as the
+tightest pair whose estimate covers every measurement, and exits non-zero if any
+pass went over its estimate_peak_bytes, i.e. if the budget would not have held.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from audio_enhancer.utils.enhancement import (  # noqa: E402
+    SAMPLE_RATE,
+    _LINEAR_BYTES_PER_SAMPLE,
+    _QUADRATIC_BYTES_PER_SAMPLE,
+    estimate_peak_bytes,
+)
+
+_MB = 1024 * 1024
+
+
+def _rss_bytes() -> int:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _random_weight_model():
+    """sepformer-wham16k-enhancement's architecture (hyperparams.yaml), randomly initialised."""
+    import torch
+    from speechbrain.inference.separation import SepformerSeparation
+    from speechbrain.lobes.models.dual_path import Decoder, Dual_Path_Model, Encoder, SBTransformerBlock
+
+    def transformer():
+        return SBTransformerBlock(
+            num_layers=8, d_model=256, nhead=8, d_ffn=1024, dropout=0,
+            use_positional_encoding=True, norm_before=True
+        )
+
+    modules = {
+        "encoder": Encoder(kernel_size=16, out_channels=256),
+        "masknet": Dual_Path_Model(
+            num_spks=1, in_channels=256, out_channels=256, num_layers=2, K=250,
+            intra_model=transformer(), inter_model=transformer(), norm="ln",
+            linear_layer_after_inter_intra=False, skip_around_intra=True
+        ),
+        "decoder": Decoder(in_channels=256, out_channels=1, kernel_size=16, stride=8, bias=False),
+    }
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    return SepformerSeparation(modules=modules, hparams={"num_spks": 1}, run_opts={"device": device})
+
+
+def measure_once(samples: int, batch: int, random_weights: bool) -> int:
+    """Peak bytes of one forward pass on `batch` x `samples`; runs in the child process."""
+    import torch
+
+    from audio_enhancer.utils.enhancement import AudioEnhancerModel
+
+    model = _random_weight_model() if random_weights else AudioEnhancerModel.get_model()
+    device = model.device
+    with torch.no_grad():
+        model.separate_batch(torch.zeros(1, SAMPLE_RATE // 10, device=device))
+        batch_input = torch.randn(batch, samples, device=device) * 0.1
+        if str(device).startswith("cuda"):
+            torch.cuda.synchronize()
+            torch.cuda.reset_peak_memory_stats()
+            baseline = torch.cuda.memory_allocated()
+            model.separate_batch(batch_input)
+            torch.cuda.synchronize()
+            return torch.cuda.max_memory_allocated() - baseline
+        baseline = _rss_bytes()
+        model.separate_batch(batch_input)
+        return _rss_bytes() - baseline
+
+
+def measure(samples: int, batch: int, random_weights: bool) -> int:
+    child = [sys.executable, __file__, "--child", str(samples), "--batch", str(batch)]
+    out = subprocess.run(
+        child + (["--random-weights"] if random_weights else []),
+        check=True, capture_output=True, text=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])["peak_bytes"]
+
+
+def fit(lengths: list[int], peaks: list[int], batch: int) -> tuple[float, float]:
+    """Tightest (linear, quadratic) bytes per sample with batch * (b*n + a*n^2) >= every peak.
+
+    A least-squares fit undershoots about half the points, and an undershoot is
+    exactly what the budget must not do. Minimizing the summed estimate under those
+    constraints is a two-variable linear program, so the optimum passes through two
+    of the measurements: try every pair and keep the cheapest that covers the rest.
+    """
+    n = np.asarray(lengths, dtype=np.float64)
+    per_sample = np.asarray(peaks, dtype=np.float64) / (batch * n)
+    # Per sample, the estimate is the line b + a*n; each pair of points fixes one.
+    candidates = [(per_sample.max(), 0.0)]
+    for i in range(len(n)):
+        for j in range(i + 1, len(n)):
+            if n[i] != n[j]:
+                quadratic = (per_sample[j] - per_sample[i]) / (n[j] - n[i])
+                candidates.append((per_sample[i] - quadratic * n[i], quadratic))
+    feasible = [
+        (linear, quadratic) for linear, quadratic in candidates
+        if quadratic >= 0 and np.all(linear + quadratic * n >= per_sample * (1 - 1e-9))
+    ]
+    return min(feasible, key=lambda c: float(np.sum(c[0] * n + c[1] * n * n)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", default="1,2,4,8,15,22", help="comma-separated segment lengths to measure")
+    parser.add_argument("--batch", type=int, default=1, help="segments per forward pass")
+    parser.add_argument("--random-weights", action="store_true",
+                        help="build the architecture locally instead of downloading the weights")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps({"peak_bytes": measure_once(args.child, args.batch, args.random_weights)}))
+        return
+
+    lengths = [int(float(s) * SAMPLE_RATE) for s in args.seconds.split(",")]
+    peaks = []
+    over = False
+    print(f"{'seconds':>8} {'measured MB':>12} {'estimate MB':>12} {'ratio':>6}")
+    for samples in lengths:
+        peak = measure(samples, args.batch, args.random_weights)
+        estimate = estimate_peak_bytes(args.batch, samples)
+        peaks.append(peak)
+        over |= peak > estimate
+        print(f"{samples / SAMPLE_RATE:>8g} {peak / _MB:>12.1f} {estimate / _MB:>12.1f} {peak / estimate:>6.2f}")
+
+    linear, quadratic = fit(lengths, peaks, args.batch)
+    print(f"\n_LINEAR_BYTES_PER_SAMPLE    current {_LINEAR_BYTES_PER_SAMPLE:>10}  fitted {linear:>10.1f}")
+    print(f"_QUADRATIC_BYTES_PER_SAMPLE current {_QUADRATIC_BYTES_PER_SAMPLE:>10}  fitted {quadratic:>10.4f}")
+    if over:
+        print("\nAt least one pass exceeded its estimate; the memory budget would not have held.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
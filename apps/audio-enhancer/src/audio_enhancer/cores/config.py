@@ -11,8 +11,19 @@ class Settings(BaseSettings):
     S3_ACCESS_KEY: str = "S3_ACCESS_KEY"
     S3_SECRET_KEY: str = "S3_SECRET_KEY"
     S3_BUCKET_NAME: str = "audio-management"
+    S3_BACKEND: str = "boto3"
+    # Set on nodes co-located with the segmenter to read ranged chunks from the shared
+    # PCM store; when unset, ranged chunks are fetched with S3 ranged GETs
+    PCM_STORE_DIR: Optional[str] = None
 
     SPEECHBRAIN_CACHE_DIR: str = "/tmp/pretrained_models"
+    # Noisy segments denoised per Sepformer forward pass
+    ENHANCER_DENOISE_BATCH_SIZE: int = 4
+    # Estimated peak memory allowed per Sepformer forward pass; longer segments are
+    # enhanced in overlapping windows and crossfaded back. 0 disables windowing; a budget
+    # too small for a one-second window is rejected at startup
+    ENHANCER_MEMORY_BUDGET_MB: int = 2048
+    ENHANCER_WINDOW_OVERLAP_SECONDS: float = 0.5
 
     class Config:
         env_file = ".env"
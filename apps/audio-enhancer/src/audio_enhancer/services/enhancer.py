@@ -1,81 +1,194 @@
 import asyncio
+import io
 import logging
 from pathlib import Path
 
-from audio_enhancer.utils.quality_check import check_audio_quality
-from audio_enhancer.utils.enhancement import denoise_audio
+import torch
+import torchaudio
+
+from audio_enhancer.utils.quality_check import assess_quality
+from audio_enhancer.utils.enhancement import (
+    SAMPLE_RATE, check_memory_budget, denoise_batch, pcm_to_waveform, to_model_input
+)
+from shared_storage.chunks import read_chunk
+from shared_storage.pcm_store import LocalPCMStore
 from shared_storage.s3 import S3Client
-from shared_schemas.events import EnhancementCompletedEvent
+from shared_schemas.commands import EnhanceCommand, EnhanceGroupCommand
+from shared_schemas.events import EnhancementCompletedEvent, EnhancementGroupCompletedEvent
+from shared_messaging.cancellation import CancellationCache
+from shared_messaging.groups import retry_failed_members
 from shared_messaging.producer import RabbitMQProducer
 
 logger = logging.getLogger(__name__)
 
 
 class AudioEnhancerService:
-    def __init__(self, s3: S3Client, producer: RabbitMQProducer):
+    def __init__(
+            self,
+            s3: S3Client,
+            producer: RabbitMQProducer,
+            store: LocalPCMStore | None = None,
+            cancellations: CancellationCache | None = None,
+            denoise_batch_size: int = 4,
+            memory_budget_mb: int = 0,
+            window_overlap_seconds: float = 0.5
+    ):
         self.s3 = s3
         self.producer = producer
+        self.store = store
+        self.cancellations = cancellations
+        self.denoise_batch_size = denoise_batch_size
+        check_memory_budget(memory_budget_mb)
+        self.memory_budget_mb = memory_budget_mb
+        self.window_overlap_seconds = window_overlap_seconds
         self.temp_dir = Path("tmp/audio-enhancer").resolve()
         self.temp_dir.mkdir(parents=True, exist_ok=True)
 
     async def handle_command(self, cmd_data: dict):
-        job_id = cmd_data.get("job_id")
-        segment_index = cmd_data.get("index")
-        s3_input_path = cmd_data.get("s3_path")
-        local_input = self.temp_dir / f"{job_id}_{segment_index}_in.wav"
-        local_output = self.temp_dir / f"{job_id}_{segment_index}_out.wav"
-        local_input_str = str(local_input.resolve())
-        local_output_str = str(local_output.resolve())
-        start_ms = cmd_data.get("start_ms")
-        end_ms = cmd_data.get("end_ms")
+        command = EnhanceCommand(**cmd_data)
+        if self.cancellations and await self.cancellations.skip(command.job_id, f"enhancement of seg {command.index}"):
+            return
+        outcome = (await self._enhance_many([command]))[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        await self.producer.publish(
+            "worker_events",
+            "enhancement.done",
+            outcome
+        )
+
+    async def handle_group_command(self, cmd_data: dict):
+        """Enhance every member of a chunk group and report them in one event.
+
+        Downloads and quality checks run concurrently, and the noisy members are
+        denoised together in batched forward passes. Successful members are reported
+        even when others fail; only the failed ones are sent around again.
+        """
+        group = EnhanceGroupCommand(**cmd_data)
+        if self.cancellations and await self.cancellations.skip(group.job_id, "enhancement group"):
+            return
+        logger.info(f"Enhancing Job {group.job_id} - group of {len(group.items)} segments")
+        outcomes = await self._enhance_many(group.items)
+        results = [o for o in outcomes if not isinstance(o, Exception)]
+        if results:
+            event = EnhancementGroupCompletedEvent(job_id=group.job_id, results=results)
+            await self.producer.publish("worker_events", "enhancement_group.done", event)
+        failed = [(item, o) for item, o in zip(group.items, outcomes) if isinstance(o, Exception)]
+        if failed:
+            await retry_failed_members(self.producer, "audio_ops", "cmd.enhance_group", group, failed)
+
+    async def _load(self, command: EnhanceCommand) -> tuple[torch.Tensor, int, dict]:
+        """Fetch a segment into memory and assess its quality.
+
+        Ranged segments never touch disk; standalone ones are downloaded and the
+        local copy is removed.
+        """
+        logger.info(f"Enhancing Job {command.job_id} - Seg {command.index}")
+        if command.ranged:
+            pcm, layout = await read_chunk(
+                self.s3, command.s3_path,
+                job_id=command.job_id, start_ms=command.start_ms, end_ms=command.end_ms, store=self.store
+            )
+
+            def _decode_and_assess():
+                audio = pcm_to_waveform(pcm, layout)
+                return audio, layout.sample_rate, assess_quality(audio, layout.sample_rate)
+            audio, sr, quality_info = await asyncio.to_thread(_decode_and_assess)
+        else:
+            audio, sr, quality_info = await self._load_file(command)
+        logger.info(
+            f"Seg {command.index} Quality: "
+            f"{quality_info['level']} (SNR: {quality_info['snr']:.2f})"
+        )
+        return audio, sr, quality_info
 
+    async def _load_file(self, command: EnhanceCommand) -> tuple[torch.Tensor, int, dict]:
+        local_input = self.temp_dir / f"{command.job_id}_{command.index}_in.wav"
+        local_input_str = str(local_input.resolve())
         try:
-            logger.info(f"Enhancing Job {job_id} - Seg {segment_index}")
             if not local_input.exists():
-                await self.s3.download_file(s3_input_path, local_input_str)
+                await self.s3.download_file(command.s3_path, local_input_str)
             if not local_input.exists() or local_input.stat().st_size == 0:
                 raise FileNotFoundError(f"Downloaded file invalid: {local_input_str}")
 
-            quality_info = await asyncio.to_thread(check_audio_quality, local_input_str)
-            logger.info(
-                f"Seg {segment_index} Quality: "
-                f"{quality_info['level']} (SNR: {quality_info['snr']:.2f})"
-            )
+            def _read_and_assess():
+                audio, sr = torchaudio.load(local_input_str)
+                return audio, sr, assess_quality(audio, sr)
+            return await asyncio.to_thread(_read_and_assess)
+        finally:
+            self._safe_cleanup(local_input)
 
-            final_s3_path = s3_input_path
+    async def _store_denoised(self, command: EnhanceCommand, enhanced: torch.Tensor) -> str:
+        if command.ranged:
+            clean_s3_key = f"enhanced/{command.job_id}/chunk_{command.index}.wav"
+        else:
+            clean_s3_key = command.s3_path.replace("segments/", "enhanced/")
+
+        def _encode() -> bytes:
+            buffer = io.BytesIO()
+            torchaudio.save(buffer, enhanced.unsqueeze(0), SAMPLE_RATE, format="wav")
+            return buffer.getvalue()
+        await self.s3.put_bytes(await asyncio.to_thread(_encode), clean_s3_key, "audio/wav")
+        logger.info(f"Segment {command.index} denoised")
+        return clean_s3_key
+
+    async def _enhance_many(self, commands: list[EnhanceCommand]) -> list[EnhancementCompletedEvent | Exception]:
+        outcomes: list[EnhancementCompletedEvent | Exception | None] = [None] * len(commands)
+        loaded = await asyncio.gather(*[self._load(c) for c in commands], return_exceptions=True)
+
+        noisy = []
+        for i, item in enumerate(loaded):
+            if isinstance(item, Exception):
+                logger.error(f"Error enhancing segment {commands[i].index}: {item}")
+                outcomes[i] = item
+            elif item[2]["need_denoise"]:
+                noisy.append(i)
+
+        denoised: dict[int, torch.Tensor] = {}
+        if noisy:
+            logger.info(f"Denoising {len(noisy)} segment(s)...")
+            try:
+                waveforms = [to_model_input(loaded[i][0], loaded[i][1]) for i in noisy]
+                enhanced = await denoise_batch(
+                    waveforms,
+                    self.denoise_batch_size,
+                    memory_budget_mb=self.memory_budget_mb,
+                    overlap_seconds=self.window_overlap_seconds
+                )
+                denoised = dict(zip(noisy, enhanced))
+            except Exception as e:
+                logger.exception(f"Denoising failed for {len(noisy)} segment(s)")
+                for i in noisy:
+                    outcomes[i] = e
+
+        async def _finish(i: int) -> EnhancementCompletedEvent:
+            command = commands[i]
+            quality_info = loaded[i][2]
+            final_s3_path = command.s3_path
+            final_ranged = command.ranged
             if quality_info["need_denoise"]:
-                logger.info(f"Denoising segment {segment_index}...")
-                await denoise_audio(local_input_str, local_output_str)
-                clean_s3_key = s3_input_path.replace("segments/", "enhanced/")
-                await self.s3.upload_file(local_output_str, clean_s3_key)
-                final_s3_path = clean_s3_key
-                logger.info(f"Segment {segment_index} denoised")
+                final_s3_path = await self._store_denoised(command, denoised[i])
+                final_ranged = False
             else:
                 logger.info("Audio is clean enough. Skipping denoise.")
-
-            event = EnhancementCompletedEvent(
-                job_id=job_id,
-                index=segment_index,
+            return EnhancementCompletedEvent(
+                job_id=command.job_id,
+                index=command.index,
                 s3_path=final_s3_path,
                 snr=quality_info["snr"],
                 is_denoised=quality_info["need_denoise"],
-                start_ms=start_ms,
-                end_ms=end_ms
+                start_ms=command.start_ms,
+                end_ms=command.end_ms,
+                ranged=final_ranged
             )
 
-            await self.producer.publish(
-                "worker_events",
-                "enhancement.done",
-                event
-            )
-
-        except Exception as e:
-            logger.exception(f"Error enhancing segment {segment_index}")
-            raise e
-
-        finally:
-            self._safe_cleanup(local_input)
-            self._safe_cleanup(local_output)
+        pending = [i for i in range(len(commands)) if outcomes[i] is None]
+        finished = await asyncio.gather(*[_finish(i) for i in pending], return_exceptions=True)
+        for i, outcome in zip(pending, finished):
+            if isinstance(outcome, Exception):
+                logger.error(f"Error enhancing segment {commands[i].index}: {outcome}")
+            outcomes[i] = outcome
+        return outcomes
 
     @staticmethod
     def _safe_cleanup(path: Path):
@@ -1,15 +1,22 @@
 import os
+import math
 import torch
 import torchaudio
 import logging
 import asyncio
-from pathlib import Path
+import numpy as np
 from speechbrain.inference.separation import SepformerSeparation
 
+from shared_storage.wav import WavLayout
+
 logger = logging.getLogger(__name__)
 
 _GPU_SEMAPHORE = asyncio.Semaphore(1)
 
+SAMPLE_RATE = 16000
+# Shortest window the memory budget may cut a segment into
+MIN_WINDOW = SAMPLE_RATE
+
 class AudioEnhancerModel:
     _model = None
 
@@ -27,23 +34,172 @@ class AudioEnhancerModel:
         return cls._model
 
 
-def _blocking_inference(model, input_path: str, output_path: str):
+def pcm_to_waveform(pcm: memoryview | bytes, layout: WavLayout) -> torch.Tensor:
+    """(channels, frames) float tensor of in-memory 16-bit PCM, as torchaudio.load returns it.
+
+    A memoryview (e.g. into the PCM store's mapping) is released once converted.
+    """
     try:
-        est_sources = model.separate_file(path=input_path)
-        enhanced_audio = est_sources[:, :, 0].detach().cpu()
-        torchaudio.save(output_path, enhanced_audio, 16000)
-        return True
-    except Exception as e:
-        logger.error(f"Inference error: {e}")
-        raise e
-
-
-async def denoise_audio(input_path: str, output_path: str):
-    input_path = str(Path(input_path).resolve()).replace("\\", "/")
-    output_path = str(Path(output_path).resolve()).replace("\\", "/")
+        if layout.sample_width != 2:
+            raise ValueError(f"Expected 16-bit PCM, got {layout.sample_width * 8}-bit")
+        samples = np.frombuffer(pcm, dtype="<i2")
+        audio = samples.astype(np.float32) / 32768.0
+        del samples
+        return torch.from_numpy(audio.reshape(-1, layout.channels).T)
+    finally:
+        if isinstance(pcm, memoryview):
+            pcm.release()
+
+
+def to_model_input(audio: torch.Tensor, sr: int) -> torch.Tensor:
+    """Mono 16 kHz 1-D waveform, as separate_file would feed the model."""
+    if audio.dim() > 1:
+        audio = audio.mean(dim=0)
+    if sr != SAMPLE_RATE:
+        audio = torchaudio.functional.resample(audio, sr, SAMPLE_RATE)
+    return audio
+
+
+# Rough peak working set of one Sepformer (wham16k) forward pass on n samples.
+# The encoder strides by 8 and the masknet cuts frames into chunks of 250 with 50%
+# overlap, i.e. about n / 1000 chunks. Intra-chunk attention is linear in n
+# (chunks x heads x 250^2 float32 scores, plus the feed-forward activations);
+# inter-chunk attention is quadratic (250 x heads x chunks^2). Both count twice
+# for the scores and their softmax.
+# The constants are benchmarks/bench_memory.py's upper-bound fit to CPU RSS peaks
+# of single passes of 1-22 s (torch 2.x, the model card's architecture), rounded
+# up. Measured peaks run from ~8200 B/sample up to 15 s to ~10800 at 22 s.
+# tests/test_enhancement.py keeps the measurements; re-run the benchmark after
+# changing the model or torch.
+_LINEAR_BYTES_PER_SAMPLE = 8700
+_QUADRATIC_BYTES_PER_SAMPLE = 0.0065
+
+
+def estimate_peak_bytes(batch: int, samples: int) -> float:
+    return batch * (_LINEAR_BYTES_PER_SAMPLE * samples + _QUADRATIC_BYTES_PER_SAMPLE * samples * samples)
+
+
+def window_for_budget(budget_bytes: int) -> int:
+    """Longest window, in samples, whose single forward pass fits in `budget_bytes`."""
+    a, b = _QUADRATIC_BYTES_PER_SAMPLE, _LINEAR_BYTES_PER_SAMPLE
+    return int((-b + math.sqrt(b * b + 4 * a * budget_bytes)) / (2 * a))
+
+
+def check_memory_budget(memory_budget_mb: int) -> None:
+    """Reject a budget whose windows would drop below a second; shorter ones lose too much context."""
+    if memory_budget_mb and window_for_budget(memory_budget_mb * 1024 * 1024) < MIN_WINDOW:
+        minimum = math.ceil(estimate_peak_bytes(1, MIN_WINDOW) / (1024 * 1024))
+        raise ValueError(
+            f"Memory budget of {memory_budget_mb} MB cannot fit a {MIN_WINDOW / SAMPLE_RATE:g} s "
+            f"Sepformer window; use at least {minimum} MB, or 0 to disable windowing"
+        )
+
+
+def _window_starts(length: int, window: int, overlap: int) -> list[int]:
+    """Evenly spread windows of `window` samples covering `length`, overlapping by at least `overlap`."""
+    if length <= window:
+        return [0]
+    count = math.ceil((length - overlap) / (window - overlap))
+    step = (length - window) / (count - 1)
+    return [round(k * step) for k in range(count)]
+
+
+def _overlap_add(pieces: list[torch.Tensor], starts: list[int], length: int, overlap: int) -> torch.Tensor:
+    """Crossfade windowed outputs back into one signal.
+
+    Each window fades in and out over `overlap` samples (except at the signal
+    edges) and the sum is divided by the summed weights, so any overlap at least
+    that long blends smoothly and untouched regions pass through unchanged.
+    """
+    out = torch.zeros(length)
+    norm = torch.zeros(length)
+    ramp = torch.arange(1, overlap + 1, dtype=torch.float32) / (overlap + 1)
+    for k, (piece, start) in enumerate(zip(pieces, starts)):
+        weight = torch.ones(piece.shape[-1])
+        if overlap:
+            if k > 0:
+                weight[:overlap] = ramp
+            if k < len(pieces) - 1:
+                weight[-overlap:] = ramp.flip(0)
+        out[start:start + piece.shape[-1]] += piece * weight
+        norm[start:start + piece.shape[-1]] += weight
+    return out / norm
+
+
+def _blocking_separate_batch(
+        model,
+        waveforms: list[torch.Tensor],
+        batch_size: int,
+        budget_bytes: int = 0,
+        overlap: int = 0
+) -> list[torch.Tensor]:
+    # With a budget, long segments are cut into overlapping windows that fit it and
+    # every window becomes its own batch item, so even a lone window stays under it.
+    window = window_for_budget(budget_bytes) if budget_bytes else None
+    if window is not None:
+        if window < MIN_WINDOW:
+            raise ValueError(f"Memory budget of {budget_bytes} bytes cannot fit a {MIN_WINDOW}-sample window")
+        overlap = min(overlap, window // 2)
+    pieces: list[torch.Tensor] = []
+    layout: list[list[int]] = []
+    for waveform in waveforms:
+        length = waveform.shape[-1]
+        starts = _window_starts(length, window, overlap) if window else [0]
+        layout.append(starts)
+        pieces.extend(waveform[start:start + (window or length)] for start in starts)
+
+    # Similar lengths share a batch so zero padding stays small.
+    order = sorted(range(len(pieces)), key=lambda i: pieces[i].shape[-1])
+    outputs: list[torch.Tensor | None] = [None] * len(pieces)
+    with torch.no_grad():
+        start = 0
+        while start < len(order):
+            end = start + 1
+            while (end < len(order) and end - start < batch_size
+                   and (not budget_bytes
+                        or estimate_peak_bytes(end - start + 1, pieces[order[end]].shape[-1]) <= budget_bytes)):
+                end += 1
+            members = order[start:end]
+            batch = torch.nn.utils.rnn.pad_sequence([pieces[i] for i in members], batch_first=True)
+            est_sources = model.separate_batch(batch)
+            enhanced = est_sources[:, :, 0].detach().cpu()
+            for row, i in enumerate(members):
+                outputs[i] = enhanced[row, :pieces[i].shape[-1]]
+            start = end
+
+    results = []
+    offset = 0
+    for waveform, starts in zip(waveforms, layout):
+        segment = outputs[offset:offset + len(starts)]
+        offset += len(starts)
+        out = segment[0] if len(segment) == 1 else _overlap_add(segment, starts, waveform.shape[-1], overlap)
+        # Peak-normalize on the whole unpadded signal, as separate_file does.
+        results.append(out / out.abs().max().clamp(min=1e-8))
+    return results
+
+
+async def denoise_batch(
+        waveforms: list[torch.Tensor],
+        batch_size: int = 4,
+        memory_budget_mb: int = 0,
+        overlap_seconds: float = 0.5
+) -> list[torch.Tensor]:
+    """Denoise in-memory 16 kHz mono waveforms, `batch_size` per forward pass; returns 1-D tensors.
+
+    With a `memory_budget_mb`, segments too long for the budget are enhanced in
+    overlapping windows and crossfaded back, and batches are shrunk so that no
+    forward pass is estimated to exceed it.
+    """
+    if not waveforms:
+        return []
     async with _GPU_SEMAPHORE:
         model = AudioEnhancerModel.get_model()
-        logger.debug(f"Starting Denoise (Threaded): {input_path}")
-        await asyncio.to_thread(_blocking_inference, model, input_path, output_path)
-        if not os.path.exists(output_path):
-            raise RuntimeError(f"Output file not found after inference: {output_path}")
\ No newline at end of file
+        logger.debug(f"Starting batched denoise of {len(waveforms)} segments")
+        return await asyncio.to_thread(
+            _blocking_separate_batch,
+            model,
+            waveforms,
+            max(1, batch_size),
+            memory_budget_mb * 1024 * 1024,
+            int(overlap_seconds * SAMPLE_RATE)
+        )
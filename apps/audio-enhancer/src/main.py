@@ -4,9 +4,12 @@ import sys
 
 from audio_enhancer.cores.config import settings
 from audio_enhancer.services.enhancer import AudioEnhancerService
+from shared_messaging.cancellation import CancellationCache
 from shared_messaging.consumer import RabbitMQConsumer
+from shared_messaging.job_events import JobEndListener
 from shared_messaging.producer import RabbitMQProducer
-from shared_storage.s3 import S3Client
+from shared_storage.factory import create_s3_client
+from shared_storage.pcm_store import LocalPCMStore
 
 
 logging.basicConfig(
@@ -18,20 +21,36 @@ logger = logging.getLogger(__name__)
 
 async def main():
     logger.info("Starting Audio Enhancer Worker...")
-    s3 = S3Client(
+    s3 = create_s3_client(
+        settings.S3_BACKEND,
         bucket=settings.S3_BUCKET_NAME,
         endpoint=settings.S3_ENDPOINT,
         access_key=settings.S3_ACCESS_KEY,
         secret_key=settings.S3_SECRET_KEY
     )
+    store = LocalPCMStore(settings.PCM_STORE_DIR) if settings.PCM_STORE_DIR else None
+    cancellations = CancellationCache()
+    await cancellations.listen(settings.RABBITMQ_URL)
+    job_ends = JobEndListener(store.evict_job) if store else None
+    if job_ends:
+        await job_ends.listen(settings.RABBITMQ_URL)
 
     Producer = RabbitMQProducer(settings.RABBITMQ_URL)
     await Producer.connect()
 
-    service = AudioEnhancerService(s3, Producer)
+    service = AudioEnhancerService(
+        s3,
+        Producer,
+        store,
+        cancellations,
+        denoise_batch_size=settings.ENHANCER_DENOISE_BATCH_SIZE,
+        memory_budget_mb=settings.ENHANCER_MEMORY_BUDGET_MB,
+        window_overlap_seconds=settings.ENHANCER_WINDOW_OVERLAP_SECONDS
+    )
     consumer = RabbitMQConsumer(settings.RABBITMQ_URL, service_name="enhancer")
     await consumer.connect()
     await consumer.subscribe("audio_ops", "cmd.enhance", service.handle_command)
+    await consumer.subscribe("audio_ops", "cmd.enhance_group", service.handle_group_command)
 
     logger.info("Audio Enhancer is running and waiting for tasks...")
 
@@ -41,6 +60,10 @@ async def main():
         logger.info("Stopping worker...")
     finally:
         await consumer.close()
+        await cancellations.close()
+        if job_ends:
+            await job_ends.close()
+            store.close()
         await Producer.close()
 
 
@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from audio_enhancer.utils.enhancement import (
+    MIN_WINDOW,
+    SAMPLE_RATE,
+    _blocking_separate_batch,
+    _window_starts,
+    check_memory_budget,
+    estimate_peak_bytes,
+    window_for_budget,
+)
+
+BUDGET = 256 * 1024 * 1024
+WINDOW = window_for_budget(BUDGET)
+OVERLAP = SAMPLE_RATE // 2
+# Windowed vs single-pass output, after peak normalization. The identity model is
+# exact up to float rounding; the FIR model only differs in the first few samples
+# of each window, which the crossfade weights down.
+IDENTITY_TOLERANCE = 1e-6
+FIR_TOLERANCE = 1e-4
+# Peak RSS of one Sepformer pass, in MiB by segment seconds, from
+# `benchmarks/bench_memory.py --random-weights` on CPU (torch 2.8)
+MEASURED_PEAK_MB = {
+    1: 132.9, 2: 264.2, 3: 374.3, 4: 506.0, 6: 759.4, 8: 1003.5, 10: 1255.2,
+    12: 1494.9, 15: 1880.1, 16: 2141.9, 18: 2579.7, 20: 3059.7, 22: 3632.6,
+}
+
+
+def _measured_peak_bytes(batch: int, samples: int) -> float:
+    """MEASURED_PEAK_MB interpolated to `samples`, for `batch` rows."""
+    seconds, peaks = zip(*sorted(MEASURED_PEAK_MB.items()))
+    assert samples <= seconds[-1] * SAMPLE_RATE
+    return batch * float(np.interp(samples / SAMPLE_RATE, seconds, peaks)) * 1024 * 1024
+
+
+class _StubModel:
+    """Stands in for Sepformer: filters each row and records the batches it was handed."""
+
+    def __init__(self, taps: list[float]):
+        self.kernel = torch.tensor(taps).flip(0).view(1, 1, -1)
+        self.batches: list[tuple[int, int]] = []
+
+    def separate_batch(self, batch: torch.Tensor) -> torch.Tensor:
+        self.batches.append(tuple(batch.shape))
+        padded = torch.nn.functional.pad(batch.unsqueeze(1), (self.kernel.shape[-1] - 1, 0))
+        return torch.nn.functional.conv1d(padded, self.kernel).transpose(1, 2)
+
+
+def _waveforms(lengths: list[int]) -> list[torch.Tensor]:
+    gen = torch.Generator().manual_seed(0)
+    return [0.1 * torch.randn(n, generator=gen) for n in lengths]
+
+
+LENGTHS = [SAMPLE_RATE, WINDOW - 1, WINDOW, WINDOW + 1, 2 * WINDOW, 5 * WINDOW + 1234]
+
+
+@pytest.mark.parametrize("taps, tolerance", [([1.0], IDENTITY_TOLERANCE), ([0.6, 0.3, 0.1], FIR_TOLERANCE)])
+def test_windowed_matches_single_pass(taps, tolerance):
+    waveforms = _waveforms(LENGTHS)
+
+    full = _blocking_separate_batch(_StubModel(taps), waveforms, batch_size=1)
+    windowed = _blocking_separate_batch(_StubModel(taps), waveforms, 4, BUDGET, OVERLAP)
+
+    for length, expected, got in zip(LENGTHS, full, windowed):
+        assert got.shape == (length,)
+        assert (got - expected).abs().max() <= tolerance
+
+
+def test_every_forward_pass_fits_the_budget():
+    model = _StubModel([1.0])
+
+    _blocking_separate_batch(model, _waveforms(LENGTHS), 8, BUDGET, OVERLAP)
+
+    assert model.batches
+    for batch, length in model.batches:
+        assert length <= WINDOW
+        assert _measured_peak_bytes(batch, length) <= BUDGET
+
+
+@pytest.mark.parametrize("seconds", sorted(MEASURED_PEAK_MB))
+def test_estimate_covers_measured_peaks(seconds):
+    assert estimate_peak_bytes(1, seconds * SAMPLE_RATE) >= MEASURED_PEAK_MB[seconds] * 1024 * 1024
+
+
+@pytest.mark.parametrize("length", [1, WINDOW - 1, WINDOW, WINDOW + 1, 2 * WINDOW - OVERLAP, 7 * WINDOW + 3])
+def test_window_starts_cover_and_overlap(length):
+    starts = _window_starts(length, WINDOW, OVERLAP)
+
+    assert starts[0] == 0
+    assert starts == sorted(set(starts))
+    if length <= WINDOW:
+        assert starts == [0]
+    else:
+        assert starts[-1] + WINDOW == length
+        for a, b in zip(starts, starts[1:]):
+            assert a + WINDOW - b >= OVERLAP
+
+
+def test_budget_below_min_window_is_rejected():
+    too_small_mb = 64
+    assert window_for_budget(too_small_mb * 1024 * 1024) < MIN_WINDOW
+
+    with pytest.raises(ValueError):
+        check_memory_budget(too_small_mb)
+    with pytest.raises(ValueError):
+        _blocking_separate_batch(_StubModel([1.0]), _waveforms([SAMPLE_RATE]), 1, too_small_mb * 1024 * 1024)
+
+
+def test_smallest_accepted_budget_fits_a_min_window():
+    mb = 1
+    while True:
+        try:
+            check_memory_budget(mb)
+            break
+        except ValueError:
+            mb += 1
+    assert window_for_budget(mb * 1024 * 1024) >= MIN_WINDOW
+    assert mb >= MEASURED_PEAK_MB[MIN_WINDOW // SAMPLE_RATE]
+    check_memory_budget(0)
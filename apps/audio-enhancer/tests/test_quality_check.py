@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from audio_enhancer.utils.quality_check import NoiseLevel, estimate_snr_spectral, estimate_snr_streaming
+
+SR = 16000
+# Streaming vs full-STFT estimate, in dB. Both pick the same order statistics, so
+# only float rounding and the zeroed sub -160 dB powers separate them.
+SNR_TOLERANCE_DB = 0.01
+
+
+def _speech_like(seconds: float, rng: np.random.Generator) -> np.ndarray:
+    """Tone switched on and off every ~1.7 s over a low noise floor."""
+    t = np.arange(int(seconds * SR)) / SR
+    voiced = np.sin(2 * np.pi * 0.3 * t) > 0
+    return 0.3 * np.sin(2 * np.pi * 220 * t) * voiced + 0.01 * rng.standard_normal(len(t))
+
+
+def _signals():
+    rng = np.random.default_rng(0)
+    return {
+        "half_digital_silence_60s": np.concatenate([np.zeros(30 * SR), _speech_like(30, rng)]),
+        "speech_like_5s": _speech_like(5, rng),
+        "noise_0_5s": 0.05 * rng.standard_normal(SR // 2),
+        "noise_burst_after_silence_10s": np.concatenate([np.zeros(4 * SR), 0.2 * rng.standard_normal(6 * SR)]),
+        "dropouts_20s": _speech_like(20, rng) * (rng.random(20 * SR) < 0.999),
+        "stationary_noise_30s": 0.05 * rng.standard_normal(30 * SR),
+    }
+
+
+@pytest.mark.parametrize("name", list(_signals()))
+def test_streaming_matches_full_stft(name):
+    audio = torch.from_numpy(_signals()[name].astype(np.float32))
+    exact = estimate_snr_spectral(audio, SR)
+    streamed = estimate_snr_streaming(audio, SR)
+    assert abs(streamed - exact) <= SNR_TOLERANCE_DB
+    assert NoiseLevel.from_snr(streamed) == NoiseLevel.from_snr(exact)
+
+
+def test_block_size_does_not_change_the_estimate():
+    audio = torch.from_numpy(_signals()["speech_like_5s"].astype(np.float32))
+    assert estimate_snr_streaming(audio, SR, block_frames=7) == pytest.approx(
+        estimate_snr_streaming(audio, SR, block_frames=256), abs=1e-9
+    )
@@ -10,6 +10,16 @@ class Settings(BaseSettings):
     S3_ACCESS_KEY: str = "S3_ACCESS_KEY"
     S3_SECRET_KEY: str = "S3_SECRET_KEY"
     S3_BUCKET_NAME: str = "audio-management"
+    S3_BACKEND: str = "boto3"
+    # Set on nodes co-located with the segmenter to read ranged chunks from the shared
+    # PCM store; when unset, ranged chunks are fetched with S3 ranged GETs
+    PCM_STORE_DIR: Optional[str] = None
+
+    # Micro-batching: 1 keeps one chunk per forward pass
+    LANGDETECT_BATCH_SIZE: int = 1
+    LANGDETECT_BATCH_WINDOW_MS: int = 100
+    # Only the first N seconds of each chunk are classified; unset uses the whole chunk
+    LANGDETECT_CROP_SECONDS: Optional[float] = None
 
     class Config:
         env_file = ".env"
@@ -3,52 +3,182 @@ import logging
 from pathlib import Path
 import asyncio
 
-from shared_schemas.commands import LanguageDetectCommand
-from shared_schemas.events import LanguageDetectionCompletedEvent
+import torch
+
+from shared_schemas.commands import LanguageDetectCommand, LanguageDetectGroupCommand
+from shared_schemas.events import LanguageDetectionCompletedEvent, LanguageDetectionGroupCompletedEvent
+from shared_messaging.batcher import MicroBatcher
+from shared_messaging.cancellation import CancellationCache
+from shared_messaging.groups import retry_failed_members
 from shared_messaging.producer import RabbitMQProducer
+from shared_storage.chunks import read_chunk
+from shared_storage.pcm_store import LocalPCMStore
 from shared_storage.s3 import S3Client
-from audio_langdetector.utils.engine import VoxLinguaEngine
+from audio_langdetector.utils.engine import VoxLinguaEngine, pcm_to_signal
 
 logger = logging.getLogger(__name__)
 
 
 class LanguageDetectorService:
-    def __init__(self, s3: S3Client, producer: RabbitMQProducer):
+    def __init__(
+            self,
+            s3: S3Client,
+            producer: RabbitMQProducer,
+            store: LocalPCMStore | None = None,
+            batch_size: int = 1,
+            batch_window_ms: int = 100,
+            crop_seconds: float | None = None,
+            cancellations: CancellationCache | None = None
+    ):
         self.s3 = s3
         self.producer = producer
+        self.store = store
+        self.cancellations = cancellations
+        self.crop_seconds = crop_seconds
         self.temp_dir = Path("tmp/audio-langdetector").resolve()
         self.temp_dir.mkdir(parents=True, exist_ok=True)
+        self.batcher: MicroBatcher[LanguageDetectCommand, None] | None = None
+        if batch_size > 1:
+            self.batcher = MicroBatcher(
+                self._process_batch,
+                max_batch_size=batch_size,
+                max_wait_ms=batch_window_ms,
+                name="langdetector"
+            )
+
+    def _local_input(self, command: LanguageDetectCommand) -> str:
+        local_input = self.temp_dir / f"{command.job_id}_{command.index}.wav"
+        return str(local_input.resolve()).replace("\\", "/")
+
+    async def _load_input(self, command: LanguageDetectCommand) -> str | torch.Tensor:
+        """Signal of a ranged chunk, read in memory; standalone chunks are downloaded."""
+        if command.ranged:
+            pcm, layout = await read_chunk(
+                self.s3, command.input_path,
+                job_id=command.job_id, start_ms=command.start_ms, end_ms=command.end_ms, store=self.store
+            )
+            return await asyncio.to_thread(pcm_to_signal, pcm, layout)
+        local_input_str = self._local_input(command)
+        if not os.path.exists(local_input_str):
+            await self.s3.download_file(command.input_path, local_input_str)
+        return local_input_str
 
     async def handle_command(self, cmd_data: dict):
         command = LanguageDetectCommand(**cmd_data)
+        if self.cancellations and await self.cancellations.skip(command.job_id, f"language detection of seg {command.index}"):
+            return
+        if self.batcher:
+            await self.batcher.submit(command)
+            return
 
-        local_input = self.temp_dir / f"{command.job_id}_{command.index}.wav"
-        local_input_str = str(local_input.resolve()).replace("\\", "/")
+        local_input_str = self._local_input(command)
 
         try:
             logger.info(f"Detecting language for Job {command.job_id} Seg {command.index}...")
-            if not local_input.exists():
-                await self.s3.download_file(command.input_path, local_input_str)
+            audio = await self._load_input(command)
 
             def _run_detect():
                 engine = VoxLinguaEngine.get_instance()
-                return engine.detect(local_input_str)
+                return engine.detect_batch([audio], self.crop_seconds)[0]
             lang_code, prob = await asyncio.to_thread(_run_detect)
-            logger.info(f"Seg {command.index}: {lang_code} ({prob:.2%})")
-
-            event = LanguageDetectionCompletedEvent(
-                job_id=command.job_id,
-                language=lang_code,
-                probability=prob,
-                index=command.index,
-                input_path=command.input_path,
-                start_ms=command.start_ms,
-                end_ms=command.end_ms
-            )
-            await self.producer.publish("worker_events", "lang_detect.done", event)
+            await self._publish_result(command, lang_code, prob)
 
         except Exception as e:
             logger.error(f"LangDetect failed: {e}")
             raise e
         finally:
-            if local_input.exists(): os.remove(local_input)
\ No newline at end of file
+            if os.path.exists(local_input_str): os.remove(local_input_str)
+
+    async def _publish_result(self, command: LanguageDetectCommand, lang_code: str | None, prob: float):
+        event = self._make_event(command, lang_code, prob)
+        await self.producer.publish("worker_events", "lang_detect.done", event)
+
+    @staticmethod
+    def _make_event(command: LanguageDetectCommand, lang_code: str | None, prob: float) -> LanguageDetectionCompletedEvent:
+        logger.info(f"Seg {command.index}: {lang_code} ({prob:.2%})")
+        return LanguageDetectionCompletedEvent(
+            job_id=command.job_id,
+            language=lang_code,
+            probability=prob,
+            index=command.index,
+            input_path=command.input_path,
+            start_ms=command.start_ms,
+            end_ms=command.end_ms,
+            ranged=command.ranged
+        )
+
+    async def _detect_many(self, commands: list[LanguageDetectCommand]) -> list[LanguageDetectionCompletedEvent | Exception]:
+        """Fetch all inputs concurrently and classify them in one forward pass."""
+        outcomes: list[LanguageDetectionCompletedEvent | Exception | None] = [None] * len(commands)
+        try:
+            inputs = await asyncio.gather(
+                *[self._load_input(c) for c in commands],
+                return_exceptions=True
+            )
+            ready = []
+            for i, outcome in enumerate(inputs):
+                if isinstance(outcome, Exception):
+                    logger.error(f"LangDetect fetch failed for {commands[i].job_id}_{commands[i].index}: {outcome}")
+                    outcomes[i] = outcome
+                else:
+                    ready.append(i)
+            if not ready:
+                return outcomes
+
+            audios = [inputs[i] for i in ready]
+            logger.info(f"Detecting language for batch of {len(ready)} chunks")
+
+            def _run_detect():
+                engine = VoxLinguaEngine.get_instance()
+                return engine.detect_batch(audios, self.crop_seconds)
+            try:
+                detections = await asyncio.to_thread(_run_detect)
+            except Exception as e:
+                logger.error(f"Batch LangDetect failed for {len(ready)} chunks: {e}")
+                for i in ready:
+                    outcomes[i] = e
+                return outcomes
+
+            for i, (lang_code, prob) in zip(ready, detections):
+                try:
+                    outcomes[i] = self._make_event(commands[i], lang_code, prob)
+                except Exception as e:
+                    outcomes[i] = e
+            return outcomes
+
+        finally:
+            for c in commands:
+                local_input_str = self._local_input(c)
+                if os.path.exists(local_input_str): os.remove(local_input_str)
+
+    async def _process_batch(self, commands: list[LanguageDetectCommand]) -> list[Exception | None]:
+        results: list[Exception | None] = []
+        for command, outcome in zip(commands, await self._detect_many(commands)):
+            if isinstance(outcome, Exception):
+                results.append(outcome)
+                continue
+            try:
+                await self.producer.publish("worker_events", "lang_detect.done", outcome)
+                results.append(None)
+            except Exception as e:
+                logger.error(f"Publishing failed for {command.job_id}_{command.index}: {e}")
+                results.append(e)
+        return results
+
+    async def handle_group_command(self, cmd_data: dict):
+        """Detect a whole chunk group in one forward pass and report it in one event.
+
+        Successful members are reported even when others fail; only the failed ones
+        are sent around again.
+        """
+        group = LanguageDetectGroupCommand(**cmd_data)
+        if self.cancellations and await self.cancellations.skip(group.job_id, "language detection group"):
+            return
+        outcomes = await self._detect_many(group.items)
+        results = [o for o in outcomes if not isinstance(o, Exception)]
+        if results:
+            event = LanguageDetectionGroupCompletedEvent(job_id=group.job_id, results=results)
+            await self.producer.publish("worker_events", "lang_detect_group.done", event)
+        failed = [(item, o) for item, o in zip(group.items, outcomes) if isinstance(o, Exception)]
+        if failed:
+            await retry_failed_members(self.producer, "audio_ops", "cmd.lang_detect_group", group, failed)
@@ -1,8 +1,11 @@
 import logging
 import os
+import numpy as np
 import torch
 from speechbrain.inference.classifiers import EncoderClassifier
 
+from shared_storage.wav import WavLayout
+
 logger = logging.getLogger(__name__)
 
 WHISPER_SUPPORTED_LANGUAGES = {
@@ -16,12 +19,34 @@ WHISPER_SUPPORTED_LANGUAGES = {
     "zh", "yue"
 }
 
+SAMPLE_RATE = 16000
+
 LEGACY_MAPPING = {
     "iw": "he",
     "jv": "jw",
     "mold": "ro",
 }
 
+def pcm_to_signal(pcm: memoryview | bytes, layout: WavLayout) -> torch.Tensor:
+    """1-D float signal of an in-memory 16 kHz mono chunk, as classifier.load_audio returns it.
+
+    A memoryview (e.g. into the PCM store's mapping) is released once converted.
+    """
+    try:
+        if (layout.sample_rate, layout.channels, layout.sample_width) != (SAMPLE_RATE, 1, 2):
+            raise ValueError(
+                f"Expected 16-bit mono PCM at {SAMPLE_RATE} Hz, got {layout.sample_width * 8}-bit "
+                f"x{layout.channels} at {layout.sample_rate} Hz"
+            )
+        samples = np.frombuffer(pcm, dtype="<i2")
+        signal = samples.astype(np.float32) / 32768.0
+        del samples
+        return torch.from_numpy(signal)
+    finally:
+        if isinstance(pcm, memoryview):
+            pcm.release()
+
+
 class VoxLinguaEngine:
     _instance = None
 
@@ -44,11 +69,32 @@ class VoxLinguaEngine:
         return cls._instance
 
     def detect(self, audio_path: str):
-        signal = self.classifier.load_audio(audio_path)
-        prediction = self.classifier.classify_batch(signal)
+        return self.detect_batch([audio_path])[0]
+
+    def detect_batch(
+            self,
+            audios: list[str | torch.Tensor],
+            crop_seconds: float | None = None
+    ) -> list[tuple[str | None, float]]:
+        """Classify several chunks, given as WAV paths or in-memory signals, in one forward pass.
+
+        Signals are optionally cropped to their first `crop_seconds`, then zero-padded
+        to the longest; relative lengths let the encoder ignore the padding.
+        """
+        signals = [self.classifier.load_audio(a) if isinstance(a, str) else a for a in audios]
+        if crop_seconds:
+            max_samples = int(crop_seconds * SAMPLE_RATE)
+            signals = [s[:max_samples] for s in signals]
+        lengths = torch.tensor([len(s) for s in signals], dtype=torch.float32)
+        batch = torch.nn.utils.rnn.pad_sequence(signals, batch_first=True)
+        wav_lens = lengths / lengths.max().clamp(min=1)
+
+        prediction = self.classifier.classify_batch(batch, wav_lens)
+        scores = prediction[1].exp().tolist()
+        return [self._resolve(label, score) for label, score in zip(prediction[3], scores)]
 
-        accuracy = prediction[1].exp().item()
-        label_raw = prediction[3][0]
+    @staticmethod
+    def _resolve(label_raw: str, accuracy: float) -> tuple[str | None, float]:
         lang_code = label_raw.split(":")[0].strip()
 
         if lang_code in LEGACY_MAPPING:
@@ -60,4 +106,4 @@ class VoxLinguaEngine:
                 f"Detected language '{lang_code}' is not supported by Whisper. Ignoring (will use auto-detect).")
             return None, accuracy
 
-        return lang_code, accuracy
\ No newline at end of file
+        return lang_code, accuracy
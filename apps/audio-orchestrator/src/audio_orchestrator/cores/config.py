@@ -12,7 +12,20 @@ class Settings(BaseSettings):
     S3_ACCESS_KEY: str = "S3_ACCESS_KEY"
     S3_SECRET_KEY: str = "S3_SECRET_KEY"
     S3_BUCKET_NAME: str = "audio-management"
+    S3_BACKEND: str = "boto3"
     CLEANUP_TARGETS: List[str] = ["clean", "segments", "enhanced"]
+    CONSUMER_CONCURRENCY: int = 8
+    # Seconds a "not cancelled" answer is trusted; cancellations are pushed over job_progress:*
+    CANCELLATION_CACHE_TTL: float = 5.0
+    # "chunk" detects the language of every chunk; "job" fixes it for the whole job once
+    # the first LANGUAGE_SAMPLE_CHUNKS detections agree with enough confidence
+    LANGUAGE_MODE: str = "chunk"
+    LANGUAGE_SAMPLE_CHUNKS: int = 3
+    LANGUAGE_CONFIDENCE_THRESHOLD: float = 0.8
+    # 0 sends one command per chunk; otherwise chunks travel enhance -> lang_detect -> recognize
+    # in groups covering about this many seconds of audio, at most CHUNK_GROUP_MAX_SIZE chunks
+    CHUNK_GROUP_TARGET_SEC: int = 0
+    CHUNK_GROUP_MAX_SIZE: int = 32
 
     class Config:
         env_file = ".env"
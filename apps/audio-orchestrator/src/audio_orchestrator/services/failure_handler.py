@@ -2,6 +2,7 @@ import logging
 import json
 import asyncio
 from audio_orchestrator.services.state_manager import StateManager, JobStatus
+from shared_messaging.cancellation import CancellationCache
 from shared_storage.s3 import S3Client
 from shared_messaging.producer import RabbitMQProducer
 from shared_schemas.events import JobFailedEvent, JobCancelledEvent
@@ -10,10 +11,17 @@ logger = logging.getLogger(__name__)
 
 
 class FailureHandlerService:
-    def __init__(self, state_manager: StateManager, s3: S3Client, producer: RabbitMQProducer):
+    def __init__(
+            self,
+            state_manager: StateManager,
+            s3: S3Client,
+            producer: RabbitMQProducer,
+            cancellations: CancellationCache | None = None
+    ):
         self.state = state_manager
         self.s3 = s3
         self.producer = producer
+        self.cancellations = cancellations
 
     async def terminate_job(self, job_id: str, status: JobStatus, reason: str):
         logger.warning(f"TERMINATING JOB {job_id}: {status} - {reason}")
@@ -70,6 +78,8 @@ class FailureHandlerService:
     async def handle_cancellation_command(self, cmd_data: dict):
         job_id = cmd_data.get("job_id")
         reason = cmd_data.get("reason", "Cancelled by user")
+        if self.cancellations:
+            self.cancellations.mark_cancelled(job_id)
         await self.terminate_job(
             job_id,
             JobStatus.CANCELLED,
@@ -1,10 +1,78 @@
+import asyncio
 import json
 import logging
 from redis.asyncio import Redis
 from enum import Enum
 
+from shared_messaging.cancellation import CancellationCache
+
 logger = logging.getLogger(__name__)
 
+# KEYS[1] = job hash, KEYS[2] = steps hash. Marks ARGV[1] (if any) and, when every step
+# in ARGV[3..] is done, claims ARGV[2] with HSETNX so only one caller ever wins it.
+# Returns -1 if the job is cancelled, 1 if the claim was won, 0 otherwise.
+_CLAIM_LUA = """
+local function claim(steps_key, step, first_required, last_required)
+    if step == '' then
+        return 0
+    end
+    for i = first_required, last_required do
+        if redis.call('HGET', steps_key, ARGV[i]) ~= '1' then
+            return 0
+        end
+    end
+    return redis.call('HSETNX', steps_key, step, '1')
+end
+"""
+
+_ADVANCE_LUA = _CLAIM_LUA + """
+if redis.call('HGET', KEYS[1], 'status') == 'CANCELLED' then
+    return -1
+end
+if ARGV[1] ~= '' then
+    redis.call('HSET', KEYS[2], ARGV[1], '1')
+end
+return claim(KEYS[2], ARGV[2], 3, #ARGV)
+"""
+
+# KEYS: job hash, steps hash, counter hash, chunk sorted set, chunk meta hash.
+# ARGV: job id, status, progress base, progress span, claim step, number of required
+#       steps N, the N required steps, then (chunk index, start_ms, segment meta) per chunk.
+# Chunks are members of a sorted set scored by start_ms, so a redelivered event
+# collapses onto its first entry and ZCARD is the number of distinct chunks done.
+# Both chunk keys expire together with the job hash.
+# Returns {done, total, claimed}, or {-1, 0, 0} if the job is cancelled.
+_RECORD_CHUNK_LUA = _CLAIM_LUA + """
+if redis.call('HGET', KEYS[1], 'status') == 'CANCELLED' then
+    return {-1, 0, 0}
+end
+local last_required = 6 + tonumber(ARGV[6])
+for i = last_required + 1, #ARGV, 3 do
+    redis.call('ZADD', KEYS[4], ARGV[i + 1], ARGV[i])
+    redis.call('HSET', KEYS[5], ARGV[i], ARGV[i + 2])
+end
+local ttl = redis.call('TTL', KEYS[1])
+if ttl > 0 then
+    redis.call('EXPIRE', KEYS[4], ttl)
+    redis.call('EXPIRE', KEYS[5], ttl)
+end
+local done = redis.call('ZCARD', KEYS[4])
+local total = tonumber(redis.call('HGET', KEYS[3], 'total')) or 9999
+if total > 0 then
+    local progress = tonumber(ARGV[3]) + math.floor(done / total * tonumber(ARGV[4]))
+    redis.call('HSET', KEYS[1], 'status', ARGV[2], 'progress', tostring(progress), 'message', '')
+    redis.call('PUBLISH', 'job_progress:' .. ARGV[1], cjson.encode({
+        job_id = ARGV[1], status = ARGV[2], progress = progress, message = ''
+    }))
+end
+local claimed = 0
+if done >= total then
+    redis.call('HSET', KEYS[2], 'recognition_all', '1')
+    claimed = claim(KEYS[2], ARGV[5], 7, last_required)
+end
+return {done, total, claimed}
+"""
+
 class JobStatus(str, Enum):
     QUEUED = "QUEUED"
     PREPROCESSING = "PREPROCESSING"
@@ -21,6 +89,8 @@ class StateManager:
     def __init__(self, redis: Redis):
         self.redis = redis
         self.ttl = 3600
+        self._advance = redis.register_script(_ADVANCE_LUA)
+        self._record_chunk = redis.register_script(_RECORD_CHUNK_LUA)
 
     async def init_job(self, job_id: str, user_id: str):
         key = f"job:{job_id}"
@@ -34,11 +104,6 @@ class StateManager:
         await self.redis.expire(key, self.ttl)
 
     async def update_progress(self, job_id: str, status: JobStatus, progress: int, message: str = ""):
-        await self.redis.hmset(f"job:{job_id}", {
-            "status": status,
-            "progress": str(progress),
-            "message": message
-        })
         channel_name = f"job_progress:{job_id}"
         payload = json.dumps({
             "job_id": job_id,
@@ -46,7 +111,16 @@ class StateManager:
             "progress": progress,
             "message": message
         })
-        await self.redis.publish(channel_name, payload)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            await (
+                pipe.hset(f"job:{job_id}", mapping={
+                    "status": status,
+                    "progress": str(progress),
+                    "message": message
+                })
+                .publish(channel_name, payload)
+                .execute()
+            )
         logger.info(f"Job {job_id}: {status} - {progress}%")
 
     async def get_job_status(self, job_id: str) -> str | None:
@@ -55,3 +129,71 @@ class StateManager:
         if status is None:
             return None
         return status.decode() if isinstance(status, (bytes, bytearray)) else status
+
+    async def is_cancelled(self, job_id: str) -> bool:
+        return await self.get_job_status(job_id) == JobStatus.CANCELLED.value
+
+    async def watch_cancellations(self, cache: CancellationCache):
+        """Feed `cache` from the job_progress:* channels until cancelled."""
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.psubscribe("job_progress:*")
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    try:
+                        payload = json.loads(message["data"])
+                    except ValueError:
+                        continue
+                    if payload.get("status") == JobStatus.CANCELLED.value and payload.get("job_id"):
+                        cache.mark_cancelled(payload["job_id"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cancellation watcher disconnected, resubscribing: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def advance(self, job_id: str, mark: str = "", claim: str = "", requires: tuple[str, ...] = ()) -> int:
+        """Mark a step and try to claim another in one round trip; see _ADVANCE_LUA."""
+        return await self._advance(
+            keys=[f"job:{job_id}", f"job:{job_id}:steps"],
+            args=[mark, claim, *requires]
+        )
+
+    async def release(self, job_id: str, step: str):
+        await self.redis.hdel(f"job:{job_id}:steps", step)
+
+    async def record_chunks(
+            self,
+            job_id: str,
+            chunks: list[tuple[int, int, str]],
+            progress_base: int,
+            progress_span: int,
+            claim: str,
+            requires: tuple[str, ...]
+    ) -> tuple[int, int, int]:
+        """Store recognized (index, start_ms, meta) chunks idempotently, update progress, and try to claim `claim`."""
+        done, total, claimed = await self._record_chunk(
+            keys=[
+                f"job:{job_id}", f"job:{job_id}:steps", f"job:{job_id}:cnt",
+                f"job:{job_id}:chunks", f"job:{job_id}:chunk_meta"
+            ],
+            args=[
+                job_id, JobStatus.PROCESSING.value, progress_base, progress_span,
+                claim, len(requires), *requires, *[v for chunk in chunks for v in chunk]
+            ]
+        )
+        return done, total, claimed
+
+    async def get_chunks_manifest(self, job_id: str) -> list[dict]:
+        """Recognized chunks' metadata, ordered by start_ms."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            indexes, metas = await (
+                pipe.zrange(f"job:{job_id}:chunks", 0, -1)
+                .hgetall(f"job:{job_id}:chunk_meta")
+                .execute()
+            )
+        return [json.loads(metas[i]) for i in indexes]
@@ -1,48 +1,66 @@
 import asyncio
 import logging
 import json
-import os
-import tempfile
 
 from audio_orchestrator.cores.config import settings
 # Import commands
 from shared_schemas.commands import (
     PreprocessCommand, SegmentCommand, RecognizeCommand,
-    TranscodeCommand, EnhanceCommand, DiarizeCommand, PostProcessCommand, LanguageDetectCommand
+    TranscodeCommand, EnhanceCommand, DiarizeCommand, PostProcessCommand, LanguageDetectCommand,
+    EnhanceGroupCommand, LanguageDetectGroupCommand, RecognizeGroupCommand
 )
 # Import events
 from shared_schemas.events import (
     FileUploadedEvent, PreprocessCompletedEvent, SegmentCompletedEvent,
     RecognitionCompletedEvent, TranscodeCompletedEvent,
-    DiarizationCompletedEvent, EnhancementCompletedEvent, JobCompletedEvent, LanguageDetectionCompletedEvent
+    DiarizationCompletedEvent, EnhancementCompletedEvent, JobCompletedEvent, LanguageDetectionCompletedEvent,
+    EnhancementGroupCompletedEvent, LanguageDetectionGroupCompletedEvent, RecognitionGroupCompletedEvent
 )
 
 from audio_orchestrator.services.state_manager import StateManager, JobStatus
+from shared_messaging.cancellation import CancellationCache
 from shared_messaging.producer import RabbitMQProducer
 from shared_storage.s3 import S3Client  # Cần để upload file transcript tạm
 
 logger = logging.getLogger(__name__)
 
+POSTPROCESS_REQUIRES = ("recognition_all", "diarization", "transcode")
+
 
 class WorkflowOrchestrator:
-    def __init__(self, producer: RabbitMQProducer, state_manager: StateManager, s3: S3Client):
+    def __init__(
+            self,
+            producer: RabbitMQProducer,
+            state_manager: StateManager,
+            s3: S3Client,
+            cancellations: CancellationCache | None = None
+    ):
         self.producer = producer
         self.state = state_manager
         self.s3 = s3
+        self.cancellations = cancellations or CancellationCache(state_manager.is_cancelled)
 
     async def _is_step_completed(self, job_id: str, step_key: str) -> bool:
         return await self.state.redis.hget(f"job:{job_id}:steps", step_key) == "1"
 
-    async def _mark_step_completed(self, job_id: str, step_key: str):
-        await self.state.redis.hset(f"job:{job_id}:steps", step_key, "1")
+    @staticmethod
+    def _log_cancelled(job_id: str):
+        logger.warning(f"Job {job_id} was CANCELLED. Stopping workflow.")
 
     async def _is_cancelled(self, job_id: str) -> bool:
-        status = await self.state.get_job_status(job_id)
-        if status == "CANCELLED":
-            logger.warning(f"Job {job_id} was CANCELLED. Stopping workflow.")
+        if await self.cancellations.is_cancelled(job_id):
+            self._log_cancelled(job_id)
             return True
         return False
 
+    async def _run_claimed(self, job_id: str, step: str, action):
+        """Run `action` for a step this handler just claimed; give the claim back if it fails."""
+        try:
+            await action()
+        except Exception:
+            await self.state.release(job_id, step)
+            raise
+
     async def handle_file_uploaded(self, event: dict):
         data = FileUploadedEvent(**event)
         job_id = data.job_id
@@ -59,146 +77,281 @@ class WorkflowOrchestrator:
 
     async def handle_preprocess_done(self, event: dict):
         data = PreprocessCompletedEvent(**event)
-        if await self._is_cancelled(data.job_id): return
-        await self._mark_step_completed(data.job_id, "preprocess")
+        if data.hls_path:
+            # The preprocessor already transcoded (and reports transcode.done itself);
+            # take the trigger before segmenting starts so no cmd.transcode goes out.
+            await self.state.advance(data.job_id, claim="transcode_trigger")
+        claimed = await self.state.advance(data.job_id, mark="preprocess", claim="segmenting_trigger")
+        if claimed < 0:
+            self._log_cancelled(data.job_id)
+            return
 
-        if not await self._is_step_completed(data.job_id, "segmenting_trigger"):
+        async def trigger():
             await self.state.update_progress(data.job_id, JobStatus.SEGMENTING, 15, "Analyzing structure...")
             cmd_seg = SegmentCommand(job_id=data.job_id, input_path=data.clean_audio_path)
             await self.producer.publish("audio_ops", "cmd.segment", cmd_seg)
             cmd_diar = DiarizeCommand(job_id=data.job_id, input_path=data.clean_audio_path)
             await self.producer.publish("audio_ops", "cmd.diarize", cmd_diar)
-            await self._mark_step_completed(data.job_id, "segmenting_trigger")
+        if claimed:
+            await self._run_claimed(data.job_id, "segmenting_trigger", trigger)
 
     async def handle_segment_done(self, event: dict):
         data = SegmentCompletedEvent(**event)
-        if await self._is_cancelled(data.job_id): return
         job_id = data.job_id
+        claimed = await self.state.advance(job_id, claim="transcode_trigger")
+        if claimed < 0:
+            self._log_cancelled(job_id)
+            return
         total_segments = len(data.segments)
         await self.state.redis.hset(f"job:{job_id}:cnt", "total", str(total_segments))
-        await self.state.redis.hset(f"job:{job_id}:cnt", "done", "0")
-        if not await self._is_step_completed(job_id, "transcode_trigger"):
+
+        async def trigger():
             cmd_trans = TranscodeCommand(job_id=job_id, input_path=data.audio_path)
             await self.producer.publish("audio_ops", "cmd.transcode", cmd_trans)
-            await self._mark_step_completed(job_id, "transcode_trigger")
-        for seg in data.segments:
-            cmd = EnhanceCommand(
+        if claimed:
+            await self._run_claimed(job_id, "transcode_trigger", trigger)
+        commands = [
+            EnhanceCommand(
                 job_id=job_id,
                 index=seg['index'],
                 s3_path=seg['s3_path'],
                 start_ms=seg['start_ms'],
-                end_ms=seg['end_ms']
+                end_ms=seg['end_ms'],
+                ranged=seg.get('ranged', False)
             )
-            await self.producer.publish("audio_ops", "cmd.enhance", cmd)
+            for seg in data.segments
+        ]
+        group_size = self._group_size(commands)
+        if group_size > 1:
+            logger.info(f"Job {job_id}: sending {total_segments} chunks in groups of {group_size}")
+            for i in range(0, len(commands), group_size):
+                group = EnhanceGroupCommand(job_id=job_id, items=commands[i:i + group_size])
+                await self.producer.publish("audio_ops", "cmd.enhance_group", group)
+        else:
+            for cmd in commands:
+                await self.producer.publish("audio_ops", "cmd.enhance", cmd)
         await self.state.update_progress(job_id, JobStatus.PROCESSING, 30, f"Processing {total_segments} chunks...")
 
+    @staticmethod
+    def _group_size(commands: list[EnhanceCommand]) -> int:
+        """Chunks per group, so that each group covers about CHUNK_GROUP_TARGET_SEC of audio."""
+        if settings.CHUNK_GROUP_TARGET_SEC <= 0 or len(commands) < 2:
+            return 1
+        total_ms = sum(c.end_ms - c.start_ms for c in commands)
+        if total_ms <= 0:
+            return 1
+        avg_ms = total_ms / len(commands)
+        size = round(settings.CHUNK_GROUP_TARGET_SEC * 1000 / avg_ms)
+        return max(1, min(size, settings.CHUNK_GROUP_MAX_SIZE))
+
     async def handle_diarization_done(self, event: dict):
         try:
             data = DiarizationCompletedEvent(**event)
             if await self._is_cancelled(data.job_id): return
             job_id = data.job_id
             s3_key = f"analysis/{job_id}/diarization.json"
-            diar_content = json.dumps([s.model_dump() for s in data.speaker_segments], ensure_ascii=False)
-            with tempfile.NamedTemporaryFile(mode='w+', delete=False, encoding='utf-8') as tmp:
-                tmp.write(diar_content)
-                tmp_path = tmp.name
-            await self.s3.upload_file(tmp_path, s3_key)
-            os.remove(tmp_path)
-            await self._mark_step_completed(job_id, "diarization")
-            await self._check_finish_and_trigger_post(job_id)
+            await self.s3.put_json([s.model_dump() for s in data.speaker_segments], s3_key)
+            await self._complete_step(job_id, "diarization")
         except Exception as e:
             logger.error(f"Error in handle_diarization_done: {e}")
+            raise
 
     async def handle_transcode_done(self, event: dict):
         try:
             data = TranscodeCompletedEvent(**event)
-            if await self._is_cancelled(data.job_id): return
-            await self._mark_step_completed(data.job_id, "transcode")
-            await self._check_finish_and_trigger_post(data.job_id)
+            await self._complete_step(data.job_id, "transcode")
         except Exception as e:
             logger.error(f"Error in handle_transcode_done: {e}")
+            raise
 
-    async def handle_enhancement_done(self, event: dict):
-        try:
-            data = EnhancementCompletedEvent(**event)
-            if await self._is_cancelled(data.job_id): return
-            logger.info(f"Enhance done {data.job_id}:{data.index}. Sending to LangDetect.")
-            cmd_detect = LanguageDetectCommand(
+    async def _job_language(self, job_id: str) -> str | None:
+        if settings.LANGUAGE_MODE != "job":
+            return None
+        return await self.state.redis.hget(f"job:{job_id}:lang", "language")
+
+    async def _record_language_sample(self, job_id: str, language: str, probability: float):
+        key = f"job:{job_id}:lang"
+        async with self.state.redis.pipeline(transaction=True) as pipe:
+            *_, stats, _ = await (
+                pipe.hincrbyfloat(key, f"score:{language}", probability)
+                .hincrby(key, "samples", 1)
+                .hgetall(key)
+                .expire(key, self.state.ttl)
+                .execute()
+            )
+        samples = int(stats["samples"])
+        if "language" in stats or samples < settings.LANGUAGE_SAMPLE_CHUNKS:
+            return
+        # Mean probability over all samples, so disagreeing chunks pull the confidence down.
+        scores = {k.removeprefix("score:"): float(v) for k, v in stats.items() if k.startswith("score:")}
+        best = max(scores, key=scores.get)
+        confidence = scores[best] / samples
+        if confidence < settings.LANGUAGE_CONFIDENCE_THRESHOLD:
+            logger.info(f"Job {job_id}: language still undecided ({best} {confidence:.2%} over {samples} chunks)")
+            return
+        if await self.state.redis.hsetnx(key, "language", best):
+            logger.info(f"Job {job_id}: language fixed to {best} ({confidence:.2%} over {samples} chunks)")
+
+    @staticmethod
+    def _route_enhanced(
+            results: list[EnhancementCompletedEvent],
+            language: str | None
+    ) -> tuple[list[RecognizeCommand], list[LanguageDetectCommand]]:
+        """Chunks go straight to recognition once the job language is fixed, else to detection."""
+        if language:
+            return [
+                RecognizeCommand(
+                    job_id=data.job_id,
+                    input_path=data.s3_path,
+                    index=data.index,
+                    start_ms=data.start_ms,
+                    end_ms=data.end_ms,
+                    language=language,
+                    ranged=data.ranged
+                )
+                for data in results
+            ], []
+        return [], [
+            LanguageDetectCommand(
                 job_id=data.job_id,
                 input_path=data.s3_path,
                 index=data.index,
                 start_ms=data.start_ms,
-                end_ms=data.end_ms
+                end_ms=data.end_ms,
+                ranged=data.ranged
             )
-            await self.producer.publish("audio_ops", "cmd.lang_detect", cmd_detect)
+            for data in results
+        ]
+
+    @staticmethod
+    def _recognize_after_detection(data: LanguageDetectionCompletedEvent) -> RecognizeCommand:
+        return RecognizeCommand(
+            job_id=data.job_id,
+            input_path=data.input_path,
+            index=data.index,
+            start_ms=data.start_ms,
+            end_ms=data.end_ms,
+            language=data.language,
+            ranged=data.ranged
+        )
+
+    async def handle_enhancement_done(self, event: dict):
+        try:
+            data = EnhancementCompletedEvent(**event)
+            if await self._is_cancelled(data.job_id): return
+            language = await self._job_language(data.job_id)
+            recognize, detect = self._route_enhanced([data], language)
+            if recognize:
+                logger.info(f"Enhance done {data.job_id}:{data.index}. Sending to Recognize ({language}).")
+                await self.producer.publish("audio_ops", "cmd.recognize", recognize[0])
+            else:
+                logger.info(f"Enhance done {data.job_id}:{data.index}. Sending to LangDetect.")
+                await self.producer.publish("audio_ops", "cmd.lang_detect", detect[0])
         except Exception as e:
             logger.error(f"Error handle_enhancement_done: {e}")
 
+    async def handle_enhancement_group_done(self, event: dict):
+        try:
+            data = EnhancementGroupCompletedEvent(**event)
+            if await self._is_cancelled(data.job_id): return
+            language = await self._job_language(data.job_id)
+            recognize, detect = self._route_enhanced(data.results, language)
+            if recognize:
+                logger.info(f"Enhance done {data.job_id}: {len(recognize)} chunks. Sending to Recognize ({language}).")
+                group = RecognizeGroupCommand(job_id=data.job_id, items=recognize)
+                await self.producer.publish("audio_ops", "cmd.recognize_group", group)
+            if detect:
+                logger.info(f"Enhance done {data.job_id}: {len(detect)} chunks. Sending to LangDetect.")
+                group = LanguageDetectGroupCommand(job_id=data.job_id, items=detect)
+                await self.producer.publish("audio_ops", "cmd.lang_detect_group", group)
+        except Exception as e:
+            logger.error(f"Error handle_enhancement_group_done: {e}")
+
     async def handle_lang_detect_done(self, event: dict):
         try:
             data = LanguageDetectionCompletedEvent(**event)
             if await self._is_cancelled(data.job_id): return
+            if settings.LANGUAGE_MODE == "job" and data.language:
+                await self._record_language_sample(data.job_id, data.language, data.probability)
             logger.info(f"LangDetect done {data.job_id}:{data.index} ({data.language}). Sending to Recognize.")
-            cmd_recog = RecognizeCommand(
-                job_id=data.job_id,
-                input_path=data.input_path,
-                index=data.index,
-                start_ms=data.start_ms,
-                end_ms=data.end_ms,
-                language=data.language
-            )
-            await self.producer.publish("audio_ops", "cmd.recognize", cmd_recog)
+            await self.producer.publish("audio_ops", "cmd.recognize", self._recognize_after_detection(data))
         except Exception as e:
             logger.error(f"Error handle_lang_detect_done: {e}")
 
-    async def handle_recognition_done(self, event: dict):
+    async def handle_lang_detect_group_done(self, event: dict):
         try:
-            logger.debug(f"Received Recognition Event: {event}")
-            data = RecognitionCompletedEvent(**event)
+            data = LanguageDetectionGroupCompletedEvent(**event)
             if await self._is_cancelled(data.job_id): return
-            job_id = data.job_id
-            segment_meta = {
+            if settings.LANGUAGE_MODE == "job":
+                for result in data.results:
+                    if result.language:
+                        await self._record_language_sample(data.job_id, result.language, result.probability)
+            logger.info(f"LangDetect done {data.job_id}: {len(data.results)} chunks. Sending to Recognize.")
+            group = RecognizeGroupCommand(
+                job_id=data.job_id,
+                items=[self._recognize_after_detection(r) for r in data.results]
+            )
+            await self.producer.publish("audio_ops", "cmd.recognize_group", group)
+        except Exception as e:
+            logger.error(f"Error handle_lang_detect_group_done: {e}")
+
+    async def _record_recognitions(self, job_id: str, results: list[RecognitionCompletedEvent]):
+        chunks = [
+            (data.index, data.start_ms, json.dumps({
                 "index": data.index,
                 "start_ms": data.start_ms,
                 "end_ms": data.end_ms,
                 "transcript_s3_path": data.transcript_s3_path
-            }
-            await self.state.redis.rpush(f"job:{job_id}:transcripts", json.dumps(segment_meta))
-            completed_count = await self.state.redis.hincrby(f"job:{job_id}:cnt", "done", 1)
-            total_count_str = await self.state.redis.hget(f"job:{job_id}:cnt", "total")
-            total_count = int(total_count_str) if total_count_str else 9999
-            logger.info(f"Job {job_id}: Recognized {completed_count}/{total_count}")
-            if total_count > 0:
-                progress_percent = 30 + int((completed_count / total_count) * 40)
-                await self.state.update_progress(job_id, JobStatus.PROCESSING, progress_percent)
-            if completed_count >= total_count:
-                await self._mark_step_completed(job_id, "recognition_all")
-                await self._check_finish_and_trigger_post(job_id)
+            }))
+            for data in results
+        ]
+        completed_count, total_count, claimed = await self.state.record_chunks(
+            job_id, chunks,
+            progress_base=30, progress_span=40,
+            claim="postprocess_triggered", requires=POSTPROCESS_REQUIRES
+        )
+        if completed_count < 0:
+            self._log_cancelled(job_id)
+            return
+        logger.info(f"Job {job_id}: Recognized {completed_count}/{total_count}")
+        if claimed:
+            await self._run_claimed(job_id, "postprocess_triggered", lambda: self._trigger_post(job_id))
+
+    async def handle_recognition_done(self, event: dict):
+        try:
+            logger.debug(f"Received Recognition Event: {event}")
+            data = RecognitionCompletedEvent(**event)
+            await self._record_recognitions(data.job_id, [data])
         except Exception as e:
             logger.error(f"Error in handle_recognition_done: {e}")
+            raise
+
+    async def handle_recognition_group_done(self, event: dict):
+        try:
+            data = RecognitionGroupCompletedEvent(**event)
+            await self._record_recognitions(data.job_id, data.results)
+        except Exception as e:
+            logger.error(f"Error in handle_recognition_group_done: {e}")
+            raise
+
+    async def _complete_step(self, job_id: str, step: str):
+        claimed = await self.state.advance(
+            job_id, mark=step, claim="postprocess_triggered", requires=POSTPROCESS_REQUIRES
+        )
+        if claimed < 0:
+            self._log_cancelled(job_id)
+        elif claimed:
+            await self._run_claimed(job_id, "postprocess_triggered", lambda: self._trigger_post(job_id))
 
-    async def _check_finish_and_trigger_post(self, job_id: str):
-        if await self._is_cancelled(job_id): return
-        is_recog_done = await self._is_step_completed(job_id, "recognition_all")
-        is_diar_done = await self._is_step_completed(job_id, "diarization")
-        is_trans_done = await self._is_step_completed(job_id, "transcode")
-        is_already_triggered = await self._is_step_completed(job_id, "postprocess_triggered")
-        if is_recog_done and is_diar_done and is_trans_done and not is_already_triggered:
-            logger.info(f"Job {job_id}: All inputs ready. Preparing Manifest for PostProcess...")
-            await self._mark_step_completed(job_id, "postprocess_triggered")
-            raw_meta = await self.state.redis.lrange(f"job:{job_id}:transcripts", 0, -1)
-            chunks_meta = [json.loads(x) for x in raw_meta]
-            chunks_meta.sort(key=lambda x: x['start_ms'])
-            manifest_s3_key = f"analysis/{job_id}/segments_manifest.json"
-            with tempfile.NamedTemporaryFile(mode='w+', delete=False, encoding='utf-8') as tmp:
-                json.dump(chunks_meta, tmp, ensure_ascii=False)
-                tmp_path = tmp.name
-            await self.s3.upload_file(tmp_path, manifest_s3_key)
-            os.remove(tmp_path)
-            logger.info(f"Job {job_id}: Manifest uploaded to {manifest_s3_key}")
-            cmd = PostProcessCommand(job_id=job_id)
-            await self.producer.publish("audio_ops", "cmd.postprocess", cmd)
-            await self.state.update_progress(job_id, JobStatus.POST_PROCESSING, 80, "Finalizing...")
+    async def _trigger_post(self, job_id: str):
+        logger.info(f"Job {job_id}: All inputs ready. Preparing Manifest for PostProcess...")
+        chunks_meta = await self.state.get_chunks_manifest(job_id)
+        manifest_s3_key = f"analysis/{job_id}/segments_manifest.json"
+        await self.s3.put_json(chunks_meta, manifest_s3_key)
+        logger.info(f"Job {job_id}: Manifest uploaded to {manifest_s3_key}")
+        cmd = PostProcessCommand(job_id=job_id)
+        await self.producer.publish("audio_ops", "cmd.postprocess", cmd)
+        await self.state.update_progress(job_id, JobStatus.POST_PROCESSING, 80, "Finalizing...")
 
     async def handle_job_finalized(self, event: dict):
         try:
@@ -6,9 +6,10 @@ from audio_orchestrator.cores.config import settings
 from audio_orchestrator.services.state_manager import StateManager
 from audio_orchestrator.services.workflow import WorkflowOrchestrator
 from audio_orchestrator.services.failure_handler import FailureHandlerService
+from shared_messaging.cancellation import CancellationCache
 from shared_messaging.consumer import RabbitMQConsumer
 from shared_messaging.producer import RabbitMQProducer
-from shared_storage.s3 import S3Client
+from shared_storage.factory import create_s3_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,18 +21,25 @@ async def main():
 
     producer = RabbitMQProducer(settings.RABBITMQ_URL)
     await producer.connect()
-    consumer = RabbitMQConsumer(settings.RABBITMQ_URL, service_name="orchestrator")
+    consumer = RabbitMQConsumer(
+        settings.RABBITMQ_URL,
+        service_name="orchestrator",
+        default_concurrency=settings.CONSUMER_CONCURRENCY
+    )
     await consumer.connect()
 
-    s3 = S3Client(
+    s3 = create_s3_client(
+        settings.S3_BACKEND,
         bucket=settings.S3_BUCKET_NAME,
         endpoint=settings.S3_ENDPOINT,
         access_key=settings.S3_ACCESS_KEY,
         secret_key=settings.S3_SECRET_KEY
     )
     state_manager = StateManager(redis)
-    workflow = WorkflowOrchestrator(producer, state_manager, s3)
-    failure_handler = FailureHandlerService(state_manager, s3, producer)
+    cancellations = CancellationCache(state_manager.is_cancelled, ttl=settings.CANCELLATION_CACHE_TTL)
+    cancellation_watcher = asyncio.create_task(state_manager.watch_cancellations(cancellations))
+    workflow = WorkflowOrchestrator(producer, state_manager, s3, cancellations)
+    failure_handler = FailureHandlerService(state_manager, s3, producer, cancellations)
 
     await consumer.subscribe("media_events", "file.uploaded", workflow.handle_file_uploaded)
     await consumer.subscribe("worker_events", "preprocess.done", workflow.handle_preprocess_done)
@@ -39,6 +47,9 @@ async def main():
     await consumer.subscribe("worker_events", "enhancement.done", workflow.handle_enhancement_done)
     await consumer.subscribe("worker_events", "lang_detect.done", workflow.handle_lang_detect_done)
     await consumer.subscribe("worker_events", "recognition.done", workflow.handle_recognition_done)
+    await consumer.subscribe("worker_events", "enhancement_group.done", workflow.handle_enhancement_group_done)
+    await consumer.subscribe("worker_events", "lang_detect_group.done", workflow.handle_lang_detect_group_done)
+    await consumer.subscribe("worker_events", "recognition_group.done", workflow.handle_recognition_group_done)
     await consumer.subscribe("worker_events", "diarization.done", workflow.handle_diarization_done)
     await consumer.subscribe("worker_events", "transcode.done", workflow.handle_transcode_done)
     await consumer.subscribe("worker_events", "job.finalized", workflow.handle_job_finalized)
@@ -49,8 +60,9 @@ async def main():
     try:
         await asyncio.Future()
     finally:
-        await producer.close()
+        cancellation_watcher.cancel()
         await consumer.close()
+        await producer.close()
         await redis.close()
 
 
@@ -0,0 +1,216 @@
+"""Compare align_transcript_with_diarization against the pre-interval-index version.
+
+Usage, from apps/audio-postprocessor:
+
+    python benchmarks/bench_alignment.py [--cases 3000] [--sizes 3000:300,30000:3000]
+
+First checks that both implementations give identical output on randomized
+inputs (unsorted words, zero- and negative-length words, overlapping turns, a
+literal UNKNOWN label), then times them on synthetic transcripts.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from audio_postprocessor.utils.alignment import align_transcript_with_diarization  # noqa: E402
+
+
+# --- Previous implementation, kept verbatim as the reference -----------------
+
+def _legacy_calculate_overlap(seg1_start, seg1_end, seg2_start, seg2_end):
+    overlap_start = max(seg1_start, seg2_start)
+    overlap_end = min(seg1_end, seg2_end)
+    return max(0, overlap_end - overlap_start)
+
+
+def _legacy_get_best_speaker_for_word(word, diarization_segments):
+    w_start = word.get('start')
+    w_end = word.get('end')
+    best_speaker = "UNKNOWN"
+    max_overlap = 0
+    candidate_segments = []
+    for spk in diarization_segments:
+        if spk['end'] < w_start:
+            continue
+        elif spk['start'] > w_end:
+            continue
+        overlap = _legacy_calculate_overlap(w_start, w_end, spk['start'], spk['end'])
+        if overlap > 0:
+            if overlap > max_overlap:
+                max_overlap = overlap
+                best_speaker = spk['speaker']
+        if abs(spk['start'] - w_end) < 2.0 or abs(spk['end'] - w_start) < 2.0:
+            candidate_segments.append(spk)
+    if best_speaker != "UNKNOWN":
+        return best_speaker
+    min_distance = float('inf')
+    nearest_speaker = "UNKNOWN"
+    for spk in candidate_segments:
+        if w_end <= spk['start']:
+            dist = spk['start'] - w_end
+        elif w_start >= spk['end']:
+            dist = w_start - spk['end']
+        else:
+            dist = 0
+        if dist < min_distance:
+            min_distance = dist
+            nearest_speaker = spk['speaker']
+    return nearest_speaker
+
+
+def _legacy_merge_consecutive_segments(segments: list, max_gap: float = 2.0) -> list:
+    if not segments:
+        return []
+
+    merged = []
+    current = segments[0].copy()
+
+    for i in range(1, len(segments)):
+        next_seg = segments[i]
+        time_gap = next_seg['start'] - current['end']
+        if next_seg['speaker'] == current['speaker'] and time_gap <= max_gap:
+            current['text'] = current['text'] + ' ' + next_seg['text']
+            current['end'] = next_seg['end']
+        else:
+            merged.append(current)
+            current = next_seg.copy()
+
+    merged.append(current)
+
+    return merged
+
+
+def legacy_align_transcript_with_diarization(
+        word_segments: list,
+        diarization_segments: list,
+        merge_same_speaker: bool = True,
+        max_gap: float = 2.0
+) -> list:
+    words_with_speaker = []
+    sorted_diarization = sorted(diarization_segments, key=lambda x: x['start'])
+    for word in word_segments:
+        w_start = word.get('start')
+        w_end = word.get('end')
+        if w_start is None or w_end is None:
+            continue
+        speaker = _legacy_get_best_speaker_for_word(word, sorted_diarization)
+        if speaker == "UNKNOWN" and words_with_speaker:
+            speaker = words_with_speaker[-1]['speaker']
+        words_with_speaker.append({
+            "word": word.get("word", ""),
+            "start": w_start,
+            "end": w_end,
+            "speaker": speaker
+        })
+
+    if not words_with_speaker:
+        return []
+
+    final_segments = []
+    for diar_seg in sorted_diarization:
+        segment_words = []
+        for w in words_with_speaker:
+            if (w['start'] >= diar_seg['start'] and w['end'] <= diar_seg['end']) or \
+                    (_legacy_calculate_overlap(w['start'], w['end'], diar_seg['start'], diar_seg['end']) > 0):
+                if w['speaker'] == diar_seg['speaker']:
+                    segment_words.append(w)
+        if segment_words:
+            final_segments.append({
+                "speaker": diar_seg['speaker'],
+                "start": segment_words[0]['start'],
+                "end": segment_words[-1]['end'],
+                "text": " ".join([w['word'] for w in segment_words]).strip()
+            })
+
+    if merge_same_speaker and final_segments:
+        final_segments = _legacy_merge_consecutive_segments(final_segments, max_gap)
+
+    return final_segments
+
+
+# --- Inputs ------------------------------------------------------------------
+
+def random_case(rng: random.Random, n_words: int, n_turns: int) -> tuple[list, list]:
+    span = max(n_words, n_turns) * 0.5 + 5
+    speakers = ["SPEAKER_00", "SPEAKER_01", "SPEAKER_02", "UNKNOWN"]
+    turns = []
+    for _ in range(n_turns):
+        start = round(rng.uniform(0, span), 2)
+        turns.append({"start": start, "end": round(start + rng.uniform(0, 6), 2), "speaker": rng.choice(speakers)})
+    words = []
+    for k in range(n_words):
+        start = round(rng.uniform(0, span), 2)
+        length = rng.choice([0.0, -0.1, rng.uniform(0.05, 0.8)])
+        word = {"word": f"w{k}", "start": start, "end": round(start + length, 2)}
+        if rng.random() < 0.02:
+            word.pop(rng.choice(["start", "end"]))
+        words.append(word)
+    if rng.random() < 0.5:
+        words.sort(key=lambda w: w.get("start", 0))
+    return words, turns
+
+
+def synthetic_transcript(n_words: int, n_turns: int, seed: int = 0) -> tuple[list, list]:
+    """Sorted words of ~0.3 s and back-to-back turns, like real diarized speech."""
+    rng = random.Random(seed)
+    words, t = [], 0.0
+    for k in range(n_words):
+        length = rng.uniform(0.15, 0.45)
+        words.append({"word": f"w{k}", "start": round(t, 3), "end": round(t + length, 3)})
+        t += length + rng.uniform(0.0, 0.2)
+    turn_length = t / n_turns
+    turns = [
+        {"start": round(i * turn_length, 3), "end": round((i + 1) * turn_length + 0.3, 3),
+         "speaker": f"SPEAKER_{i % 4:02d}"}
+        for i in range(n_turns)
+    ]
+    return words, turns
+
+
+# --- Runs --------------------------------------------------------------------
+
+def check_equivalence(cases: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    for case in range(cases):
+        words, turns = random_case(rng, rng.randint(0, 60), rng.randint(0, 12))
+        merge = rng.random() < 0.7
+        expected = legacy_align_transcript_with_diarization(words, turns, merge)
+        actual = align_transcript_with_diarization(words, turns, merge)
+        if actual != expected:
+            raise SystemExit(f"Mismatch on case {case}:\nwords={words}\nturns={turns}\n"
+                             f"expected={expected}\nactual={actual}")
+    print(f"{cases} randomized cases: identical output")
+
+
+def _time(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def run_timings(sizes: list[tuple[int, int]]) -> None:
+    print(f"{'words':>8} {'turns':>6} {'legacy s':>10} {'current s':>10} {'speedup':>8}")
+    for n_words, n_turns in sizes:
+        words, turns = synthetic_transcript(n_words, n_turns)
+        legacy = _time(legacy_align_transcript_with_diarization, words, turns)
+        current = _time(align_transcript_with_diarization, words, turns)
+        print(f"{n_words:>8} {n_turns:>6} {legacy:>10.3f} {current:>10.3f} {legacy / current:>7.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=3000, help="randomized equivalence cases")
+    parser.add_argument("--sizes", default="3000:300,30000:3000",
+                        help="comma-separated words:turns pairs to time")
+    args = parser.parse_args()
+
+    check_equivalence(args.cases)
+    run_timings([tuple(int(v) for v in size.split(":")) for size in args.sizes.split(",")])
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,9 @@ class Settings(BaseSettings):
     S3_ACCESS_KEY: str = "S3_ACCESS_KEY"
     S3_SECRET_KEY: str = "S3_SECRET_KEY"
     S3_BUCKET_NAME: str = "audio-management"
+    S3_BACKEND: str = "boto3"
+    CONSUMER_CONCURRENCY: int = 4
+    TRANSCRIPT_FETCH_CONCURRENCY: int = 32
 
     class Config:
         env_file = ".env"
@@ -1,9 +1,10 @@
+import asyncio
+import heapq
 import logging
-import json
-import os
-from pathlib import Path
+import time
 from datetime import datetime, timezone
 
+from audio_postprocessor.cores.config import settings
 from audio_postprocessor.utils.alignment import align_transcript_with_diarization
 from shared_messaging.producer import RabbitMQProducer
 from shared_storage.s3 import S3Client
@@ -16,43 +17,77 @@ class AudioPostProcessorService:
     def __init__(self, s3: S3Client, producer: RabbitMQProducer):
         self.s3 = s3
         self.producer = producer
-        self.temp_dir = Path("tmp/audio-postprocessor").resolve()
-        self.temp_dir.mkdir(parents=True, exist_ok=True)
 
     def _format_timestamp(self, seconds: float) -> str:
         m = int(seconds // 60)
         s = int(seconds % 60)
         return f"{m:02d}:{s:02d}"
 
+    @staticmethod
+    def _percentile(sorted_values: list[float], pct: float) -> float:
+        if not sorted_values:
+            return 0.0
+        idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+        return sorted_values[idx]
+
+    async def _fetch_and_merge(self, job_id: str, chunks_meta: list[dict]) -> list[dict]:
+        semaphore = asyncio.Semaphore(settings.TRANSCRIPT_FETCH_CONCURRENCY)
+        latencies: list[float] = []
+        order = sorted(range(len(chunks_meta)), key=lambda i: chunks_meta[i].get('start_ms', 0))
+        rank = {chunk_idx: pos for pos, chunk_idx in enumerate(order)}
+
+        async def _fetch(chunk_idx: int):
+            async with semaphore:
+                started = time.perf_counter()
+                words_data = await self.s3.read_json(chunks_meta[chunk_idx].get('transcript_s3_path'))
+                latencies.append(time.perf_counter() - started)
+                return chunk_idx, words_data
+
+        full_word_list = []
+        heap: list[tuple[int, int, list]] = []
+        next_rank = 0
+        tasks = [asyncio.create_task(_fetch(i)) for i in range(len(chunks_meta))]
+        try:
+            # Chunks arrive out of order; emit each one as soon as everything before it is in.
+            for finished in asyncio.as_completed(tasks):
+                chunk_idx, words_data = await finished
+                chunk = chunks_meta[chunk_idx]
+                heapq.heappush(heap, (rank[chunk_idx], chunk.get('start_ms', 0), words_data or []))
+                while heap and heap[0][0] == next_rank:
+                    _, start_ms, words = heapq.heappop(heap)
+                    chunk_start_sec = start_ms / 1000.0
+                    for word in words:
+                        word['start'] += chunk_start_sec
+                        word['end'] += chunk_start_sec
+                        full_word_list.append(word)
+                    next_rank += 1
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        latencies.sort()
+        logger.info(
+            f"Job {job_id}: fetched {len(latencies)} transcripts "
+            f"(p50={self._percentile(latencies, 50) * 1000:.0f}ms, "
+            f"p90={self._percentile(latencies, 90) * 1000:.0f}ms, "
+            f"p99={self._percentile(latencies, 99) * 1000:.0f}ms)"
+        )
+        return full_word_list
+
     async def handle_command(self, cmd_data: dict):
         job_id = cmd_data.get("job_id")
         logger.info(f"Starting Alignment & Post-processing for Job: {job_id}")
-        local_final_json = self.temp_dir / f"{job_id}_final.json"
-        local_final_txt = self.temp_dir / f"{job_id}_transcript.txt"
-        local_words_json = self.temp_dir / f"{job_id}_words_level.json"
-
         try:
             key_manifest = f"analysis/{job_id}/segments_manifest.json"
             chunks_meta = await self.s3.read_json(key_manifest)
             if not chunks_meta:
                 raise FileNotFoundError(f"Manifest not found at {key_manifest}")
-            full_word_list = []
             logger.info(f"Merging {len(chunks_meta)} transcript chunks...")
-            for chunk in chunks_meta:
-                s3_path = chunk.get('transcript_s3_path')
-                chunk_start_sec = chunk.get('start_ms', 0) / 1000.0
-                words_data = await self.s3.read_json(s3_path)
-                if not words_data: continue
-                for word in words_data:
-                    word['start'] += chunk_start_sec
-                    word['end'] += chunk_start_sec
-                    full_word_list.append(word)
+            full_word_list = await self._fetch_and_merge(job_id, chunks_meta)
             key_words_level = f"results/{job_id}/words_level.json"
-            local_words_str = str(local_words_json)
-            with open(local_words_str, 'w', encoding='utf-8') as f:
-                json.dump(full_word_list, f, ensure_ascii=False, indent=2)
-
-            await self.s3.upload_file(local_words_str, key_words_level)
+            await self.s3.put_json(full_word_list, key_words_level, indent=2)
             logger.info(f"Uploaded words-level transcript to {key_words_level}")
             key_diarization = f"analysis/{job_id}/diarization.json"
             diarization_data = await self.s3.read_json(key_diarization)
@@ -89,14 +124,8 @@ class AudioPostProcessorService:
                     "transcript_aligned": aligned_segments,
                 }
             }
-            local_json_str = str(local_final_json)
-            with open(local_json_str, 'w', encoding='utf-8') as f:
-                json.dump(final_output, f, ensure_ascii=False, indent=2)
-            await self.s3.upload_file(local_json_str, key_final_json)
-            local_txt_str = str(local_final_txt)
-            with open(local_txt_str, 'w', encoding='utf-8') as f:
-                f.write(full_text_content)
-            await self.s3.upload_file(local_txt_str, key_final_txt)
+            await self.s3.put_json(final_output, key_final_json, indent=2)
+            await self.s3.put_text(full_text_content, key_final_txt)
             logger.info(f"Uploaded final metadata to {key_final_json}")
             event = JobCompletedEvent(
                 job_id=job_id,
@@ -107,8 +136,4 @@ class AudioPostProcessorService:
 
         except Exception as e:
             logger.error(f"Post-processing failed for {job_id}: {e}", exc_info=True)
-            raise e
-
-        finally:
-            for p in [local_final_json, local_final_txt, local_words_json]:
-                if p.exists(): os.remove(p)
\ No newline at end of file
+            raise e
\ No newline at end of file
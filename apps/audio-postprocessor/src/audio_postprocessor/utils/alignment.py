@@ -1,7 +1,12 @@
 import logging
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
+NEAREST_SPEAKER_WINDOW = 2.0
+_MAX_PAIRS = 1 << 20
+
 
 def calculate_overlap(seg1_start, seg1_end, seg2_start, seg2_end):
     overlap_start = max(seg1_start, seg2_start)
@@ -50,58 +55,170 @@ def merge_consecutive_segments(segments: list, max_gap: float = 2.0) -> list:
 
     merged = []
     current = segments[0].copy()
+    parts = [current['text']]
 
     for i in range(1, len(segments)):
         next_seg = segments[i]
         time_gap = next_seg['start'] - current['end']
         if next_seg['speaker'] == current['speaker'] and time_gap <= max_gap:
-            current['text'] = current['text'] + ' ' + next_seg['text']
+            parts.append(next_seg['text'])
             current['end'] = next_seg['end']
         else:
+            current['text'] = ' '.join(parts)
             merged.append(current)
             current = next_seg.copy()
+            parts = [current['text']]
 
     # Thêm segment cuối cùng
+    current['text'] = ' '.join(parts)
     merged.append(current)
 
     return merged
 
 
+class _IntervalIndex:
+    """Closed intervals sorted by start, with a running max of ends.
+
+    `window(lo, hi)` returns, per query, the slice of intervals that can touch
+    [lo, hi]: everything past it starts after `hi`, everything before it ends
+    before `lo`. Queries are then resolved on flattened (query, interval) pairs.
+    """
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray):
+        self.starts = starts
+        self.ends = ends
+        self.reach = np.maximum.accumulate(ends) if len(ends) else ends
+
+    def window(self, lo: np.ndarray, hi: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        first = np.searchsorted(self.reach, lo, side='left')
+        last = np.searchsorted(self.starts, hi, side='right')
+        return first, np.maximum(last, first)
+
+    @staticmethod
+    def pairs(first: np.ndarray, last: np.ndarray, max_pairs: int = _MAX_PAIRS):
+        """Yield (query, interval) index arrays, a bounded number of pairs at a time."""
+        counts = last - first
+        cum = np.cumsum(counts)
+        q_start, n = 0, len(counts)
+        while q_start < n:
+            base = cum[q_start - 1] if q_start else 0
+            q_end = max(int(np.searchsorted(cum, base + max_pairs, side='right')), q_start + 1)
+            c = counts[q_start:q_end]
+            queries = np.repeat(np.arange(q_start, q_end), c)
+            items = np.arange(int(c.sum())) - np.repeat(np.cumsum(c) - c - first[q_start:q_end], c)
+            yield queries, items
+            q_start = q_end
+
+
+def _first_per_query(queries: np.ndarray, items: np.ndarray, out: np.ndarray):
+    if len(queries):
+        uniq, first = np.unique(queries, return_index=True)
+        out[uniq] = items[first]
+
+
+def _assign_speakers(ws: np.ndarray, we: np.ndarray, ds: np.ndarray, de: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized get_best_speaker_for_word over all words at once.
+
+    Returns per word the index of the winning segment (first with the largest
+    positive overlap) and of the fallback segment (first segment touching the
+    word within NEAREST_SPEAKER_WINDOW); -1 where there is none. Every fallback
+    candidate touches the word, so its distance is 0 and the nearest one is
+    simply the first.
+    """
+    best = np.full(len(ws), -1, dtype=np.int64)
+    fallback = np.full(len(ws), -1, dtype=np.int64)
+    index = _IntervalIndex(ds, de)
+    first, last = index.window(ws, we)
+    for q, s in index.pairs(first, last):
+        hit = de[s] >= ws[q]
+        q, s = q[hit], s[hit]
+        overlap = np.maximum(0, np.minimum(we[q], de[s]) - np.maximum(ws[q], ds[s]))
+        positive = overlap > 0
+        qp, sp = q[positive], s[positive]
+        order = np.lexsort((sp, -overlap[positive], qp))
+        _first_per_query(qp[order], sp[order], best)
+        near = (np.abs(ds[s] - we[q]) < NEAREST_SPEAKER_WINDOW) | \
+               (np.abs(de[s] - ws[q]) < NEAREST_SPEAKER_WINDOW)
+        _first_per_query(q[near], s[near], fallback)
+    return best, fallback
+
+
+def _collect_segment_words(words: list, segments: list) -> list[list[int]]:
+    """For every segment, the indices of same-speaker words inside or overlapping it, in word order."""
+    ws = np.array([w['start'] for w in words], dtype=np.float64)
+    we = np.array([w['end'] for w in words], dtype=np.float64)
+    ds = np.array([s['start'] for s in segments], dtype=np.float64)
+    de = np.array([s['end'] for s in segments], dtype=np.float64)
+    # Any match satisfies min(start, end) <= seg end and max(start, end) >= seg start,
+    # which stays true even for words whose end precedes their start.
+    w_lo = np.minimum(ws, we)
+    w_hi = np.maximum(ws, we)
+
+    by_speaker: dict = {}
+    for i, w in enumerate(words):
+        by_speaker.setdefault(w['speaker'], []).append(i)
+    segs_by_speaker: dict = {}
+    for j, seg in enumerate(segments):
+        segs_by_speaker.setdefault(seg['speaker'], []).append(j)
+
+    members: list[list[int]] = [[] for _ in segments]
+    for speaker, seg_ids in segs_by_speaker.items():
+        word_ids = by_speaker.get(speaker)
+        if not word_ids:
+            continue
+        word_ids = np.array(word_ids, dtype=np.int64)
+        word_ids = word_ids[np.argsort(w_lo[word_ids], kind='stable')]
+        seg_ids = np.array(seg_ids, dtype=np.int64)
+        index = _IntervalIndex(w_lo[word_ids], w_hi[word_ids])
+        first, last = index.window(ds[seg_ids], de[seg_ids])
+        for q, k in index.pairs(first, last):
+            seg, w = seg_ids[q], word_ids[k]
+            inside = (ws[w] >= ds[seg]) & (we[w] <= de[seg])
+            overlapping = np.minimum(we[w], de[seg]) - np.maximum(ws[w], ds[seg]) > 0
+            match = inside | overlapping
+            seg, w = seg[match], w[match]
+            order = np.lexsort((w, seg))
+            for j, i in zip(seg[order].tolist(), w[order].tolist()):
+                members[j].append(i)
+    return members
+
+
 def align_transcript_with_diarization(
         word_segments: list,
         diarization_segments: list,
         merge_same_speaker: bool = True,
         max_gap: float = 2.0
 ) -> list:
-    words_with_speaker = []
     sorted_diarization = sorted(diarization_segments, key=lambda x: x['start'])
-    for word in word_segments:
-        w_start = word.get('start')
-        w_end = word.get('end')
-        if w_start is None or w_end is None:
-            continue
-        speaker = get_best_speaker_for_word(word, sorted_diarization)
+    timed_words = [w for w in word_segments if w.get('start') is not None and w.get('end') is not None]
+    if not timed_words:
+        return []
+
+    ws = np.array([w['start'] for w in timed_words], dtype=np.float64)
+    we = np.array([w['end'] for w in timed_words], dtype=np.float64)
+    ds = np.array([s['start'] for s in sorted_diarization], dtype=np.float64)
+    de = np.array([s['end'] for s in sorted_diarization], dtype=np.float64)
+    best, fallback = _assign_speakers(ws, we, ds, de)
+
+    words_with_speaker = []
+    for word, b, f in zip(timed_words, best.tolist(), fallback.tolist()):
+        speaker = sorted_diarization[b]['speaker'] if b >= 0 else "UNKNOWN"
+        if speaker == "UNKNOWN" and f >= 0:
+            speaker = sorted_diarization[f]['speaker']
         if speaker == "UNKNOWN" and words_with_speaker:
             speaker = words_with_speaker[-1]['speaker']
         words_with_speaker.append({
             "word": word.get("word", ""),
-            "start": w_start,
-            "end": w_end,
+            "start": word['start'],
+            "end": word['end'],
             "speaker": speaker
         })
 
-    if not words_with_speaker:
-        return []
-
     final_segments = []
-    for diar_seg in sorted_diarization:
-        segment_words = []
-        for w in words_with_speaker:
-            if (w['start'] >= diar_seg['start'] and w['end'] <= diar_seg['end']) or \
-                    (calculate_overlap(w['start'], w['end'], diar_seg['start'], diar_seg['end']) > 0):
-                if w['speaker'] == diar_seg['speaker']:
-                    segment_words.append(w)
-        if segment_words:
+    members = _collect_segment_words(words_with_speaker, sorted_diarization)
+    for diar_seg, word_ids in zip(sorted_diarization, members):
+        if word_ids:
+            segment_words = [words_with_speaker[i] for i in word_ids]
             final_segments.append({
                 "speaker": diar_seg['speaker'],
                 "start": segment_words[0]['start'],
@@ -112,4 +229,4 @@ def align_transcript_with_diarization(
     if merge_same_speaker and final_segments:
         final_segments = merge_consecutive_segments(final_segments, max_gap)
 
-    return final_segments
\ No newline at end of file
+    return final_segments
@@ -5,7 +5,7 @@ from audio_postprocessor.cores.config import settings
 from audio_postprocessor.services.postprocessor import AudioPostProcessorService
 from shared_messaging.consumer import RabbitMQConsumer
 from shared_messaging.producer import RabbitMQProducer
-from shared_storage.s3 import S3Client
+from shared_storage.factory import create_s3_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,7 +13,8 @@ logger = logging.getLogger(__name__)
 async def main():
     logger.info("Starting Audio Post-Processor Worker...")
 
-    s3 = S3Client(
+    s3 = create_s3_client(
+        settings.S3_BACKEND,
         bucket=settings.S3_BUCKET_NAME,
         endpoint=settings.S3_ENDPOINT,
         access_key=settings.S3_ACCESS_KEY,
@@ -27,7 +28,12 @@ async def main():
 
     consumer = RabbitMQConsumer(settings.RABBITMQ_URL, service_name="postprocessor")
     await consumer.connect()
-    await consumer.subscribe("audio_ops", "cmd.postprocess", service.handle_command)
+    await consumer.subscribe(
+        "audio_ops",
+        "cmd.postprocess",
+        service.handle_command,
+        concurrency=settings.CONSUMER_CONCURRENCY
+    )
 
     logger.info("Post-Processor ready.")
 
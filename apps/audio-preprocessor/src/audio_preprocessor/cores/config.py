@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -10,6 +10,22 @@ class Settings(BaseSettings):
     S3_ACCESS_KEY: str = "S3_ACCESS_KEY"
     S3_SECRET_KEY: str = "S3_SECRET_KEY"
     S3_BUCKET_NAME: str = "audio-management"
+    S3_BACKEND: str = "boto3"
+    # Stream the upload through FFmpeg into a multipart upload instead of
+    # downloading it and writing the cleaned WAV to local disk first
+    PREPROCESS_STREAMING: bool = False
+    # FFmpeg processes for one file when not streaming; long files are cut into
+    # slices of at least PREPROCESS_MIN_SLICE_SECONDS and normalized with one
+    # file-wide linear gain. 1 keeps the single adaptive loudnorm pass
+    PREPROCESS_WORKERS: int = 1
+    PREPROCESS_MIN_SLICE_SECONDS: float = 300
+    # Also produce the HLS rendition from the same decode and report transcode.done,
+    # so the orchestrator skips the transcoder. Takes precedence over the modes above.
+    # Ingest only writes the single aac:128k rendition, so the worker refuses to start
+    # with it on unless TRANSCODE_LADDER (read from the same environment as the
+    # transcoder's) is that default; other ladders need the transcoder
+    PREPROCESS_INGEST_HLS: bool = False
+    TRANSCODE_LADDER: List[str] = ["aac:128k"]
 
     class Config:
         env_file = ".env"
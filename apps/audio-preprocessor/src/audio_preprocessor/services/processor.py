@@ -1,20 +1,37 @@
+import asyncio
 import logging
 import os
+import shutil
 from pathlib import Path
 
-from audio_preprocessor.utils.ffmpeg_ops import process_audio
+from audio_preprocessor.utils.ffmpeg_ops import (
+    ingest_audio, process_audio, process_audio_parallel, start_streaming_process
+)
 from shared_messaging.producer import RabbitMQProducer
 from shared_schemas.commands import PreprocessCommand
-from shared_schemas.events import PreprocessCompletedEvent
+from shared_schemas.events import PreprocessCompletedEvent, TranscodeCompletedEvent
 from shared_storage.s3 import S3Client
+from shared_storage.wav import patch_wav_sizes
 
 logger = logging.getLogger(__name__)
 
 
 class AudioProcessorService:
-    def __init__(self, s3: S3Client, producer: RabbitMQProducer):
+    def __init__(
+            self,
+            s3: S3Client,
+            producer: RabbitMQProducer,
+            streaming: bool = False,
+            workers: int = 1,
+            min_slice_seconds: float = 300,
+            ingest_hls: bool = False
+    ):
         self.s3 = s3
         self.producer = producer
+        self.streaming = streaming
+        self.workers = workers
+        self.min_slice_seconds = min_slice_seconds
+        self.ingest_hls = ingest_hls
         self.temp_dir = Path("tmp/audio-processing")
         self.temp_dir.mkdir(parents=True, exist_ok=True)
 
@@ -23,20 +40,39 @@ class AudioProcessorService:
         job_id = command.job_id
         local_input = self.temp_dir / f"{job_id}_input"
         local_output = self.temp_dir / f"{job_id}_clean.wav"
+        local_hls = self.temp_dir / f"{job_id}_hls"
+        hls_path = None
         try:
             logger.info(f"Starting Preprocess Job: {job_id}")
-            files = self.s3.list_files(command.input_path)
+            files = await self.s3.list_files(command.input_path)
             if not files:
                 raise FileNotFoundError(f"No files found in S3 prefix: {command.input_path}")
             actual_s3_key = files[0]
             logger.info(f"Found file to process: {actual_s3_key}")
-            await self.s3.download_file(actual_s3_key, str(local_input))
-            process_audio(str(local_input), str(local_output))
             s3_output_key = f"clean/{job_id}/audio.wav"
-            await self.s3.upload_file(str(local_output), s3_output_key)
+            if self.ingest_hls:
+                await self.s3.download_file(actual_s3_key, str(local_input))
+                await asyncio.to_thread(ingest_audio, str(local_input), str(local_output), str(local_hls))
+                hls_path = await self._upload_hls(job_id, local_hls)
+                await self.s3.upload_file(str(local_output), s3_output_key)
+            elif self.streaming:
+                await self._process_streaming(actual_s3_key, s3_output_key)
+            else:
+                await self.s3.download_file(actual_s3_key, str(local_input))
+                if self.workers > 1:
+                    await process_audio_parallel(
+                        str(local_input), str(local_output), self.workers, self.min_slice_seconds
+                    )
+                else:
+                    process_audio(str(local_input), str(local_output))
+                await self.s3.upload_file(str(local_output), s3_output_key)
+            if hls_path:
+                transcoded = TranscodeCompletedEvent(job_id=job_id, hls_path=hls_path)
+                await self.producer.publish("worker_events", "transcode.done", transcoded)
             event = PreprocessCompletedEvent(
                 job_id=job_id,
-                clean_audio_path=s3_output_key
+                clean_audio_path=s3_output_key,
+                hls_path=hls_path
             )
             await self.producer.publish("worker_events", "preprocess.done", event)
             logger.info(f"Job {job_id} Completed. Uploaded to {s3_output_key}")
@@ -48,3 +84,34 @@ class AudioProcessorService:
         finally:
             if local_input.exists(): os.remove(local_input)
             if local_output.exists(): os.remove(local_output)
+            if local_hls.exists(): shutil.rmtree(local_hls)
+
+    async def _upload_hls(self, job_id: str, hls_dir: Path) -> str:
+        s3_base_path = f"hls/{job_id}"
+        uploads = [
+            (str(path), f"{s3_base_path}/{path.name}")
+            for path in hls_dir.iterdir() if path.is_file()
+        ]
+        await self.s3.upload_many(uploads)
+        return f"{s3_base_path}/playlist.m3u8"
+
+    async def _process_streaming(self, input_key: str, output_key: str):
+        """Preprocess without touching disk: FFmpeg reads the upload through a presigned
+        GET and its WAV output is uploaded part by part while it is produced."""
+        process = await start_streaming_process(self.s3.generate_presigned_get_url(input_key))
+        stderr = asyncio.create_task(process.stderr.read())
+
+        async def _finalize(head: bytes, total_size: int) -> bytes:
+            # Only complete the upload once FFmpeg has exited cleanly.
+            if await process.wait() != 0:
+                message = (await stderr).decode('utf8', errors='replace').strip()
+                raise RuntimeError(f"FFmpeg failed: {message}")
+            return patch_wav_sizes(head, total_size)
+
+        try:
+            await self.s3.upload_stream(process.stdout.read, output_key, "audio/wav", _finalize)
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            await stderr
@@ -1,17 +1,54 @@
+import asyncio
 import ffmpeg
 import logging
+import math
 import os
+import re
+import wave
 
 logger = logging.getLogger(__name__)
 
 
+OUTPUT_RATE = 16000
+TARGET_I = -16
+TARGET_TP = -1.5
+TARGET_LRA = 11
+# Decoded ahead of every slice and dropped, so the IIR filters and the resampler
+# have settled by the first sample that is kept.
+_PREROLL_SAMPLES = OUTPUT_RATE
+# BS.1770 gates, in LUFS and LU
+_ABSOLUTE_GATE = -70.0
+_RELATIVE_GATE = -10.0
+# Near-silent files are left quiet rather than amplified into the limiter.
+_MAX_GAIN_DB = 20.0
+_MOMENTARY = re.compile(r"Parsed_ebur128.* M:\s*(-?[0-9.]+)")
+# The one HLS rendition ingest_audio writes: the transcoder's default ladder.
+INGEST_RENDITION = "aac:128k"
+
+
+def _compile(stream, *global_args: str) -> list[str]:
+    """Command line for `stream` with `global_args` ahead of the inputs.
+
+    ffmpeg-python's global_args() lands after the outputs, where FFmpeg only sees
+    trailing options; a stray output file named "-nostats" came from that.
+    """
+    cmd, *args = stream.compile()
+    return [cmd, *global_args, *args]
+
+
+def _band_filters(stream):
+    stream = stream.filter('highpass', f=80)
+    return stream.filter('lowpass', f=8000)
+
+
+def _clean_filters(stream):
+    return _band_filters(stream).filter('loudnorm', I=TARGET_I, TP=TARGET_TP, LRA=TARGET_LRA)
+
+
 def process_audio(input_path: str, output_path: str):
     try:
         logger.info(f"Processing audio: {input_path} -> {output_path}")
-        stream = ffmpeg.input(input_path)
-        stream = stream.filter('highpass', f=80)
-        stream = stream.filter('lowpass', f=8000)
-        stream = stream.filter('loudnorm', I=-16, TP=-1.5, LRA=11)
+        stream = _clean_filters(ffmpeg.input(input_path))
         stream = stream.output(
             output_path,
             ac=1,
@@ -23,4 +60,195 @@ def process_audio(input_path: str, output_path: str):
     except ffmpeg.Error as e:
         error_message = e.stderr.decode('utf8') if e.stderr else str(e)
         logger.error(f"FFmpeg Error: {error_message}")
-        raise RuntimeError(f"FFmpeg failed: {error_message}")
\ No newline at end of file
+        raise RuntimeError(f"FFmpeg failed: {error_message}")
+
+
+def ingest_audio(input_path: str, output_path: str, hls_dir: str, segment_time: int = 10):
+    """process_audio and the transcoder's HLS rendition from a single decode.
+
+    The cleaned 16 kHz mono signal is split with asplit into the analysis WAV and
+    the INGEST_RENDITION HLS playlist, so HLS carries exactly what the transcoder
+    would have encoded from the clean WAV with its default ladder.
+    """
+    codec, _, bitrate = INGEST_RENDITION.partition(":")
+    os.makedirs(hls_dir, exist_ok=True)
+    try:
+        logger.info(f"Ingesting audio: {input_path} -> {output_path} + {hls_dir}")
+        clean = _clean_filters(ffmpeg.input(input_path))
+        clean = clean.filter('aresample', OUTPUT_RATE).filter('aformat', channel_layouts='mono')
+        split = clean.filter_multi_output('asplit', 2)
+        wav = split[0].output(output_path, f='wav')
+        hls = split[1].output(
+            os.path.join(hls_dir, "playlist.m3u8"),
+            format='hls',
+            acodec=codec,
+            audio_bitrate=bitrate,
+            hls_time=segment_time,
+            hls_list_size=0,
+            hls_segment_filename=os.path.join(hls_dir, "segment_%03d.ts")
+        )
+        ffmpeg.merge_outputs(wav, hls).run(overwrite_output=True, capture_stdout=True, capture_stderr=True)
+        logger.info("FFmpeg ingest completed successfully.")
+    except ffmpeg.Error as e:
+        error_message = e.stderr.decode('utf8') if e.stderr else str(e)
+        logger.error(f"FFmpeg Error: {error_message}")
+        raise RuntimeError(f"FFmpeg failed: {error_message}")
+
+
+async def start_streaming_process(input_url: str) -> asyncio.subprocess.Process:
+    """Run the same cleanup as process_audio from a URL to a WAV on stdout.
+
+    HTTP inputs (e.g. presigned GETs) are read with ranged requests, so containers
+    that need seeking still work, and dropped connections are resumed. The WAV
+    header on stdout carries placeholder sizes; see patch_wav_sizes.
+    """
+    input_options = {}
+    if input_url.startswith(("http://", "https://")):
+        input_options = dict(reconnect=1, reconnect_on_network_error=1, reconnect_delay_max=10)
+    stream = _clean_filters(ffmpeg.input(input_url, **input_options))
+    stream = stream.output('pipe:1', ac=1, ar=16000, f='wav')
+    args = _compile(stream, '-nostats', '-loglevel', 'error')
+    logger.info("Streaming audio through FFmpeg to stdout")
+    return await asyncio.create_subprocess_exec(
+        *args,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+
+
+async def _run_ffmpeg(stream, loglevel: str = 'error') -> str:
+    args = _compile(stream, '-nostats', '-hide_banner', '-loglevel', loglevel, '-y')
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
+    message = stderr.decode('utf8', errors='replace')
+    if process.returncode != 0:
+        raise RuntimeError(f"FFmpeg failed: {message.strip()}")
+    return message
+
+
+async def _measure_slice(input_path: str, start: float, duration: float) -> list[float]:
+    """Momentary loudness of every 400 ms block (100 ms hop) of a slice, in LUFS.
+
+    These are exactly the gating blocks of BS.1770, so slices measured in parallel
+    can still be gated together as one file.
+    """
+    stream = _band_filters(ffmpeg.input(input_path, ss=start, t=duration))
+    stream = stream.filter('ebur128', framelog='verbose')
+    log = await _run_ffmpeg(stream.output('-', f='null'), loglevel='verbose')
+    return [float(m) for m in _MOMENTARY.findall(log)]
+
+
+def _integrated_loudness(blocks: list[float]) -> float | None:
+    """BS.1770 integrated loudness of gating blocks: absolute gate, then relative gate."""
+    powers = [10 ** (block / 10) for block in blocks if block > _ABSOLUTE_GATE]
+    if not powers:
+        return None
+    relative_gate = 10 * math.log10(sum(powers) / len(powers)) + _RELATIVE_GATE
+    gated = [p for p in powers if p > 10 ** (relative_gate / 10)]
+    return 10 * math.log10(sum(gated) / len(gated))
+
+
+def _linear_gain_db(blocks: list[float]) -> float:
+    """Gain that brings the whole file to TARGET_I, at most _MAX_GAIN_DB."""
+    loudness = _integrated_loudness(blocks)
+    if loudness is None:
+        return 0.0
+    return min(TARGET_I - loudness, _MAX_GAIN_DB)
+
+
+async def _render_slice(input_path: str, part_path: str, first: int, last: int | None, gain_db: float):
+    """Filter output samples [first, last) at OUTPUT_RATE into a raw s16le file."""
+    preroll = min(first, _PREROLL_SAMPLES)
+    stream = ffmpeg.input(input_path, ss=(first - preroll) / OUTPUT_RATE)
+    stream = _band_filters(stream).filter('volume', volume=f"{gain_db:.4f}dB")
+    # Peaks pushed over the target by the gain are limited, as loudnorm would. latency=1
+    # compensates the limiter's lookahead, which would otherwise delay the whole output.
+    stream = stream.filter('alimiter', limit=10 ** (TARGET_TP / 20), level=0, latency=1)
+    stream = stream.filter('aresample', OUTPUT_RATE).filter('aformat', channel_layouts='mono')
+    trim = {"start_sample": preroll}
+    if last is not None:
+        trim["end_sample"] = preroll + last - first
+    stream = stream.filter('atrim', **trim)
+    await _run_ffmpeg(stream.output(part_path, f='s16le', acodec='pcm_s16le'))
+
+
+def _seeks_exactly(probe: dict) -> bool:
+    """Whether input seeking lands on the exact sample: PCM and FLAC carry exact timestamps.
+
+    Compressed formats without an index (VBR MP3 without a TOC, Ogg/WebM Opus
+    without cues) seek by estimate, which would duplicate or drop audio at joins.
+    """
+    audio = next((s for s in probe.get("streams", []) if s.get("codec_type") == "audio"), {})
+    codec = audio.get("codec_name", "")
+    return codec.startswith("pcm_") or codec == "flac"
+
+
+async def _decode_to_pcm(input_path: str, pcm_path: str) -> None:
+    """Decode once, from the start, to a float WAV at the input's own rate and layout."""
+    stream = ffmpeg.input(input_path).output(pcm_path, f='wav', acodec='pcm_f32le', rf64='auto')
+    await _run_ffmpeg(stream)
+
+
+async def process_audio_parallel(input_path: str, output_path: str, workers: int, min_slice_seconds: float = 300):
+    """process_audio split over up to `workers` FFmpeg processes.
+
+    Loudness blocks are measured on every slice in parallel and gated together into
+    the file's integrated loudness, which sets one gain for the whole file, with a
+    peak limiter on top (two-pass normalization rather than the adaptive single pass).
+    Each slice is then filtered with that gain over an exact range of output samples,
+    starting a little early so filter state carries over, and the slices are joined
+    into one WAV. Inputs that do not seek sample-accurately are decoded once to PCM
+    first and sliced from that.
+    """
+    probe = ffmpeg.probe(input_path)
+    duration = float(probe["format"]["duration"])
+    count = max(1, min(workers, int(duration // min_slice_seconds)))
+    if count == 1:
+        await asyncio.to_thread(process_audio, input_path, output_path)
+        return
+    logger.info(f"Processing audio in {count} slices: {input_path} -> {output_path}")
+
+    parts = [f"{output_path}.part{k}" for k in range(count)]
+    decoded = f"{output_path}.decoded.wav"
+    source = input_path
+    try:
+        if not _seeks_exactly(probe):
+            logger.info("Input does not seek sample-accurately; decoding it to PCM once")
+            await _decode_to_pcm(input_path, decoded)
+            source = decoded
+            duration = float(ffmpeg.probe(decoded)["format"]["duration"])
+
+        step = duration / count
+        measurements = await asyncio.gather(
+            *[_measure_slice(source, k * step, step) for k in range(count)]
+        )
+        gain_db = _linear_gain_db([block for blocks in measurements for block in blocks])
+        logger.info(f"Loudness gain {gain_db:.2f} dB from {count} slices")
+
+        total = round(duration * OUTPUT_RATE)
+        bounds = [round(k * total / count) for k in range(count)] + [None]
+        await asyncio.gather(*[
+            _render_slice(source, parts[k], bounds[k], bounds[k + 1], gain_db) for k in range(count)
+        ])
+
+        def _join():
+            with wave.open(output_path, "wb") as wf:
+                wf.setnchannels(1)
+                wf.setsampwidth(2)
+                wf.setframerate(OUTPUT_RATE)
+                for part in parts:
+                    with open(part, "rb") as f:
+                        while chunk := f.read(1024 * 1024):
+                            wf.writeframesraw(chunk)
+        await asyncio.to_thread(_join)
+        logger.info("FFmpeg slices joined successfully.")
+    finally:
+        for path in [*parts, decoded]:
+            if os.path.exists(path):
+                os.remove(path)
@@ -3,9 +3,10 @@ import logging
 
 from audio_preprocessor.cores.config import settings
 from audio_preprocessor.services.processor import AudioProcessorService
+from audio_preprocessor.utils.ffmpeg_ops import INGEST_RENDITION
 from shared_messaging.consumer import RabbitMQConsumer
 from shared_messaging.producer import RabbitMQProducer
-from shared_storage.s3 import S3Client
+from shared_storage.factory import create_s3_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,9 +14,16 @@ logger = logging.getLogger(__name__)
 
 async def main():
     logger.info("Starting Audio Preprocessor Worker...")
+    if settings.PREPROCESS_INGEST_HLS and settings.TRANSCODE_LADDER != [INGEST_RENDITION]:
+        logger.critical(
+            f"FATAL: PREPROCESS_INGEST_HLS only produces {INGEST_RENDITION}, but TRANSCODE_LADDER is "
+            f"{settings.TRANSCODE_LADDER}. Disable ingest or use the default ladder. Exiting..."
+        )
+        return
 
 
-    s3 = S3Client(
+    s3 = create_s3_client(
+        settings.S3_BACKEND,
         bucket=settings.S3_BUCKET_NAME,
         endpoint=settings.S3_ENDPOINT,
         access_key=settings.S3_ACCESS_KEY,
@@ -27,7 +35,14 @@ async def main():
     await Producer.connect()
 
 
-    service = AudioProcessorService(s3, Producer)
+    service = AudioProcessorService(
+        s3,
+        Producer,
+        streaming=settings.PREPROCESS_STREAMING,
+        workers=settings.PREPROCESS_WORKERS,
+        min_slice_seconds=settings.PREPROCESS_MIN_SLICE_SECONDS,
+        ingest_hls=settings.PREPROCESS_INGEST_HLS
+    )
 
 
     consumer = RabbitMQConsumer(settings.RABBITMQ_URL, service_name="preprocessor")
@@ -0,0 +1,160 @@
+import asyncio
+import shutil
+import subprocess
+import wave
+
+import numpy as np
+import pytest
+
+from audio_preprocessor.utils import ffmpeg_ops
+
+needs_ffmpeg = pytest.mark.skipif(
+    not (shutil.which("ffmpeg") and shutil.which("ffprobe")), reason="ffmpeg/ffprobe not installed"
+)
+
+# Integrated loudness of the parallel path vs the single adaptive loudnorm pass, in LU
+LOUDNESS_TOLERANCE = 1.0
+# Parallel slices vs the same gain applied in one process, in full-scale amplitude
+JOIN_TOLERANCE = 1e-3
+# Compressed inputs are sliced from a float decode, the reference decodes them
+# directly; a dropped or repeated block at a join would be two orders larger.
+COMPRESSED_JOIN_TOLERANCE = 5e-3
+# Lags searched when aligning the parallel output with process_audio, in samples
+MAX_LAG = 400
+# Gain pinned for the join tests, so both sides apply the same one
+FIXED_GAIN_DB = 3.0
+
+
+def _read_wav(path) -> np.ndarray:
+    with wave.open(str(path)) as wf:
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16) / 32768
+
+
+@pytest.fixture(scope="module")
+def speech_like(tmp_path_factory):
+    """40 s stereo at 44.1 kHz: 4 s tone bursts, 4 s pauses, pink noise floor throughout."""
+    path = tmp_path_factory.mktemp("audio") / "input.wav"
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", "sine=f=220:d=40:sample_rate=44100",
+        "-f", "lavfi", "-i", "anoisesrc=d=40:c=pink:a=0.01:r=44100",
+        "-filter_complex",
+        "[0]volume='if(lt(mod(t,8),4),0.3,0)':eval=frame[s];"
+        "[s][1]amix=inputs=2:normalize=0,aformat=channel_layouts=stereo",
+        str(path)
+    ], check=True)
+    return path
+
+
+@pytest.fixture(scope="module")
+def inputs(speech_like, tmp_path_factory):
+    """speech_like as WAV, VBR MP3 without a seek TOC, and Opus in WebM and Ogg."""
+    out = tmp_path_factory.mktemp("encoded")
+    paths = {"wav": speech_like}
+    for name, args in {
+        "mp3": ["-c:a", "libmp3lame", "-q:a", "4", "-write_xing", "0"],
+        "webm": ["-c:a", "libopus", "-b:a", "48k"],
+        "ogg": ["-c:a", "libopus", "-b:a", "48k"],
+    }.items():
+        paths[name] = out / f"input.{name}"
+        subprocess.run(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", str(speech_like), *args, str(paths[name])],
+            check=True
+        )
+    return paths
+
+
+def _lag(reference: np.ndarray, signal: np.ndarray) -> int:
+    """Delay of `signal` against `reference`, in samples, by cross-correlation."""
+    n = min(len(reference), len(signal)) - 2 * MAX_LAG
+    a = reference[MAX_LAG:MAX_LAG + n]
+    return max(
+        range(-MAX_LAG, MAX_LAG + 1),
+        key=lambda k: float(np.dot(a, signal[MAX_LAG + k:MAX_LAG + k + n]))
+    )
+
+
+def test_relative_gate_drops_pauses():
+    speech, pause = [-20.0] * 100, [-55.0] * 100
+    assert ffmpeg_ops._integrated_loudness(speech + pause) == pytest.approx(-20.0)
+    assert ffmpeg_ops._integrated_loudness([-120.7] * 10) is None
+
+
+def test_gain_is_clamped():
+    assert ffmpeg_ops._linear_gain_db([-65.0] * 50) == ffmpeg_ops._MAX_GAIN_DB
+    assert ffmpeg_ops._linear_gain_db([-120.7] * 50) == 0.0
+
+
+@needs_ffmpeg
+@pytest.mark.parametrize("fmt", ["wav", "mp3", "webm", "ogg"])
+def test_parallel_matches_single_process(inputs, fmt, tmp_path):
+    source = inputs[fmt]
+    single, parallel = tmp_path / "single.wav", tmp_path / "parallel.wav"
+    ffmpeg_ops.process_audio(str(source), str(single))
+    asyncio.run(ffmpeg_ops.process_audio_parallel(str(source), str(parallel), workers=4, min_slice_seconds=5))
+
+    a, b = _read_wav(single), _read_wav(parallel)
+    assert len(a) == len(b)
+    assert _lag(a, b) == 0
+    assert sorted(tmp_path.iterdir()) == [parallel, single]
+
+    async def loudness(path):
+        return ffmpeg_ops._integrated_loudness(await ffmpeg_ops._measure_slice(str(path), 0, 3600))
+    assert asyncio.run(loudness(parallel)) == pytest.approx(asyncio.run(loudness(single)), abs=LOUDNESS_TOLERANCE)
+
+
+@needs_ffmpeg
+def test_slices_join_sample_exactly(speech_like, tmp_path):
+    parallel, whole = tmp_path / "parallel.wav", tmp_path / "whole.raw"
+
+    async def run():
+        await ffmpeg_ops.process_audio_parallel(str(speech_like), str(parallel), workers=4, min_slice_seconds=5)
+        blocks = [b for k in range(4) for b in await ffmpeg_ops._measure_slice(str(speech_like), k * 10, 10)]
+        await ffmpeg_ops._render_slice(str(speech_like), str(whole), 0, None, ffmpeg_ops._linear_gain_db(blocks))
+    asyncio.run(run())
+
+    joined = _read_wav(parallel)
+    reference = np.fromfile(whole, dtype=np.int16) / 32768
+    assert len(joined) == len(reference)
+    assert np.abs(joined - reference).max() < JOIN_TOLERANCE
+
+
+@needs_ffmpeg
+@pytest.mark.parametrize("fmt", ["mp3", "webm", "ogg"])
+def test_compressed_slices_join_sample_exactly(inputs, fmt, tmp_path, monkeypatch):
+    monkeypatch.setattr(ffmpeg_ops, "_linear_gain_db", lambda blocks: FIXED_GAIN_DB)
+    source = inputs[fmt]
+    parallel, whole = tmp_path / "parallel.wav", tmp_path / "whole.raw"
+
+    async def run():
+        await ffmpeg_ops.process_audio_parallel(str(source), str(parallel), workers=4, min_slice_seconds=5)
+        await ffmpeg_ops._render_slice(str(source), str(whole), 0, None, FIXED_GAIN_DB)
+    asyncio.run(run())
+
+    joined = _read_wav(parallel)
+    reference = np.fromfile(whole, dtype=np.int16) / 32768
+    assert len(joined) == len(reference)
+    assert np.abs(joined - reference).max() < COMPRESSED_JOIN_TOLERANCE
+
+
+def test_only_pcm_and_flac_are_sliced_in_place():
+    def probe(codec):
+        return {"streams": [{"codec_type": "video", "codec_name": "mjpeg"}, {"codec_type": "audio", "codec_name": codec}]}
+    assert ffmpeg_ops._seeks_exactly(probe("pcm_s16le"))
+    assert ffmpeg_ops._seeks_exactly(probe("flac"))
+    for codec in ("mp3", "opus", "aac", "vorbis"):
+        assert not ffmpeg_ops._seeks_exactly(probe(codec))
+
+
+def test_global_options_precede_inputs():
+    stream = ffmpeg_ops._band_filters(ffmpeg_ops.ffmpeg.input("in.wav")).output("out.raw", f="s16le")
+    args = ffmpeg_ops._compile(stream, "-nostats", "-loglevel", "error")
+    assert args[:4] == ["ffmpeg", "-nostats", "-loglevel", "error"]
+    assert args[-1] == "out.raw"
+
+
+@needs_ffmpeg
+def test_measure_writes_no_files(speech_like, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert asyncio.run(ffmpeg_ops._measure_slice(str(speech_like), 0, 2))
+    assert list(tmp_path.iterdir()) == []
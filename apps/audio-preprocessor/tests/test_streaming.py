@@ -0,0 +1,101 @@
+import asyncio
+import struct
+
+import pytest
+
+moto_server = pytest.importorskip("moto.server")
+boto3 = pytest.importorskip("boto3")
+
+from audio_preprocessor.services import processor
+from shared_storage.s3 import S3Client
+from shared_storage.wav import parse_wav_header
+
+BUCKET = "voice-diary-test"
+REGION = "us-east-1"
+PART_MB = 5  # smallest part size S3 accepts
+SAMPLE_RATE = 16000
+
+
+def _streamed_wav(data_size: int) -> bytes:
+    """Mono 16-bit WAV as FFmpeg writes it to a pipe: both sizes are placeholders."""
+    header = (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, SAMPLE_RATE, SAMPLE_RATE * 2, 2, 16)
+        + b"data" + struct.pack("<I", 0xFFFFFFFF)
+    )
+    pcm = bytes(i % 251 for i in range(data_size))
+    return header + pcm
+
+
+class _FakeFFmpeg:
+    """Stands in for the asyncio subprocess: serves `output` on stdout in small reads.
+
+    Build it inside the running loop, which its stream readers bind to.
+    """
+
+    def __init__(self, output: bytes, returncode: int, stderr: bytes = b""):
+        self.stdout = asyncio.StreamReader()
+        self.stderr = asyncio.StreamReader()
+        self.returncode = None
+        self._exit_code = returncode
+        for offset in range(0, len(output), 64 * 1024):
+            self.stdout.feed_data(output[offset:offset + 64 * 1024])
+        self.stdout.feed_eof()
+        self.stderr.feed_data(stderr)
+        self.stderr.feed_eof()
+
+    async def wait(self) -> int:
+        self.returncode = self._exit_code
+        return self.returncode
+
+    def kill(self):
+        self.returncode = -9
+
+
+@pytest.fixture(scope="module")
+def endpoint():
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    url = f"http://{host}:{port}"
+    boto3.client(
+        "s3", endpoint_url=url, region_name=REGION, aws_access_key_id="test", aws_secret_access_key="test"
+    ).create_bucket(Bucket=BUCKET)
+    yield url
+    server.stop()
+
+
+def _service(endpoint: str, monkeypatch, output: bytes, returncode: int, stderr: bytes = b""):
+    async def _start(input_url: str):
+        assert input_url.startswith(endpoint)  # FFmpeg reads the upload through a presigned GET
+        return _FakeFFmpeg(output, returncode, stderr)
+    monkeypatch.setattr(processor, "start_streaming_process", _start)
+    s3 = S3Client(BUCKET, endpoint, "test", "test", region=REGION, multipart_chunksize_mb=PART_MB)
+    return processor.AudioProcessorService(s3, producer=None, streaming=True), s3
+
+
+def test_streamed_wav_sizes_are_patched(endpoint, monkeypatch):
+    output = _streamed_wav(2 * PART_MB * 1024 * 1024 + 12345)  # three parts, short last one
+    service, s3 = _service(endpoint, monkeypatch, output, returncode=0)
+
+    asyncio.run(service._process_streaming("raw/job-ok/input.m4a", "clean/job-ok/audio.wav"))
+
+    stored = s3.client.get_object(Bucket=BUCKET, Key="clean/job-ok/audio.wav")["Body"].read()
+    assert len(stored) == len(output)
+    layout = parse_wav_header(stored[:64])
+    assert struct.unpack("<I", stored[4:8])[0] == len(stored) - 8
+    assert layout.data_size == len(stored) - layout.data_offset
+    assert stored[layout.data_offset:] == output[layout.data_offset:]
+
+
+def test_ffmpeg_failure_aborts_multipart_upload(endpoint, monkeypatch):
+    output = _streamed_wav(PART_MB * 1024 * 1024 + 1)  # forces the multipart path
+    service, s3 = _service(
+        endpoint, monkeypatch, output, returncode=1, stderr=b"Invalid data found when processing input"
+    )
+
+    with pytest.raises(RuntimeError, match="Invalid data found"):
+        asyncio.run(service._process_streaming("raw/job-bad/input.m4a", "clean/job-bad/audio.wav"))
+
+    assert s3.client.list_multipart_uploads(Bucket=BUCKET, Prefix="clean/job-bad/").get("Uploads", []) == []
+    assert s3.client.list_objects_v2(Bucket=BUCKET, Prefix="clean/job-bad/").get("KeyCount") == 0
@@ -10,9 +10,22 @@ class Settings(BaseSettings):
     S3_ACCESS_KEY: str = "S3_ACCESS_KEY"
     S3_SECRET_KEY: str = "S3_SECRET_KEY"
     S3_BUCKET_NAME: str = "audio-management"
+    S3_BACKEND: str = "boto3"
+    # Set on nodes co-located with the segmenter to read ranged chunks from the shared
+    # PCM store; when unset, ranged chunks are fetched with S3 ranged GETs
+    PCM_STORE_DIR: Optional[str] = None
 
     HF_TOKEN: str = "HF_TOKEN"
 
+    # Alignment models are cached per language, LRU-evicted past this budget
+    DEFAULT_ALIGN_LANGUAGE: str = "vi"
+    ALIGN_CACHE_MAX_MB: int = 3072
+    ALIGN_CACHE_MAX_MODELS: int = 4
+
+    # Micro-batching: 1 keeps one chunk per inference call
+    RECOGNIZER_BATCH_SIZE: int = 1
+    RECOGNIZER_BATCH_WINDOW_MS: int = 200
+
     class Config:
         env_file = ".env"
 
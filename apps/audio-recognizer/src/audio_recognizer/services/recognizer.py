@@ -1,60 +1,87 @@
 import asyncio
 import os
-import json
 import logging
+from collections import defaultdict
 from pathlib import Path
 
-from audio_recognizer.utils.engine import WhisperEngine
+import numpy as np
+
+from audio_recognizer.utils.engine import WhisperEngine, pcm_to_audio
+from shared_messaging.batcher import MicroBatcher
+from shared_messaging.cancellation import CancellationCache
+from shared_messaging.groups import retry_failed_members
 from shared_messaging.producer import RabbitMQProducer
-from shared_schemas.commands import RecognizeCommand
-from shared_schemas.events import RecognitionCompletedEvent
+from shared_schemas.commands import RecognizeCommand, RecognizeGroupCommand
+from shared_schemas.events import RecognitionCompletedEvent, RecognitionGroupCompletedEvent
+from shared_storage.chunks import read_chunk
+from shared_storage.pcm_store import LocalPCMStore
 from shared_storage.s3 import S3Client
 
 logger = logging.getLogger(__name__)
 
 
 class AudioRecognizerService:
-    def __init__(self, s3: S3Client, producer: RabbitMQProducer):
+    def __init__(
+            self,
+            s3: S3Client,
+            producer: RabbitMQProducer,
+            batch_size: int = 1,
+            batch_window_ms: int = 200,
+            store: LocalPCMStore | None = None,
+            cancellations: CancellationCache | None = None
+    ):
         self.s3 = s3
         self.Producer = producer
+        self.store = store
+        self.cancellations = cancellations
         self.temp_dir = Path("tmp/audio-recognizer").resolve()
         self.temp_dir.mkdir(parents=True, exist_ok=True)
+        self.batcher: MicroBatcher[RecognizeCommand, None] | None = None
+        if batch_size > 1:
+            self.batcher = MicroBatcher(
+                self._process_batch,
+                max_batch_size=batch_size,
+                max_wait_ms=batch_window_ms,
+                name="recognizer"
+            )
+
+    def _local_input(self, command: RecognizeCommand) -> Path:
+        return self.temp_dir / f"{command.job_id}_{command.index}.wav"
+
+    async def _load_input(self, command: RecognizeCommand) -> str | np.ndarray:
+        """Samples of a ranged chunk, read in memory; standalone chunks are downloaded."""
+        if command.ranged:
+            pcm, layout = await read_chunk(
+                self.s3, command.input_path,
+                job_id=command.job_id, start_ms=command.start_ms, end_ms=command.end_ms, store=self.store
+            )
+            return await asyncio.to_thread(pcm_to_audio, pcm, layout)
+        local_input = self._local_input(command)
+        if not local_input.exists():
+            await self.s3.download_file(command.input_path, str(local_input))
+        return str(local_input)
 
     async def handle_command(self, cmd_data: dict):
         command = RecognizeCommand(**cmd_data)
+        if self.cancellations and await self.cancellations.skip(command.job_id, f"recognition of chunk {command.index}"):
+            return
+        if self.batcher:
+            await self.batcher.submit(command)
+            return
+
         job_id = command.job_id
         index = command.index
-        start_ms = command.start_ms
-        end_ms = command.end_ms
-        local_input = self.temp_dir / f"{job_id}_{index}.wav"
-        local_output_json = self.temp_dir / f"{job_id}_{index}.json"
-        local_input_str = str(local_input)
-        local_output_str = str(local_output_json)
+        local_input = self._local_input(command)
         language = command.language
 
         try:
             logger.info(f"Processing Recognizer Job {job_id} - Chunk {index}")
-            if not local_input.exists():
-                await self.s3.download_file(command.input_path, local_input_str)
+            audio = await self._load_input(command)
             def run_whisper_blocking():
                 engine = WhisperEngine.get_instance()
-                return engine.transcribe_file(local_input_str, language)
+                return engine.transcribe_file(audio, language)
             words_data = await asyncio.to_thread(run_whisper_blocking)
-            with open(local_output_str, "w", encoding="utf-8") as f:
-                json.dump(words_data, f, ensure_ascii=False)
-            s3_json_key = f"transcripts/{job_id}/{index}.json"
-            await self.s3.upload_file(local_output_str, s3_json_key)
-            full_text = " ".join([w.get('word', '') for w in words_data])
-            event = RecognitionCompletedEvent(
-                job_id=job_id,
-                index=index,
-                text=full_text,
-                confidence=0.95,
-                start_ms=start_ms,
-                end_ms=end_ms,
-                transcript_s3_path=s3_json_key
-            )
-            await self.Producer.publish("worker_events", "recognition.done", event)
+            await self._publish_result(command, words_data)
             logger.info(f"Job {job_id} Chunk {index} Done.")
 
         except Exception as e:
@@ -63,4 +90,100 @@ class AudioRecognizerService:
 
         finally:
             if local_input.exists(): os.remove(local_input)
-            if local_output_json.exists(): os.remove(local_output_json)
\ No newline at end of file
+
+    async def _publish_result(self, command: RecognizeCommand, words_data: list):
+        event = await self._store_result(command, words_data)
+        await self.Producer.publish("worker_events", "recognition.done", event)
+
+    async def _store_result(self, command: RecognizeCommand, words_data: list) -> RecognitionCompletedEvent:
+        s3_json_key = f"transcripts/{command.job_id}/{command.index}.json"
+        await self.s3.put_json(words_data, s3_json_key)
+        full_text = " ".join([w.get('word', '') for w in words_data])
+        return RecognitionCompletedEvent(
+            job_id=command.job_id,
+            index=command.index,
+            text=full_text,
+            confidence=0.95,
+            start_ms=command.start_ms,
+            end_ms=command.end_ms,
+            transcript_s3_path=s3_json_key
+        )
+
+    async def _recognize_many(self, commands: list[RecognizeCommand]) -> list[RecognitionCompletedEvent | Exception]:
+        """Fetch all inputs concurrently and transcribe them in one pass per language."""
+        outcomes: list[RecognitionCompletedEvent | Exception | None] = [None] * len(commands)
+        try:
+            inputs = await asyncio.gather(
+                *[self._load_input(c) for c in commands],
+                return_exceptions=True
+            )
+            groups: dict[str, list[int]] = defaultdict(list)
+            for i, outcome in enumerate(inputs):
+                if isinstance(outcome, Exception):
+                    outcomes[i] = outcome
+                else:
+                    groups[commands[i].language].append(i)
+
+            for language, members in groups.items():
+                audios = [inputs[i] for i in members]
+                logger.info(f"Recognizing batch of {len(members)} chunks (lang={language})")
+
+                def run_whisper_blocking():
+                    engine = WhisperEngine.get_instance()
+                    return engine.transcribe_batch(audios, language)
+                try:
+                    batch_words = await asyncio.to_thread(run_whisper_blocking)
+                except Exception as e:
+                    logger.error(f"Batch recognition failed for {len(members)} chunks: {e}")
+                    for i in members:
+                        outcomes[i] = e
+                    continue
+
+                stored = await asyncio.gather(
+                    *[self._store_result(commands[i], words_data) for i, words_data in zip(members, batch_words)],
+                    return_exceptions=True
+                )
+                for i, outcome in zip(members, stored):
+                    if isinstance(outcome, Exception):
+                        logger.error(f"Storing transcript failed for {commands[i].job_id}_{commands[i].index}: {outcome}")
+                    outcomes[i] = outcome
+            return outcomes
+
+        finally:
+            for c in commands:
+                local_input = self._local_input(c)
+                if local_input.exists(): os.remove(local_input)
+
+    async def _process_batch(self, commands: list[RecognizeCommand]) -> list[Exception | None]:
+        results: list[Exception | None] = []
+        for command, outcome in zip(commands, await self._recognize_many(commands)):
+            if isinstance(outcome, Exception):
+                results.append(outcome)
+                continue
+            try:
+                await self.Producer.publish("worker_events", "recognition.done", outcome)
+                logger.info(f"Job {command.job_id} Chunk {command.index} Done.")
+                results.append(None)
+            except Exception as e:
+                logger.error(f"Publishing failed for {command.job_id}_{command.index}: {e}")
+                results.append(e)
+        return results
+
+    async def handle_group_command(self, cmd_data: dict):
+        """Transcribe a whole chunk group in one pass per language and report it in one event.
+
+        Successful members are reported even when others fail; only the failed ones
+        are sent around again.
+        """
+        group = RecognizeGroupCommand(**cmd_data)
+        if self.cancellations and await self.cancellations.skip(group.job_id, "recognition group"):
+            return
+        outcomes = await self._recognize_many(group.items)
+        results = [o for o in outcomes if not isinstance(o, Exception)]
+        if results:
+            event = RecognitionGroupCompletedEvent(job_id=group.job_id, results=results)
+            await self.Producer.publish("worker_events", "recognition_group.done", event)
+            logger.info(f"Job {group.job_id}: group of {len(results)} chunks Done.")
+        failed = [(item, o) for item, o in zip(group.items, outcomes) if isinstance(o, Exception)]
+        if failed:
+            await retry_failed_members(self.Producer, "audio_ops", "cmd.recognize_group", group, failed)
@@ -0,0 +1,90 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import torch
+import whisperx
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AlignCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    load_seconds: float = 0.0
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "avg_load_seconds": self.load_seconds / self.misses if self.misses else 0.0,
+        }
+
+
+def _model_nbytes(model) -> int:
+    if isinstance(model, torch.nn.Module):
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    return 0
+
+
+class AlignModelCache:
+    """LRU cache of whisperx alignment models keyed by language code, bounded by memory."""
+
+    def __init__(self, device: str, max_bytes: int, max_models: int = 4):
+        self.device = device
+        self.max_bytes = max_bytes
+        self.max_models = max(1, max_models)
+        self.stats = AlignCacheStats()
+        self._models: OrderedDict[str, tuple[object, dict, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def used_bytes(self) -> int:
+        return sum(size for _, _, size in self._models.values())
+
+    def get(self, language: str):
+        with self._lock:
+            if language in self._models:
+                self._models.move_to_end(language)
+                self.stats.hits += 1
+                model, metadata, _ = self._models[language]
+                return model, metadata
+
+            self.stats.misses += 1
+            started = time.perf_counter()
+            model, metadata = whisperx.load_align_model(language_code=language, device=self.device)
+            elapsed = time.perf_counter() - started
+            self.stats.load_seconds += elapsed
+            size = _model_nbytes(model)
+            logger.info(f"Loaded align model '{language}' ({size / 1e6:.0f} MB) in {elapsed:.1f}s")
+
+            self._models[language] = (model, metadata, size)
+            self._evict()
+            return model, metadata
+
+    def _evict(self):
+        # Never evict the most recently used entry, even if it alone exceeds the budget.
+        evicted = False
+        while len(self._models) > 1 and (self.used_bytes > self.max_bytes or len(self._models) > self.max_models):
+            language, (model, _, size) = self._models.popitem(last=False)
+            del model
+            evicted = True
+            self.stats.evictions += 1
+            logger.info(f"Evicted align model '{language}' ({size / 1e6:.0f} MB)")
+        if evicted and self.device == "cuda":
+            torch.cuda.empty_cache()
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats.snapshot(),
+            "languages": list(self._models.keys()),
+            "used_mb": self.used_bytes / 1e6,
+        }
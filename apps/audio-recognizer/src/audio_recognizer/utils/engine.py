@@ -1,12 +1,76 @@
 import whisperx
+import numpy as np
 import torch
 import logging
 import gc
+import threading
 from omegaconf.listconfig import ListConfig
 
+from audio_recognizer.cores.config import settings
+from audio_recognizer.utils.align_cache import AlignModelCache
+from shared_storage.wav import WavLayout
+
 logger = logging.getLogger(__name__)
 
 
+SAMPLE_RATE = 16000
+# Silence inserted between batched chunks. It keeps VAD from running speech from one
+# chunk into the next and gives _find_owner a midpoint to split on; keeping whole
+# segments inside one chunk is left to _split_at_chunks.
+BATCH_GAP_SEC = 1.0
+
+
+def _split_at_chunks(merge_chunks, batch_state: threading.local):
+    """Wrap a whisperx VAD merge_chunks so no merged segment spans two batched chunks.
+
+    merge_chunks packs VAD speech regions into windows of up to 30 s regardless of
+    the silence between them, so it happily merges across the gaps. Each merged
+    window is regrouped by chunk, with regions clipped to their chunk's bounds.
+    The chunk offsets are read from batch_state, which is thread-local: the wrapper
+    is installed once on the shared model and each transcribe_batch call (run on its
+    own to_thread worker) only ever sees its own offsets. Without offsets the merge
+    passes through unchanged.
+    """
+    def _merge(*args, **kwargs):
+        merged_windows = merge_chunks(*args, **kwargs)
+        offsets = getattr(batch_state, "offsets", None)
+        if not offsets:
+            return merged_windows
+        split = []
+        for merged in merged_windows:
+            groups: dict[int, list[tuple[float, float]]] = {}
+            for start, end in merged["segments"]:
+                for idx, (chunk_start, chunk_end) in enumerate(offsets):
+                    lo, hi = max(start, chunk_start), min(end, chunk_end)
+                    if hi > lo:
+                        groups.setdefault(idx, []).append((lo, hi))
+            for idx in sorted(groups):
+                regions = groups[idx]
+                split.append({"start": regions[0][0], "end": regions[-1][1], "segments": regions})
+        return split
+    return _merge
+
+
+def pcm_to_audio(pcm: memoryview | bytes, layout: WavLayout) -> np.ndarray:
+    """Float samples of an in-memory 16 kHz mono chunk, as whisperx.load_audio returns them.
+
+    A memoryview (e.g. into the PCM store's mapping) is released once converted.
+    """
+    try:
+        if (layout.sample_rate, layout.channels, layout.sample_width) != (SAMPLE_RATE, 1, 2):
+            raise ValueError(
+                f"Expected 16-bit mono PCM at {SAMPLE_RATE} Hz, got {layout.sample_width * 8}-bit "
+                f"x{layout.channels} at {layout.sample_rate} Hz"
+            )
+        samples = np.frombuffer(pcm, dtype="<i2")
+        audio = samples.astype(np.float32) / 32768.0
+        del samples
+        return audio
+    finally:
+        if isinstance(pcm, memoryview):
+            pcm.release()
+
+
 class WhisperEngine:
     _instance = None
 
@@ -33,12 +97,17 @@ class WhisperEngine:
             compute_type=self.compute_type,
             asr_options=self.asr_options,
         )
+        self._batch_state = threading.local()
+        vad_model = self.model.vad_model
+        vad_model.merge_chunks = _split_at_chunks(type(vad_model).merge_chunks, self._batch_state)
 
-        logger.info("Loading Align Model...")
-        self.align_model, self.align_metadata = whisperx.load_align_model(
-            language_code="vi",
-            device=self.device
+        self.align_cache = AlignModelCache(
+            self.device,
+            max_bytes=settings.ALIGN_CACHE_MAX_MB * 1024 * 1024,
+            max_models=settings.ALIGN_CACHE_MAX_MODELS
         )
+        logger.info(f"Preloading Align Model ({settings.DEFAULT_ALIGN_LANGUAGE})...")
+        self.align_cache.get(settings.DEFAULT_ALIGN_LANGUAGE)
         logger.info("WhisperX Models loaded successfully.")
 
     @classmethod
@@ -47,10 +116,16 @@ class WhisperEngine:
             cls._instance = cls()
         return cls._instance
 
-    def transcribe_file(self, audio_path: str, language: str = None):
+    @staticmethod
+    def _as_audio(audio: str | np.ndarray) -> np.ndarray:
+        return whisperx.load_audio(audio) if isinstance(audio, str) else audio
+
+    def transcribe_file(self, audio: str | np.ndarray, language: str = None):
+        """Transcribe a WAV path or float samples already in memory (see pcm_to_audio)."""
         try:
-            logger.info(f"Transcribing: {audio_path}")
-            audio = whisperx.load_audio(audio_path)
+            if isinstance(audio, str):
+                logger.info(f"Transcribing: {audio}")
+            audio = self._as_audio(audio)
 
             options = {
                 "batch_size": self.batch_size,
@@ -59,10 +134,11 @@ class WhisperEngine:
             result = self.model.transcribe(audio, **options)
 
             logger.info("Aligning result...")
+            align_model, align_metadata = self._align_model_for(result, language)
             result_aligned = whisperx.align(
                 result["segments"],
-                self.align_model,
-                self.align_metadata,
+                align_model,
+                align_metadata,
                 audio,
                 self.device,
                 return_char_alignments=False
@@ -75,4 +151,75 @@ class WhisperEngine:
             return result_aligned["word_segments"]
         except Exception as e:
             logger.error(f"Whisper Engine Error: {e}")
-            raise e
\ No newline at end of file
+            raise e
+
+    def transcribe_batch(self, audios: list[str | np.ndarray], language: str = None) -> list[list[dict]]:
+        try:
+            logger.info(f"Batch transcribing {len(audios)} chunks (lang={language})")
+            gap = np.zeros(int(BATCH_GAP_SEC * SAMPLE_RATE), dtype=np.float32)
+            pieces = []
+            offsets = []
+            cursor = 0.0
+            for audio in audios:
+                audio = self._as_audio(audio)
+                duration = len(audio) / SAMPLE_RATE
+                offsets.append((cursor, cursor + duration))
+                pieces.extend([audio, gap])
+                cursor += duration + BATCH_GAP_SEC
+            combined = np.concatenate(pieces[:-1]) if pieces else np.zeros(0, dtype=np.float32)
+
+            options = {
+                "batch_size": self.batch_size,
+                "language": language
+            }
+            self._batch_state.offsets = offsets
+            try:
+                result = self.model.transcribe(combined, **options)
+            finally:
+                self._batch_state.offsets = None
+            align_model, align_metadata = self._align_model_for(result, language)
+            result_aligned = whisperx.align(
+                result["segments"],
+                align_model,
+                align_metadata,
+                combined,
+                self.device,
+                return_char_alignments=False
+            )
+
+            per_chunk: list[list[dict]] = [[] for _ in audios]
+            owner = 0
+            for word in result_aligned["word_segments"]:
+                if "start" in word:
+                    owner = self._find_owner(offsets, word["start"], owner)
+                    chunk_start = offsets[owner][0]
+                    word = dict(word)
+                    word["start"] = round(word["start"] - chunk_start, 3)
+                    word["end"] = round(word.get("end", word["start"] + chunk_start) - chunk_start, 3)
+                per_chunk[owner].append(word)
+
+            gc.collect()
+            if self.device == "cuda":
+                torch.cuda.empty_cache()
+
+            return per_chunk
+        except Exception as e:
+            logger.error(f"Whisper Engine Batch Error: {e}")
+            raise e
+
+    def _align_model_for(self, result: dict, language: str = None):
+        lang = language or result.get("language") or settings.DEFAULT_ALIGN_LANGUAGE
+        try:
+            return self.align_cache.get(lang)
+        except ValueError:
+            # whisperx raises ValueError when it has no default align model for the language
+            logger.warning(f"No align model for '{lang}', falling back to '{settings.DEFAULT_ALIGN_LANGUAGE}'")
+            return self.align_cache.get(settings.DEFAULT_ALIGN_LANGUAGE)
+
+    @staticmethod
+    def _find_owner(offsets: list[tuple[float, float]], t: float, hint: int) -> int:
+        # Words arrive in time order, so scan forward from the previous owner.
+        idx = hint
+        while idx + 1 < len(offsets) and t >= offsets[idx + 1][0] - BATCH_GAP_SEC / 2:
+            idx += 1
+        return idx
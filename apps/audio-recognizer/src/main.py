@@ -5,9 +5,12 @@ import torch
 from audio_recognizer.cores.config import settings
 from audio_recognizer.services.recognizer import AudioRecognizerService
 from audio_recognizer.utils.engine import WhisperEngine
+from shared_messaging.cancellation import CancellationCache
 from shared_messaging.consumer import RabbitMQConsumer
+from shared_messaging.job_events import JobEndListener
 from shared_messaging.producer import RabbitMQProducer
-from shared_storage.s3 import S3Client
+from shared_storage.factory import create_s3_client
+from shared_storage.pcm_store import LocalPCMStore
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,25 +29,49 @@ async def main():
         logger.critical(f"FATAL: Failed to load Whisper Model. Exiting... Error: {e}")
         return
 
-    s3 = S3Client(
+    s3 = create_s3_client(
+        settings.S3_BACKEND,
         bucket=settings.S3_BUCKET_NAME,
         endpoint=settings.S3_ENDPOINT,
         access_key=settings.S3_ACCESS_KEY,
         secret_key=settings.S3_SECRET_KEY
     )
+    store = LocalPCMStore(settings.PCM_STORE_DIR) if settings.PCM_STORE_DIR else None
+    cancellations = CancellationCache()
+    await cancellations.listen(settings.RABBITMQ_URL)
+    job_ends = JobEndListener(store.evict_job) if store else None
+    if job_ends:
+        await job_ends.listen(settings.RABBITMQ_URL)
 
     Producer = RabbitMQProducer(settings.RABBITMQ_URL)
     await Producer.connect()
     consumer = RabbitMQConsumer(settings.RABBITMQ_URL, service_name="recognizer")
     await consumer.connect()
-    service = AudioRecognizerService(s3, Producer)
-    await consumer.subscribe("audio_ops", "cmd.recognize", service.handle_command)
+    service = AudioRecognizerService(
+        s3,
+        Producer,
+        batch_size=settings.RECOGNIZER_BATCH_SIZE,
+        batch_window_ms=settings.RECOGNIZER_BATCH_WINDOW_MS,
+        store=store,
+        cancellations=cancellations
+    )
+    await consumer.subscribe(
+        "audio_ops",
+        "cmd.recognize",
+        service.handle_command,
+        concurrency=settings.RECOGNIZER_BATCH_SIZE
+    )
+    await consumer.subscribe("audio_ops", "cmd.recognize_group", service.handle_group_command)
 
     logger.info("Recognizer is ready to transcribe...")
     try:
         await asyncio.Future()
     finally:
         await consumer.close()
+        await cancellations.close()
+        if job_ends:
+            await job_ends.close()
+            store.close()
         await Producer.close()
 
 
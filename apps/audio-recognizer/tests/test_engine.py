@@ -0,0 +1,58 @@
+import inspect
+import threading
+
+import pytest
+
+pytest.importorskip("whisperx")
+
+from audio_recognizer.utils.engine import WhisperEngine, _split_at_chunks
+
+# Three batched chunks, BATCH_GAP_SEC apart.
+OFFSETS = [(0.0, 10.0), (11.0, 25.0), (26.0, 40.0)]
+
+
+def _fake_merge_chunks(*args, **kwargs):
+    """One 30 s window as whisperx merges it, running across both chunk gaps."""
+    return [{
+        "start": 2.0,
+        "end": 30.0,
+        "segments": [(2.0, 9.0), (9.5, 12.0), (13.0, 24.5), (27.0, 30.0)],
+    }]
+
+
+def test_split_at_chunks_splits_window_spanning_two_boundaries():
+    state = threading.local()
+    state.offsets = OFFSETS
+    merge = _split_at_chunks(_fake_merge_chunks, state)
+
+    split = merge()
+
+    assert split == [
+        {"start": 2.0, "end": 10.0, "segments": [(2.0, 9.0), (9.5, 10.0)]},
+        {"start": 11.0, "end": 24.5, "segments": [(11.0, 12.0), (13.0, 24.5)]},
+        {"start": 27.0, "end": 30.0, "segments": [(27.0, 30.0)]},
+    ]
+    owner = 0
+    owners = []
+    for piece in split:
+        owner = WhisperEngine._find_owner(OFFSETS, piece["start"], owner)
+        owners.append(owner)
+        chunk_start, chunk_end = OFFSETS[owner]
+        assert chunk_start <= piece["start"] and piece["end"] <= chunk_end
+    assert owners == [0, 1, 2]
+
+
+def test_split_at_chunks_passes_through_without_offsets():
+    merge = _split_at_chunks(_fake_merge_chunks, threading.local())
+
+    assert merge() == _fake_merge_chunks()
+
+
+def test_whisperx_pipeline_still_merges_through_vad_model():
+    # WhisperEngine patches merge_chunks on the VAD instance; if whisperx stops
+    # looking it up there, batched words would silently land in the wrong chunks.
+    from whisperx.asr import FasterWhisperPipeline
+    from whisperx.vads import Pyannote, Silero
+
+    assert "self.vad_model.merge_chunks" in inspect.getsource(FasterWhisperPipeline.transcribe)
+    assert callable(Pyannote.merge_chunks) and callable(Silero.merge_chunks)
@@ -10,6 +10,13 @@ class Settings(BaseSettings):
     S3_ACCESS_KEY: str = "S3_ACCESS_KEY"
     S3_SECRET_KEY: str = "S3_SECRET_KEY"
     S3_BUCKET_NAME: str = "audio-management"
+    S3_BACKEND: str = "boto3"
+
+    # "files": upload one WAV per chunk; "ranges": publish time ranges into the clean
+    # WAV, which workers read into memory with ranged GETs; "colocated": like "ranges",
+    # and same-node workers read the samples straight from the mmap'd local PCM store
+    SEGMENT_MODE: str = "files"
+    PCM_STORE_DIR: str = "tmp/pcm-store"
 
     class Config:
         env_file = ".env"
@@ -2,18 +2,22 @@ import logging
 import shutil
 from pathlib import Path
 
+from audio_segmenter.cores.config import settings
 from audio_segmenter.utils.splitter import split_audio_smart
+from audio_segmenter.utils.vad import SAMPLE_WIDTH, EnergyProfile
 from shared_schemas.commands import SegmentCommand
 from shared_messaging.producer import RabbitMQProducer
 from shared_schemas.events import SegmentCompletedEvent
+from shared_storage.pcm_store import LocalPCMStore
 from shared_storage.s3 import S3Client
 
 logger = logging.getLogger(__name__)
 
 class AudioSegmenterService:
-    def __init__(self, s3: S3Client, producer: RabbitMQProducer):
+    def __init__(self, s3: S3Client, producer: RabbitMQProducer, store: LocalPCMStore | None = None):
         self.s3 = s3
         self.Producer = producer
+        self.store = store
         self.temp_dir = Path("tmp/audio-segmenting").resolve()
         self.temp_dir.mkdir(parents=True, exist_ok=True)
 
@@ -31,19 +35,30 @@ class AudioSegmenterService:
             logger.info(f"Starting Segmentation Job: {job_id}")
             if not input_file.exists():
                 await self.s3.download_file(command.input_path, str(input_file))
-            chunks_meta = split_audio_smart(str(input_file), str(output_chunks_dir))
+            ranged = settings.SEGMENT_MODE in ("ranges", "colocated")
+            profile = None
+            if ranged and self.store is not None:
+                # Register first, so silence detection reads the same mapping the workers will.
+                self.store.put_job(job_id, str(input_file))
+                profile = self._profile_from_store(job_id)
+            chunks_meta = split_audio_smart(
+                str(input_file),
+                str(output_chunks_dir),
+                export_chunks=not ranged,
+                profile=profile
+            )
             logger.info(f"Split into {len(chunks_meta)} chunks.")
 
-            segments_payload = []
-            for chunk in chunks_meta:
-                s3_key = f"segments/{job_id}/{chunk['filename']}"
-                await self.s3.upload_file(chunk['local_path'], s3_key)
-                segments_payload.append({
-                    "s3_path": s3_key,
+            if ranged:
+                segments_payload = [{
+                    "s3_path": command.input_path,
                     "start_ms": chunk['start_ms'],
                     "end_ms": chunk['end_ms'],
-                    "index": chunk['index']
-                })
+                    "index": chunk['index'],
+                    "ranged": True
+                } for chunk in chunks_meta]
+            else:
+                segments_payload = await self._upload_chunks(job_id, chunks_meta)
 
             event = SegmentCompletedEvent(
                 job_id=job_id,
@@ -59,4 +74,28 @@ class AudioSegmenterService:
             raise e
 
         finally:
-            if job_dir.exists(): shutil.rmtree(job_dir)
\ No newline at end of file
+            if job_dir.exists(): shutil.rmtree(job_dir)
+
+    def _profile_from_store(self, job_id: str) -> EnergyProfile:
+        pcm, layout = self.store.read_job(job_id)
+        try:
+            if layout.sample_width != SAMPLE_WIDTH:
+                raise ValueError(f"Expected 16-bit PCM, got {layout.sample_width * 8}-bit")
+            return EnergyProfile.from_pcm(pcm, layout.sample_rate, layout.channels)
+        finally:
+            pcm.release()
+
+    async def _upload_chunks(self, job_id: str, chunks_meta: list[dict]) -> list[dict]:
+        segments_payload = []
+        uploads = []
+        for chunk in chunks_meta:
+            s3_key = f"segments/{job_id}/{chunk['filename']}"
+            uploads.append((chunk['local_path'], s3_key))
+            segments_payload.append({
+                "s3_path": s3_key,
+                "start_ms": chunk['start_ms'],
+                "end_ms": chunk['end_ms'],
+                "index": chunk['index']
+            })
+        await self.s3.upload_many(uploads)
+        return segments_payload
\ No newline at end of file
@@ -1,25 +1,39 @@
 import os
 import math
 from typing import List, Dict
+
+import numpy as np
 from pydub import AudioSegment
-from pydub.silence import detect_nonsilent
+
+from audio_segmenter.utils.vad import EnergyProfile, SAMPLE_WIDTH
 
 MAX_DURATION_MS = 60 * 1000
 MIN_SILENCE_LEN_FLOOR = 200
 
+
+def _profile_from_segment(audio: AudioSegment) -> EnergyProfile:
+    if audio.sample_width != SAMPLE_WIDTH:
+        audio = audio.set_sample_width(SAMPLE_WIDTH)
+    samples = np.frombuffer(audio.raw_data, dtype="<i2")
+    return EnergyProfile.from_samples(samples, audio.frame_rate, audio.channels)
+
+
 def _recursive_find_ranges(
-        audio_segment: AudioSegment,
+        profile: EnergyProfile,
+        start_ms: int,
+        end_ms: int,
         min_silence_len: int,
         silence_thresh: int
 ) -> List[tuple]:
 
-    ranges = detect_nonsilent(
-        audio_segment,
+    ranges = profile.detect_nonsilent(
+        start_ms,
+        end_ms,
         min_silence_len=min_silence_len,
         silence_thresh=silence_thresh
     )
     if not ranges:
-        return [(0, len(audio_segment))]
+        return [(start_ms, end_ms)]
 
     final_ranges = []
 
@@ -27,10 +41,7 @@ def _recursive_find_ranges(
         duration = end - start
         if duration > MAX_DURATION_MS and min_silence_len > MIN_SILENCE_LEN_FLOOR:
             new_min_silence = max(MIN_SILENCE_LEN_FLOOR, min_silence_len - 150)
-            sub_audio = audio_segment[start:end]
-            sub_ranges = _recursive_find_ranges(sub_audio, new_min_silence, silence_thresh)
-            for sub_start, sub_end in sub_ranges:
-                final_ranges.append((start + sub_start, start + sub_end))
+            final_ranges.extend(_recursive_find_ranges(profile, start, end, new_min_silence, silence_thresh))
         elif duration > MAX_DURATION_MS:
             num_parts = math.ceil(duration / MAX_DURATION_MS)
             for i in range(num_parts):
@@ -48,24 +59,39 @@ def split_audio_smart(
         input_path: str,
         output_dir: str,
         min_silence_len: int = 700,
-        silence_thresh: int = -40
+        silence_thresh: int = -40,
+        export_chunks: bool = True,
+        profile: EnergyProfile | None = None
 ) -> List[Dict]:
     os.makedirs(output_dir, exist_ok=True)
+    audio = None
     try:
-        audio = AudioSegment.from_file(input_path)
+        if export_chunks:
+            audio = AudioSegment.from_file(input_path)
+            profile = _profile_from_segment(audio)
+        elif profile is None:
+            # Ranges only: stream the WAV so multi-hour recordings never sit in memory.
+            try:
+                profile = EnergyProfile.from_wav_file(input_path)
+            except Exception:
+                profile = _profile_from_segment(AudioSegment.from_file(input_path))
     except Exception as e:
         print(f"Error loading audio file {input_path}: {e}")
         return []
-    valid_ranges = _recursive_find_ranges(audio, min_silence_len, silence_thresh)
+    total_ms = profile.length_ms
+    valid_ranges = _recursive_find_ranges(profile, 0, total_ms, min_silence_len, silence_thresh)
     chunks_metadata = []
     for i, (start_ms, end_ms) in enumerate(valid_ranges):
         pad_ms = 200
         safe_start = max(0, start_ms - pad_ms)
-        safe_end = min(len(audio), end_ms + pad_ms)
-        chunk = audio[safe_start:safe_end]
+        safe_end = min(total_ms, end_ms + pad_ms)
         filename = f"chunk_{i}.wav"
         out_path = os.path.join(output_dir, filename)
-        chunk.export(out_path, format="wav")
+        if export_chunks:
+            chunk = audio[safe_start:safe_end]
+            chunk.export(out_path, format="wav")
+        else:
+            out_path = None
         chunks_metadata.append({
             "index": i,
             "local_path": out_path,
@@ -75,4 +101,4 @@ def split_audio_smart(
             "duration_ms": safe_end - safe_start
         })
 
-    return chunks_metadata
\ No newline at end of file
+    return chunks_metadata
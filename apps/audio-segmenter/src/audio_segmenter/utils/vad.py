@@ -0,0 +1,174 @@
+import math
+import wave
+from typing import List, Tuple
+
+import numpy as np
+
+SAMPLE_WIDTH = 2
+MAX_AMPLITUDE = float(1 << (8 * SAMPLE_WIDTH - 1))
+
+
+class EnergyProfile:
+    """Per-millisecond energy of a 16-bit PCM signal, computed in a single pass.
+
+    Holds exact int64 prefix sums of squared samples on pydub's millisecond grid, so
+    the energy of any [start_ms, end_ms) window is O(1) and silence detection at any
+    `min_silence_len` becomes a vectorized comparison instead of a Python scan.
+    Sample counts per window follow from the grid itself and are not stored, and
+    windows are scanned in fixed-size blocks, so memory beyond the prefix sums stays
+    bounded however long the recording is.
+    """
+
+    # Window starts compared per block in detect_silence
+    SCAN_BLOCK_MS = 1 << 16
+
+    def __init__(self, sq_prefix: np.ndarray, sample_rate: int, channels: int, frame_count: int):
+        self.sq_prefix = sq_prefix
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_count = frame_count
+        self.length_ms = len(sq_prefix) - 1
+
+    @staticmethod
+    def _ms_boundaries(ms: np.ndarray, sample_rate: int, frame_count: int) -> np.ndarray:
+        # Same frame mapping as AudioSegment slicing: int(ms * frame_rate / 1000).
+        return np.minimum((ms * sample_rate) // 1000, frame_count)
+
+    @staticmethod
+    def _length_ms(frame_count: int, sample_rate: int) -> int:
+        return round(1000 * (frame_count / sample_rate))
+
+    @classmethod
+    def _from_blocks(cls, blocks, frame_count: int, sample_rate: int, channels: int) -> "EnergyProfile":
+        length_ms = cls._length_ms(frame_count, sample_rate)
+        # Per-millisecond sums are accumulated in place and turned into the prefix at the end.
+        sq_prefix = np.zeros(length_ms + 1, dtype=np.int64)
+        per_ms = sq_prefix[1:]
+        block_start = 0
+        for block in blocks:
+            frames = len(block) // channels
+            if frames == 0:
+                continue
+            block_end = block_start + frames
+            sq = np.square(block.astype(np.int64)).reshape(frames, channels).sum(axis=1)
+            block_prefix = np.concatenate(([0], np.cumsum(sq)))
+            del sq
+            # Milliseconds whose frames fall (partly) inside this block.
+            ms_lo = max(block_start * 1000 // sample_rate - 1, 0)
+            ms_hi = min(block_end * 1000 // sample_rate + 2, length_ms)
+            bounds = cls._ms_boundaries(np.arange(ms_lo, ms_hi + 1, dtype=np.int64), sample_rate, frame_count)
+            lo = np.clip(bounds[:-1], block_start, block_end) - block_start
+            hi = np.clip(bounds[1:], block_start, block_end) - block_start
+            per_ms[ms_lo:ms_hi] += block_prefix[hi] - block_prefix[lo]
+            block_start = block_end
+
+        np.cumsum(per_ms, out=per_ms)
+        return cls(sq_prefix, sample_rate, channels, frame_count)
+
+    @classmethod
+    def from_samples(cls, samples: np.ndarray, sample_rate: int, channels: int) -> "EnergyProfile":
+        frame_count = len(samples) // channels
+        return cls._from_blocks([samples], frame_count, sample_rate, channels)
+
+    @classmethod
+    def from_pcm(cls, pcm: memoryview, sample_rate: int, channels: int, block_seconds: float = 60) -> "EnergyProfile":
+        """Streaming variant over PCM already in memory (e.g. a PCM store mapping).
+
+        Blocks are numpy views of `pcm`, so nothing is copied; none outlive the call.
+        """
+        frame_size = channels * SAMPLE_WIDTH
+        frame_count = len(pcm) // frame_size
+        block_bytes = max(1, int(block_seconds * sample_rate)) * frame_size
+
+        def blocks():
+            for offset in range(0, frame_count * frame_size, block_bytes):
+                yield np.frombuffer(pcm[offset:min(offset + block_bytes, frame_count * frame_size)], dtype="<i2")
+
+        return cls._from_blocks(blocks(), frame_count, sample_rate, channels)
+
+    @classmethod
+    def from_wav_file(cls, path: str, block_seconds: float = 60) -> "EnergyProfile":
+        """Streaming variant: reads the WAV block by block, never holding it whole."""
+        with wave.open(path, "rb") as wf:
+            if wf.getsampwidth() != SAMPLE_WIDTH:
+                raise ValueError(f"Expected 16-bit PCM, got {wf.getsampwidth() * 8}-bit")
+            sample_rate = wf.getframerate()
+            channels = wf.getnchannels()
+            frame_count = wf.getnframes()
+            block_frames = max(1, int(block_seconds * sample_rate))
+
+            def blocks():
+                while True:
+                    raw = wf.readframes(block_frames)
+                    if not raw:
+                        break
+                    yield np.frombuffer(raw, dtype="<i2")
+
+            return cls._from_blocks(blocks(), frame_count, sample_rate, channels)
+
+    def _silent_starts(self, start_ms: int, end_ms: int, window_ms: int, silence_thresh: int):
+        """Yield, block by block, the window starts (relative to start_ms) whose RMS is at most the threshold.
+
+        Matches audioop.rms, the integer floor of sqrt(sum / count), without floats:
+        floor(sqrt(m)) <= t exactly when m < (floor(t) + 1) ** 2, i.e. when
+        sum < (floor(t) + 1) ** 2 * count. Empty windows have an RMS of 0.
+        """
+        limit = (math.floor((10 ** (silence_thresh / 20.0)) * MAX_AMPLITUDE) + 1) ** 2
+        last_start = end_ms - window_ms
+        for block_lo in range(start_ms, last_start + 1, self.SCAN_BLOCK_MS):
+            starts = np.arange(block_lo, min(block_lo + self.SCAN_BLOCK_MS, last_start + 1), dtype=np.int64)
+            ends = starts + window_ms
+            sq = self.sq_prefix[ends] - self.sq_prefix[starts]
+            counts = self._ms_boundaries(ends, self.sample_rate, self.frame_count)
+            counts -= self._ms_boundaries(starts, self.sample_rate, self.frame_count)
+            counts *= self.channels
+            silent = (sq < limit * counts) | (counts == 0)
+            yield np.flatnonzero(silent) + (block_lo - start_ms)
+
+    def detect_silence(self, start_ms: int, end_ms: int, min_silence_len: int, silence_thresh: int) -> List[Tuple[int, int]]:
+        seg_len = end_ms - start_ms
+        if seg_len < min_silence_len:
+            return []
+        ranges = []
+        range_start = prev = None
+        for silent_starts in self._silent_starts(start_ms, end_ms, min_silence_len, silence_thresh):
+            if len(silent_starts) == 0:
+                continue
+            # A new silent range begins only where the next silent window leaves a gap,
+            # including across blocks.
+            if prev is None:
+                range_start = int(silent_starts[0])
+            elif silent_starts[0] - prev > min_silence_len:
+                ranges.append((range_start, prev + min_silence_len))
+                range_start = int(silent_starts[0])
+            for i in np.flatnonzero(np.diff(silent_starts) > min_silence_len):
+                ranges.append((range_start, int(silent_starts[i]) + min_silence_len))
+                range_start = int(silent_starts[i + 1])
+            prev = int(silent_starts[-1])
+        if prev is not None:
+            ranges.append((range_start, prev + min_silence_len))
+        return ranges
+
+    def detect_nonsilent(self, start_ms: int, end_ms: int, min_silence_len: int, silence_thresh: int) -> List[Tuple[int, int]]:
+        """Equivalent of pydub.silence.detect_nonsilent on the [start_ms, end_ms) slice, in absolute ms.
+
+        Windows sit on the recording's millisecond grid. pydub re-grids a slice from its
+        own first frame, which only differs by a frame at rates that are not a whole
+        number of kHz (e.g. 44.1 kHz) and a slice not starting at 0.
+        """
+        seg_len = end_ms - start_ms
+        silent = self.detect_silence(start_ms, end_ms, min_silence_len, silence_thresh)
+        if not silent:
+            return [(start_ms, end_ms)]
+        if silent[0] == (0, seg_len):
+            return []
+        ranges = []
+        prev_end = 0
+        for s, e in silent:
+            ranges.append((prev_end, s))
+            prev_end = e
+        if prev_end != seg_len:
+            ranges.append((prev_end, seg_len))
+        if ranges[0] == (0, 0):
+            ranges.pop(0)
+        return [(start_ms + s, start_ms + e) for s, e in ranges]
@@ -4,14 +4,17 @@ import logging
 from audio_segmenter.cores.config import settings
 from audio_segmenter.services.segmenter import AudioSegmenterService
 from shared_messaging.consumer import RabbitMQConsumer
+from shared_messaging.job_events import JobEndListener
 from shared_messaging.producer import RabbitMQProducer
-from shared_storage.s3 import S3Client
+from shared_storage.factory import create_s3_client
+from shared_storage.pcm_store import LocalPCMStore
 
 logging.basicConfig(level=logging.INFO)
 
 
 async def main():
-    s3 = S3Client(
+    s3 = create_s3_client(
+        settings.S3_BACKEND,
         bucket=settings.S3_BUCKET_NAME,
         endpoint=settings.S3_ENDPOINT,
         access_key=settings.S3_ACCESS_KEY,
@@ -21,7 +24,11 @@ async def main():
     Producer = RabbitMQProducer(settings.RABBITMQ_URL)
     await Producer.connect()
 
-    service = AudioSegmenterService(s3, Producer)
+    store = LocalPCMStore(settings.PCM_STORE_DIR) if settings.SEGMENT_MODE == "colocated" else None
+    service = AudioSegmenterService(s3, Producer, store)
+    job_ends = JobEndListener(store.evict_job) if store else None
+    if job_ends:
+        await job_ends.listen(settings.RABBITMQ_URL)
 
     consumer = RabbitMQConsumer(settings.RABBITMQ_URL, service_name="segmenter")
     await consumer.connect()
@@ -34,6 +41,9 @@ async def main():
         await asyncio.Future()
     finally:
         await consumer.close()
+        if job_ends:
+            await job_ends.close()
+            store.close()
         await Producer.close()
 
 
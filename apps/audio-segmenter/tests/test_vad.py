@@ -0,0 +1,109 @@
+import wave
+
+import numpy as np
+import pytest
+
+pydub = pytest.importorskip("pydub")
+from pydub import silence
+
+from audio_segmenter.utils.vad import EnergyProfile
+
+# (min_silence_len, silence_thresh) pairs, including the splitter's defaults and floor.
+SETTINGS = [(700, -40), (200, -40), (50, -35), (17, -50)]
+
+
+def _bursty(rate: int, channels: int, seconds: float, seed: int = 0) -> np.ndarray:
+    """Noise switched between loud and a near-silent floor every ~50 ms, interleaved."""
+    rng = np.random.default_rng(seed)
+    frames = int(rate * seconds)
+    loud = np.repeat(rng.random(frames // (rate // 20) + 1) < 0.5, rate // 20)[:frames]
+    level = np.where(loud, 3000.0, 20.0)[:, None]
+    return (rng.standard_normal((frames, channels)) * level).astype("<i2").ravel()
+
+
+def _segment(samples: np.ndarray, rate: int, channels: int) -> "pydub.AudioSegment":
+    return pydub.AudioSegment(samples.tobytes(), frame_rate=rate, sample_width=2, channels=channels)
+
+
+def _reference(samples, rate, channels, start_ms, end_ms, min_silence_len, silence_thresh):
+    """pydub's own scan over the slice, shifted back to absolute ms."""
+    audio = _segment(samples, rate, channels)[start_ms:end_ms]
+    nonsilent = silence.detect_nonsilent(audio, min_silence_len, silence_thresh)
+    silent = silence.detect_silence(audio, min_silence_len, silence_thresh)
+    return [(start_ms + s, start_ms + e) for s, e in nonsilent], [tuple(r) for r in silent]
+
+
+@pytest.mark.parametrize("rate, channels", [(16000, 1), (16000, 2), (8000, 1), (48000, 2), (44100, 1), (44100, 2)])
+@pytest.mark.parametrize("min_silence_len, silence_thresh", SETTINGS)
+def test_matches_pydub_on_whole_recording(rate, channels, min_silence_len, silence_thresh):
+    samples = _bursty(rate, channels, 3.7)
+    profile = EnergyProfile.from_samples(samples, rate, channels)
+    end = profile.length_ms
+    assert end == len(_segment(samples, rate, channels))
+
+    nonsilent, silent = _reference(samples, rate, channels, 0, end, min_silence_len, silence_thresh)
+    assert profile.detect_nonsilent(0, end, min_silence_len, silence_thresh) == nonsilent
+    assert profile.detect_silence(0, end, min_silence_len, silence_thresh) == silent
+
+
+# pydub re-grids a slice from its first frame; at whole-kHz rates that is the same grid.
+@pytest.mark.parametrize("rate, channels", [(16000, 1), (16000, 2), (8000, 2), (48000, 1)])
+@pytest.mark.parametrize("start_ms, end_ms", [(123, 2901), (7, 3700), (1001, 1500), (3000, 3100)])
+@pytest.mark.parametrize("min_silence_len, silence_thresh", SETTINGS)
+def test_matches_pydub_on_ranges(rate, channels, start_ms, end_ms, min_silence_len, silence_thresh):
+    samples = _bursty(rate, channels, 3.7, seed=1)
+    profile = EnergyProfile.from_samples(samples, rate, channels)
+
+    nonsilent, silent = _reference(samples, rate, channels, start_ms, end_ms, min_silence_len, silence_thresh)
+    assert profile.detect_nonsilent(start_ms, end_ms, min_silence_len, silence_thresh) == nonsilent
+    assert profile.detect_silence(start_ms, end_ms, min_silence_len, silence_thresh) == silent
+
+
+@pytest.mark.parametrize("scan_block_ms", [1, 7, 64])
+def test_silent_ranges_carry_across_scan_blocks(monkeypatch, scan_block_ms):
+    samples = _bursty(16000, 1, 3.7, seed=2)
+    profile = EnergyProfile.from_samples(samples, 16000, 1)
+    expected = profile.detect_silence(0, profile.length_ms, 50, -35)
+
+    monkeypatch.setattr(EnergyProfile, "SCAN_BLOCK_MS", scan_block_ms)
+    assert profile.detect_silence(0, profile.length_ms, 50, -35) == expected
+
+
+@pytest.mark.parametrize("channels", [1, 2])
+def test_all_silent_and_all_loud(channels):
+    rate = 16000
+    quiet = np.zeros(rate * 2 * channels, dtype="<i2")
+    loud = (np.random.default_rng(3).standard_normal(rate * 2 * channels) * 5000).astype("<i2")
+    for samples, expected in ((quiet, []), (loud, [(0, 2000)])):
+        profile = EnergyProfile.from_samples(samples, rate, channels)
+        nonsilent, _ = _reference(samples, rate, channels, 0, 2000, 700, -40)
+        assert nonsilent == expected
+        assert profile.detect_nonsilent(0, 2000, 700, -40) == expected
+    assert EnergyProfile.from_samples(quiet, rate, channels).detect_nonsilent(0, 500, 700, -40) == [(0, 500)]
+
+
+def _write_wav(path, samples: np.ndarray, rate: int, channels: int) -> None:
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(samples.tobytes())
+
+
+# 0.0123 s is 196.8 frames at 16 kHz and 542.4 at 44.1 kHz, so blocks end mid-millisecond.
+@pytest.mark.parametrize("block_seconds", [0.0123, 0.5, 60])
+@pytest.mark.parametrize("rate, channels", [(16000, 1), (16000, 2), (44100, 2)])
+def test_streaming_profiles_match_from_samples(tmp_path, block_seconds, rate, channels):
+    samples = _bursty(rate, channels, 2.3, seed=4)
+    expected = EnergyProfile.from_samples(samples, rate, channels)
+    path = tmp_path / "audio.wav"
+    _write_wav(path, samples, rate, channels)
+
+    from_pcm = EnergyProfile.from_pcm(memoryview(samples.tobytes()), rate, channels, block_seconds=block_seconds)
+    from_wav = EnergyProfile.from_wav_file(str(path), block_seconds=block_seconds)
+
+    for profile in (from_pcm, from_wav):
+        assert profile.length_ms == expected.length_ms
+        np.testing.assert_array_equal(profile.sq_prefix, expected.sq_prefix)
+        assert profile.detect_nonsilent(0, profile.length_ms, 200, -40) == \
+            expected.detect_nonsilent(0, expected.length_ms, 200, -40)
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -12,6 +12,17 @@ class Settings(BaseSettings):
     S3_ACCESS_KEY: str = "S3_ACCESS_KEY"
     S3_SECRET_KEY: str = "S3_SECRET_KEY"
     S3_BUCKET_NAME: str = "audio-management"
+    S3_BACKEND: str = "boto3"
+    # Upload HLS segments and a growing EVENT playlist while FFmpeg is still encoding
+    TRANSCODE_STREAMING: bool = False
+    TRANSCODE_POLL_SECONDS: float = 0.5
+    # HLS renditions as codec:bitrate ("aac" in MPEG-TS, "opus" in fMP4), e.g.
+    # ["aac:32k", "aac:64k", "aac:128k", "opus:48k"]. More than one (or a non-default
+    # one) encodes them in parallel. Each codec gets its own master playlist: AAC at
+    # hls/{job_id}/playlist.m3u8, other codecs at hls/{job_id}/playlist_{codec}.m3u8
+    # With PREPROCESS_INGEST_HLS the preprocessor writes HLS instead of this worker,
+    # which it only allows for the default ladder
+    TRANSCODE_LADDER: List[str] = ["aac:128k"]
 
     class Config:
         env_file = ".env"
@@ -4,7 +4,11 @@ import shutil
 import logging
 from pathlib import Path
 
-from audio_transcoder.utils.hls_generator import generate_hls_and_waveform
+from audio_transcoder.utils.hls_generator import (
+    DEFAULT_RENDITION, PLAYLIST_CONTENT_TYPE, PLAYLIST_NAME, Rendition, generate_hls_and_waveform,
+    generate_hls_ladder, init_segment, master_playlists, read_hls_playlist, render_hls_playlist,
+    start_hls_process
+)
 # FIX: Sửa import đúng chuẩn shared_
 from shared_messaging.producer import RabbitMQProducer
 from shared_schemas.commands import TranscodeCommand
@@ -15,9 +19,19 @@ logger = logging.getLogger(__name__)
 
 
 class AudioTranscoderService:
-    def __init__(self, s3: S3Client, producer: RabbitMQProducer):
+    def __init__(
+            self,
+            s3: S3Client,
+            producer: RabbitMQProducer,
+            streaming: bool = False,
+            poll_seconds: float = 0.5,
+            renditions: list[Rendition] | None = None
+    ):
         self.s3 = s3
         self.Producer = producer
+        self.streaming = streaming
+        self.poll_seconds = poll_seconds
+        self.renditions = renditions or [DEFAULT_RENDITION]
         # FIX: Resolve path
         self.temp_dir = Path("tmp/audio-transcoder").resolve()
         self.temp_dir.mkdir(parents=True, exist_ok=True)
@@ -36,17 +50,24 @@ class AudioTranscoderService:
             output_hls_dir.mkdir(parents=True, exist_ok=True)
             logger.info(f"Transcoding Job {job_id}...")
             await self.s3.download_file(command.input_path, str(input_file))
-            await asyncio.to_thread(generate_hls_and_waveform, str(input_file), str(output_hls_dir))
             s3_base_path = f"hls/{job_id}"
+            if self.renditions != [DEFAULT_RENDITION]:
+                await self._transcode_ladder(str(input_file), output_hls_dir, s3_base_path)
+            elif self.streaming:
+                await self._transcode_streaming(str(input_file), output_hls_dir, s3_base_path)
+            else:
+                await asyncio.to_thread(generate_hls_and_waveform, str(input_file), str(output_hls_dir))
 
-            for filename in os.listdir(output_hls_dir):
-                local_path = os.path.join(output_hls_dir, filename)
-                s3_key = f"{s3_base_path}/{filename}"
+                uploads = []
+                for filename in os.listdir(output_hls_dir):
+                    local_path = os.path.join(output_hls_dir, filename)
+                    s3_key = f"{s3_base_path}/{filename}"
 
-                if os.path.isfile(local_path):
-                    await self.s3.upload_file(local_path, s3_key)
+                    if os.path.isfile(local_path):
+                        uploads.append((local_path, s3_key))
+                await self.s3.upload_many(uploads)
 
-            playlist_path = f"{s3_base_path}/playlist.m3u8"
+            playlist_path = f"{s3_base_path}/{PLAYLIST_NAME}"
 
             event = TranscodeCompletedEvent(
                 job_id=job_id,
@@ -61,4 +82,112 @@ class AudioTranscoderService:
             raise e
 
         finally:
-            if job_dir.exists(): shutil.rmtree(job_dir)
\ No newline at end of file
+            if job_dir.exists(): shutil.rmtree(job_dir)
+
+    async def _transcode_ladder(self, input_file: str, output_hls_dir: Path, s3_base_path: str):
+        """Encode all renditions in parallel under `{rendition.name}/`, behind one master playlist per codec."""
+        if not self.streaming:
+            await generate_hls_ladder(input_file, str(output_hls_dir), self.renditions)
+            uploads = [
+                (str(path), f"{s3_base_path}/{path.relative_to(output_hls_dir).as_posix()}")
+                for path in output_hls_dir.rglob("*") if path.is_file()
+            ]
+            await self.s3.upload_many(uploads)
+            return
+
+        published = [asyncio.Event() for _ in self.renditions]
+
+        async def _publish_master():
+            # Only point players at variant playlists that exist.
+            await asyncio.gather(*[event.wait() for event in published])
+            for name, master in master_playlists(self.renditions).items():
+                await self.s3.put_bytes(master.encode("utf-8"), f"{s3_base_path}/{name}", PLAYLIST_CONTENT_TYPE)
+
+        tasks = [
+            asyncio.create_task(self._transcode_streaming(
+                input_file, output_hls_dir / r.name, f"{s3_base_path}/{r.name}", r, event
+            ))
+            for r, event in zip(self.renditions, published)
+        ]
+        tasks.append(asyncio.create_task(_publish_master()))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _transcode_streaming(
+            self,
+            input_file: str,
+            output_hls_dir: Path,
+            s3_base_path: str,
+            rendition: Rendition = DEFAULT_RENDITION,
+            first_published: asyncio.Event | None = None
+    ):
+        """Upload segments while FFmpeg is still encoding.
+
+        Every segment is uploaded as soon as the playlist lists it. After each poll, an
+        EVENT playlist covering the segments already in S3 is published, so playback
+        can start early. FFmpeg's final playlist, with its end tag, replaces it once
+        encoding succeeds.
+        """
+        process = await start_hls_process(input_file, str(output_hls_dir), rendition=rendition)
+        stderr = asyncio.create_task(process.stderr.read())
+        playlist_file = str(output_hls_dir / PLAYLIST_NAME)
+        playlist_key = f"{s3_base_path}/{PLAYLIST_NAME}"
+        uploads: dict[str, asyncio.Task] = {}
+        published = 0
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(process.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                finished = process.returncode is not None
+                header, entries = read_hls_playlist(playlist_file)
+                init = init_segment(header)
+                required = ([init] if init else []) + [segment for _, segment in entries]
+                for segment in required:
+                    if segment not in uploads:
+                        uploads[segment] = asyncio.create_task(
+                            self.s3.upload_file(str(output_hls_dir / segment), f"{s3_base_path}/{segment}")
+                        )
+                ready = 0
+                for segment in required:
+                    task = uploads[segment]
+                    if not task.done():
+                        break
+                    if task.exception():
+                        raise task.exception()
+                    ready += 1
+                if init:
+                    ready = max(0, ready - 1)
+                if ready > published and not finished:
+                    published = ready
+                    playlist = render_hls_playlist(header, entries[:ready])
+                    await self.s3.put_bytes(playlist.encode("utf-8"), playlist_key, PLAYLIST_CONTENT_TYPE)
+                    logger.info(f"Published {published} HLS segments to {playlist_key}")
+                    if first_published:
+                        first_published.set()
+                if finished:
+                    break
+
+            if process.returncode != 0:
+                message = (await stderr).decode("utf8", errors="replace").strip()
+                raise RuntimeError(f"Transcoding failed: {message}")
+            await asyncio.gather(*uploads.values())
+            with open(playlist_file, "rb") as f:
+                await self.s3.put_bytes(f.read(), playlist_key, PLAYLIST_CONTENT_TYPE)
+            if first_published:
+                first_published.set()
+            logger.info(f"HLS generated and uploaded while encoding: {len(uploads)} segments")
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            pending = [t for t in uploads.values() if not t.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*uploads.values(), return_exceptions=True)
+            await stderr
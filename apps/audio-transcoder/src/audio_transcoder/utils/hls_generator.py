@@ -1,38 +1,246 @@
+import asyncio
 import os
+import re
 import ffmpeg
 import logging
+from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
+PLAYLIST_NAME = "playlist.m3u8"
+PLAYLIST_CONTENT_TYPE = "application/vnd.apple.mpegurl"
+INIT_SEGMENT_NAME = "init.mp4"
+
+# HLS CODECS attribute per encoder
+_CODEC_TAGS = {"aac": "mp4a.40.2", "opus": "opus"}
+# Every HLS client decodes AAC, so it leads the main master playlist whenever the ladder has it.
+_PRIMARY_CODEC = "aac"
+_MAP_URI = re.compile(r'#EXT-X-MAP:.*URI="([^"]+)"')
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """One rung of the HLS ladder: AAC in MPEG-TS or Opus in fMP4."""
+    codec: str
+    bitrate: str
+
+    @classmethod
+    def parse(cls, spec: str) -> "Rendition":
+        """Parse "codec:bitrate", e.g. "aac:64k" or "opus:32k"."""
+        codec, _, bitrate = spec.partition(":")
+        if codec not in _CODEC_TAGS or not bitrate:
+            raise ValueError(f"Invalid HLS rendition '{spec}', expected one of {list(_CODEC_TAGS)} as codec:bitrate")
+        return cls(codec, bitrate)
+
+    @property
+    def name(self) -> str:
+        return f"{self.codec}_{self.bitrate}"
+
+    @property
+    def bits_per_second(self) -> int:
+        value = self.bitrate.lower()
+        scale = {"k": 1000, "m": 1000_000}.get(value[-1], 1)
+        return int(float(value.rstrip("km")) * scale)
+
+    def output_options(self, output_dir: str) -> dict:
+        if self.codec == "opus":
+            return dict(
+                acodec='libopus',
+                hls_segment_type='fmp4',
+                hls_fmp4_init_filename=INIT_SEGMENT_NAME,
+                hls_segment_filename=os.path.join(output_dir, "segment_%03d.m4s")
+            )
+        return dict(acodec='aac', hls_segment_filename=os.path.join(output_dir, "segment_%03d.ts"))
+
+
+DEFAULT_RENDITION = Rendition("aac", "128k")
+
+
+def _compile(stream, *global_args: str) -> list[str]:
+    """Command line for `stream` with `global_args` ahead of the inputs.
+
+    ffmpeg-python's global_args() lands after the outputs, where FFmpeg only sees
+    trailing options.
+    """
+    cmd, *args = stream.compile()
+    return [cmd, *global_args, *args]
+
+
+def _hls_output(
+        input_path: str,
+        output_dir: str,
+        segment_time: int,
+        rendition: Rendition = DEFAULT_RENDITION,
+        **options
+):
+    return ffmpeg.input(input_path).output(
+        os.path.join(output_dir, PLAYLIST_NAME),
+        format='hls',
+        audio_bitrate=rendition.bitrate,
+        hls_time=segment_time,
+        hls_list_size=0,
+        **rendition.output_options(output_dir),
+        **options
+    )
+
 
 def generate_hls_and_waveform(input_path: str, output_dir: str, segment_time: int = 10):
     os.makedirs(output_dir, exist_ok=True)
-    hls_playlist = os.path.join(output_dir, "playlist.m3u8")
-    hls_segment = os.path.join(output_dir, "segment_%03d.ts")
-
     try:
         logger.info(f"Start transcoding: {input_path}")
         (
-            ffmpeg
-            .input(input_path)
-            .output(
-                hls_playlist,
-                format='hls',
-                acodec='aac',
-                audio_bitrate='128k',
-                hls_time=segment_time,
-                hls_list_size=0,
-                hls_segment_filename=hls_segment
-            )
+            _hls_output(input_path, output_dir, segment_time)
             .overwrite_output()
             .run(capture_stdout=True, capture_stderr=True)
         )
         logger.info("HLS generated successfully.")
 
         return {
-            "playlist": "playlist.m3u8"
+            "playlist": PLAYLIST_NAME
         }
     except ffmpeg.Error as e:
         error_msg = e.stderr.decode('utf8') if e.stderr else str(e)
         logger.error(f"FFmpeg Transcode Error: {error_msg}")
-        raise RuntimeError(f"Transcoding failed: {error_msg}")
\ No newline at end of file
+        raise RuntimeError(f"Transcoding failed: {error_msg}")
+
+
+async def start_hls_process(
+        input_path: str,
+        output_dir: str,
+        segment_time: int = 10,
+        rendition: Rendition = DEFAULT_RENDITION,
+        playlist_type: str = 'event'
+) -> asyncio.subprocess.Process:
+    """Start the same HLS encode as generate_hls_and_waveform without waiting for it.
+
+    With the default 'event' type, FFmpeg rewrites the playlist after every segment
+    so it can be published while encoding; pass 'vod' when only the finished
+    playlist is used. Segments are written under a temporary name first, so
+    anything the playlist lists is complete on disk.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stream = _hls_output(
+        input_path, output_dir, segment_time, rendition,
+        hls_playlist_type=playlist_type, hls_flags='temp_file'
+    )
+    args = _compile(stream, '-nostats', '-loglevel', 'error', '-y')
+    logger.info(f"Start HLS encode ({rendition.name}): {input_path}")
+    return await asyncio.create_subprocess_exec(
+        *args,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE
+    )
+
+
+def read_hls_playlist(path: str) -> tuple[list[str], list[tuple[str, str]]]:
+    """Header lines and fully written (#EXTINF, segment) entries of a playlist being written."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+    except FileNotFoundError:
+        return [], []
+    # A line without its newline may still be in the middle of being written.
+    lines = text.split("\n")[:-1]
+    header: list[str] = []
+    entries: list[tuple[str, str]] = []
+    info = None
+    for line in lines:
+        if line.startswith("#EXTINF"):
+            info = line
+        elif info is not None and line and not line.startswith("#"):
+            entries.append((info, line))
+            info = None
+        elif not entries and info is None and line != "#EXT-X-ENDLIST":
+            header.append(line)
+    return header, entries
+
+
+def init_segment(header: list[str]) -> str | None:
+    """The fMP4 initialization segment a playlist header points to, if any."""
+    for line in header:
+        match = _MAP_URI.match(line)
+        if match:
+            return match.group(1)
+    return None
+
+
+def render_hls_playlist(header: list[str], entries: list[tuple[str, str]]) -> str:
+    return "\n".join(header + [line for entry in entries for line in entry]) + "\n"
+
+
+def master_playlist_name(codec: str) -> str:
+    return f"playlist_{codec}.m3u8"
+
+
+def master_playlist(renditions: list[Rendition]) -> str:
+    """Master playlist over `{rendition.name}/playlist.m3u8`, lowest bitrate first.
+
+    All renditions must share a codec: players switch freely between the variants
+    of one master, and switching between AAC/TS and Opus/fMP4 mid-stream is not
+    something they handle.
+    """
+    codecs = {r.codec for r in renditions}
+    if len(codecs) > 1:
+        raise ValueError(f"Master playlist mixes codecs {sorted(codecs)}")
+    lines = ["#EXTM3U", "#EXT-X-VERSION:7", "#EXT-X-INDEPENDENT-SEGMENTS"]
+    for rendition in sorted(renditions, key=lambda r: r.bits_per_second):
+        # Headroom for container overhead, which MPEG-TS adds a lot of at low bitrates.
+        bandwidth = int(rendition.bits_per_second * 1.25)
+        lines.append(
+            f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},AVERAGE-BANDWIDTH={rendition.bits_per_second},'
+            f'CODECS="{_CODEC_TAGS[rendition.codec]}"'
+        )
+        lines.append(f"{rendition.name}/{PLAYLIST_NAME}")
+    return "\n".join(lines) + "\n"
+
+
+def master_playlists(renditions: list[Rendition]) -> dict[str, str]:
+    """Master playlists by file name, one ABR ladder per codec.
+
+    PLAYLIST_NAME holds the AAC ladder (or the first codec's, if there is no AAC);
+    every other codec gets its own `playlist_{codec}.m3u8` for players that
+    advertise support for it.
+    """
+    by_codec: dict[str, list[Rendition]] = {}
+    for rendition in renditions:
+        by_codec.setdefault(rendition.codec, []).append(rendition)
+    primary = _PRIMARY_CODEC if _PRIMARY_CODEC in by_codec else renditions[0].codec
+    return {
+        PLAYLIST_NAME if codec == primary else master_playlist_name(codec): master_playlist(group)
+        for codec, group in by_codec.items()
+    }
+
+
+async def generate_hls_ladder(
+        input_path: str,
+        output_dir: str,
+        renditions: list[Rendition],
+        segment_time: int = 10
+):
+    """Encode every rendition in its own FFmpeg process, in parallel, plus the master playlists.
+
+    All renditions use the same segment duration. Renditions sharing a codec also
+    share the frame grid and therefore cut at identical boundaries.
+    """
+    logger.info(f"Start transcoding {len(renditions)} renditions: {input_path}")
+    processes = [
+        await start_hls_process(input_path, os.path.join(output_dir, r.name), segment_time, r, playlist_type='vod')
+        for r in renditions
+    ]
+    try:
+        results = await asyncio.gather(*[p.communicate() for p in processes])
+    finally:
+        for process in processes:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+    for rendition, process, (_, stderr) in zip(renditions, processes, results):
+        if process.returncode != 0:
+            error_msg = stderr.decode('utf8', errors='replace').strip()
+            logger.error(f"FFmpeg Transcode Error ({rendition.name}): {error_msg}")
+            raise RuntimeError(f"Transcoding failed: {error_msg}")
+    for name, playlist in master_playlists(renditions).items():
+        with open(os.path.join(output_dir, name), "w", encoding="utf-8") as f:
+            f.write(playlist)
+    logger.info("HLS ladder generated successfully.")
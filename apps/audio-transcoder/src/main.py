@@ -3,9 +3,10 @@ import logging
 
 from audio_transcoder.cores.config import settings
 from audio_transcoder.services.transcoder import AudioTranscoderService
+from audio_transcoder.utils.hls_generator import Rendition
 from shared_messaging.consumer import RabbitMQConsumer
 from shared_messaging.producer import RabbitMQProducer
-from shared_storage.s3 import S3Client
+from shared_storage.factory import create_s3_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -14,7 +15,8 @@ logger = logging.getLogger(__name__)
 async def main():
     logger.info("Starting Audio Transcoder Worker...")
 
-    s3 = S3Client(
+    s3 = create_s3_client(
+        settings.S3_BACKEND,
         bucket=settings.S3_BUCKET_NAME,
         endpoint=settings.S3_ENDPOINT,
         access_key=settings.S3_ACCESS_KEY,
@@ -24,7 +26,13 @@ async def main():
     Producer = RabbitMQProducer(settings.RABBITMQ_URL)
     await Producer.connect()
 
-    service = AudioTranscoderService(s3, Producer)
+    service = AudioTranscoderService(
+        s3,
+        Producer,
+        streaming=settings.TRANSCODE_STREAMING,
+        poll_seconds=settings.TRANSCODE_POLL_SECONDS,
+        renditions=[Rendition.parse(spec) for spec in settings.TRANSCODE_LADDER]
+    )
 
     consumer = RabbitMQConsumer(settings.RABBITMQ_URL, service_name="transcoder")
     await consumer.connect()
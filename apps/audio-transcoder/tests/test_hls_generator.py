@@ -0,0 +1,146 @@
+import asyncio
+import shutil
+import subprocess
+
+import pytest
+
+from audio_transcoder.utils.hls_generator import (
+    PLAYLIST_NAME,
+    Rendition,
+    generate_hls_ladder,
+    init_segment,
+    master_playlist,
+    master_playlist_name,
+    master_playlists,
+    read_hls_playlist,
+    render_hls_playlist,
+)
+
+needs_ffmpeg = pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+
+TS_HEADER = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:10", "#EXT-X-MEDIA-SEQUENCE:0",
+             "#EXT-X-PLAYLIST-TYPE:EVENT"]
+FMP4_HEADER = ["#EXTM3U", "#EXT-X-VERSION:7", "#EXT-X-TARGETDURATION:10", "#EXT-X-MEDIA-SEQUENCE:0",
+               "#EXT-X-PLAYLIST-TYPE:EVENT", '#EXT-X-MAP:URI="init.mp4"']
+ENTRIES = [("#EXTINF:10.000000,", "segment_000.ts"), ("#EXTINF:10.000000,", "segment_001.ts")]
+
+
+def _write(tmp_path, text: str) -> str:
+    path = tmp_path / PLAYLIST_NAME
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def _durations(path) -> list[str]:
+    return [info for info, _ in read_hls_playlist(str(path))[1]]
+
+
+def test_read_missing_playlist(tmp_path):
+    assert read_hls_playlist(str(tmp_path / PLAYLIST_NAME)) == ([], [])
+
+
+def test_read_round_trips_render(tmp_path):
+    path = _write(tmp_path, render_hls_playlist(TS_HEADER, ENTRIES))
+
+    assert read_hls_playlist(path) == (TS_HEADER, ENTRIES)
+
+
+@pytest.mark.parametrize("tail", [
+    "#EXTINF:10.000000,\nsegment_0",  # segment name still being written
+    "#EXTINF:10.000000,\n",  # duration without its segment yet
+    "#EXTINF:10.0",  # duration line itself cut short
+])
+def test_read_ignores_partial_last_entry(tmp_path, tail):
+    path = _write(tmp_path, render_hls_playlist(TS_HEADER, ENTRIES) + tail)
+
+    assert read_hls_playlist(path) == (TS_HEADER, ENTRIES)
+
+
+def test_read_drops_endlist(tmp_path):
+    path = _write(tmp_path, render_hls_playlist(TS_HEADER, ENTRIES) + "#EXT-X-ENDLIST\n")
+
+    assert read_hls_playlist(path) == (TS_HEADER, ENTRIES)
+
+
+def test_init_segment_from_map(tmp_path):
+    entries = [("#EXTINF:10.000000,", "segment_000.m4s")]
+    path = _write(tmp_path, render_hls_playlist(FMP4_HEADER, entries))
+
+    header, read_entries = read_hls_playlist(path)
+    assert read_entries == entries
+    assert init_segment(header) == "init.mp4"
+    assert init_segment(['#EXT-X-MAP:URI="init_1.mp4",BYTERANGE="720@0"']) == "init_1.mp4"
+    assert init_segment(TS_HEADER) is None
+    assert init_segment([]) is None
+
+
+@pytest.mark.parametrize("spec, bits_per_second", [
+    ("aac:64k", 64_000), ("aac:128K", 128_000), ("opus:32k", 32_000), ("opus:1.5m", 1_500_000),
+    ("aac:96000", 96_000),
+])
+def test_rendition_parse(spec, bits_per_second):
+    rendition = Rendition.parse(spec)
+
+    assert f"{rendition.codec}:{rendition.bitrate}" == spec
+    assert rendition.name == spec.replace(":", "_")
+    assert rendition.bits_per_second == bits_per_second
+
+
+@pytest.mark.parametrize("spec", ["", "aac", "aac:", ":64k", "mp3:64k", "AAC:64k"])
+def test_rendition_parse_errors(spec):
+    with pytest.raises(ValueError, match="Invalid HLS rendition"):
+        Rendition.parse(spec)
+
+
+def _variants(master: str) -> list[str]:
+    return [line for line in master.splitlines() if line and not line.startswith("#")]
+
+
+def test_one_master_per_codec_sorted_by_bitrate():
+    ladder = [Rendition.parse(s) for s in ("opus:64k", "aac:128k", "opus:32k", "aac:64k", "aac:96k")]
+
+    masters = master_playlists(ladder)
+
+    assert set(masters) == {PLAYLIST_NAME, master_playlist_name("opus")}
+    assert _variants(masters[PLAYLIST_NAME]) == [
+        f"aac_64k/{PLAYLIST_NAME}", f"aac_96k/{PLAYLIST_NAME}", f"aac_128k/{PLAYLIST_NAME}"
+    ]
+    assert _variants(masters[master_playlist_name("opus")]) == [f"opus_32k/{PLAYLIST_NAME}", f"opus_64k/{PLAYLIST_NAME}"]
+    assert 'CODECS="mp4a.40.2"' in masters[PLAYLIST_NAME]
+    assert 'CODECS="opus"' in masters[master_playlist_name("opus")]
+
+
+def test_first_codec_leads_without_aac():
+    masters = master_playlists([Rendition.parse("opus:48k"), Rendition.parse("opus:24k")])
+
+    assert list(masters) == [PLAYLIST_NAME]
+    assert _variants(masters[PLAYLIST_NAME]) == [f"opus_24k/{PLAYLIST_NAME}", f"opus_48k/{PLAYLIST_NAME}"]
+
+
+def test_master_rejects_mixed_codecs():
+    with pytest.raises(ValueError, match="mixes codecs"):
+        master_playlist([Rendition.parse("aac:64k"), Rendition.parse("opus:32k")])
+
+
+@needs_ffmpeg
+def test_same_codec_renditions_cut_at_identical_boundaries(tmp_path):
+    source = tmp_path / "input.wav"
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", "sine=f=440:d=23.3:sample_rate=44100", "-ac", "2", str(source)
+    ], check=True)
+    ladder = [Rendition.parse(s) for s in ("aac:64k", "aac:128k", "opus:32k", "opus:96k")]
+    output = tmp_path / "hls"
+
+    asyncio.run(generate_hls_ladder(str(source), str(output), ladder, segment_time=4))
+
+    assert (output / PLAYLIST_NAME).is_file()
+    assert (output / master_playlist_name("opus")).is_file()
+    for low, high in (ladder[:2], ladder[2:]):
+        durations = _durations(output / low.name / PLAYLIST_NAME)
+        assert len(durations) >= 5
+        assert durations == _durations(output / high.name / PLAYLIST_NAME)
+    for rendition in ladder:
+        header, entries = read_hls_playlist(str(output / rendition.name / PLAYLIST_NAME))
+        segments = [segment for _, segment in entries] + ([init_segment(header)] if rendition.codec == "opus" else [])
+        assert all((output / rendition.name / segment).is_file() for segment in segments)
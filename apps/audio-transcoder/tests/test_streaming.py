@@ -0,0 +1,202 @@
+import asyncio
+
+import pytest
+
+moto_server = pytest.importorskip("moto.server")
+boto3 = pytest.importorskip("boto3")
+
+from audio_transcoder.services import transcoder
+from audio_transcoder.utils.hls_generator import PLAYLIST_NAME, init_segment, read_hls_playlist
+from shared_storage.s3 import S3Client
+
+BUCKET = "voice-diary-test"
+REGION = "us-east-1"
+SEGMENTS = 6
+STEP_SECONDS = 0.05
+
+
+def _parse(text: str) -> tuple[list[str], list[tuple[str, str]]]:
+    """read_hls_playlist for a playlist body about to be published."""
+    lines = text.splitlines()
+    header = [line for line in lines if line.startswith("#") and not line.startswith("#EXTINF")]
+    entries = [(info, segment) for info, segment in zip(lines, lines[1:]) if info.startswith("#EXTINF")]
+    return header, entries
+
+
+class _FakeFFmpeg:
+    """Stands in for the HLS encode: writes a segment, then relists it, every step.
+
+    Each step writes the segment file before rewriting the playlist, as
+    hls_flags=temp_file does. With `fmp4`, the init segment and #EXT-X-MAP come
+    first. Exits with `returncode` after `segments` steps; build it inside the
+    running loop.
+    """
+
+    def __init__(self, output_dir: str, segments: int, returncode: int = 0, stderr: bytes = b"", fmp4: bool = False):
+        self.output_dir = output_dir
+        self.stderr = asyncio.StreamReader()
+        self.returncode = None
+        self._exit_code = returncode
+        self._stderr = stderr
+        self._suffix = "m4s" if fmp4 else "ts"
+        self._header = ["#EXTM3U", "#EXT-X-VERSION:7", "#EXT-X-TARGETDURATION:10", "#EXT-X-MEDIA-SEQUENCE:0",
+                        "#EXT-X-PLAYLIST-TYPE:EVENT"]
+        if fmp4:
+            self._header.append('#EXT-X-MAP:URI="init.mp4"')
+        self.final_playlist = None
+        self._writer = asyncio.create_task(self._encode(segments, fmp4))
+
+    def _write(self, name: str, text: str):
+        with open(f"{self.output_dir}/{name}", "w", encoding="utf-8") as f:
+            f.write(text)
+
+    async def _encode(self, segments: int, fmp4: bool):
+        if fmp4:
+            self._write("init.mp4", "init")
+        lines = list(self._header)
+        for i in range(segments):
+            await asyncio.sleep(STEP_SECONDS)
+            segment = f"segment_{i:03d}.{self._suffix}"
+            self._write(segment, f"audio {i}")
+            lines += ["#EXTINF:10.000000,", segment]
+            self._write(PLAYLIST_NAME, "\n".join(lines) + "\n")
+        if self._exit_code == 0:
+            self.final_playlist = "\n".join(lines + ["#EXT-X-ENDLIST"]) + "\n"
+            self._write(PLAYLIST_NAME, self.final_playlist)
+        self.stderr.feed_data(self._stderr)
+        self.stderr.feed_eof()
+        self.returncode = self._exit_code
+
+    async def wait(self) -> int:
+        await asyncio.wait([self._writer])
+        return self.returncode
+
+    def kill(self):
+        self._writer.cancel()
+        self.returncode = -9
+        if not self.stderr.at_eof():
+            self.stderr.feed_eof()
+
+
+class _CheckedS3(S3Client):
+    """Asserts, on every playlist put, that S3 already holds each segment it lists.
+
+    Uploads are delayed in reverse order, so later segments land before earlier ones.
+    """
+
+    def __init__(self, *args, fail_on: str | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail_on = fail_on
+        self.playlists: list[str] = []
+
+    async def upload_file(self, local_path: str, object_key: str) -> None:
+        name = object_key.rsplit("/", 1)[-1]
+        if name == self.fail_on:
+            raise OSError(f"upload of {name} failed")
+        digits = "".join(c for c in name if c.isdigit())
+        await asyncio.sleep(STEP_SECONDS * (SEGMENTS - int(digits or 0)) / 2)
+        await super().upload_file(local_path, object_key)
+
+    async def put_bytes(self, data: bytes, object_key: str, content_type: str = "application/octet-stream") -> None:
+        if object_key.endswith(PLAYLIST_NAME):
+            prefix = object_key.rsplit("/", 1)[0]
+            stored = set(await self.list_files(prefix))
+            text = data.decode("utf-8")
+            header, entries = _parse(text)
+            init = init_segment(header)
+            for segment in ([init] if init else []) + [segment for _, segment in entries]:
+                assert f"{prefix}/{segment}" in stored, f"{segment} listed before it was uploaded"
+            self.playlists.append(text)
+        await super().put_bytes(data, object_key, content_type)
+
+
+@pytest.fixture(scope="module")
+def endpoint():
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    url = f"http://{host}:{port}"
+    boto3.client(
+        "s3", endpoint_url=url, region_name=REGION, aws_access_key_id="test", aws_secret_access_key="test"
+    ).create_bucket(Bucket=BUCKET)
+    yield url
+    server.stop()
+
+
+def _service(endpoint: str, monkeypatch, tmp_path, fail_on: str | None = None, **fake_options):
+    processes = []
+
+    async def _start(input_file: str, output_dir: str, rendition=None):
+        processes.append(_FakeFFmpeg(output_dir, SEGMENTS, **fake_options))
+        return processes[-1]
+    monkeypatch.setattr(transcoder, "start_hls_process", _start)
+    monkeypatch.chdir(tmp_path)
+    s3 = _CheckedS3(BUCKET, endpoint, "test", "test", region=REGION, fail_on=fail_on)
+    service = transcoder.AudioTranscoderService(s3, producer=None, streaming=True, poll_seconds=STEP_SECONDS / 2)
+    return service, s3, processes
+
+
+def _run(service, tmp_path, job_id: str, leftover: list[asyncio.Task]):
+    """Runs _transcode_streaming; `leftover` gets the tasks still pending once it returns or raises."""
+    output_dir = tmp_path / job_id
+    output_dir.mkdir()
+
+    async def run():
+        try:
+            await service._transcode_streaming("input.wav", output_dir, f"hls/{job_id}")
+        finally:
+            leftover.extend(t for t in asyncio.all_tasks() if t is not asyncio.current_task())
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("fmp4", [False, True])
+def test_playlist_only_lists_uploaded_segments(endpoint, monkeypatch, tmp_path, fmp4):
+    job_id = f"job-ok-{int(fmp4)}"
+    service, s3, processes = _service(endpoint, monkeypatch, tmp_path, fmp4=fmp4)
+
+    leftover = []
+    _run(service, tmp_path, job_id, leftover)
+    assert leftover == []
+
+    # At least one EVENT playlist went out while encoding, each listing more than the last
+    *early, final = s3.playlists
+    assert early
+    counts = [len(_parse(text)[1]) for text in early]
+    assert counts == sorted(set(counts)) and counts[-1] <= SEGMENTS
+    assert all("#EXT-X-ENDLIST" not in text for text in early)
+
+    # FFmpeg's own final playlist replaces it
+    assert final == processes[0].final_playlist
+    stored = s3.client.get_object(Bucket=BUCKET, Key=f"hls/{job_id}/{PLAYLIST_NAME}")["Body"].read()
+    assert stored.decode("utf-8") == processes[0].final_playlist
+    assert stored.decode("utf-8").endswith("#EXT-X-ENDLIST\n")
+    header, entries = read_hls_playlist(str(tmp_path / job_id / PLAYLIST_NAME))
+    expected = {f"hls/{job_id}/{segment}" for _, segment in entries} | {f"hls/{job_id}/{PLAYLIST_NAME}"}
+    if fmp4:
+        expected.add(f"hls/{job_id}/{init_segment(header)}")
+    assert set(asyncio.run(s3.list_files(f"hls/{job_id}"))) == expected
+
+
+def test_ffmpeg_failure_raises_and_leaves_no_tasks(endpoint, monkeypatch, tmp_path):
+    service, s3, _ = _service(
+        endpoint, monkeypatch, tmp_path, returncode=1, stderr=b"Invalid data found when processing input"
+    )
+    leftover = []
+
+    with pytest.raises(RuntimeError, match="Invalid data found"):
+        _run(service, tmp_path, "job-bad", leftover)
+
+    assert leftover == []
+    assert all("#EXT-X-ENDLIST" not in text for text in s3.playlists)
+
+
+def test_upload_failure_kills_ffmpeg_and_leaves_no_tasks(endpoint, monkeypatch, tmp_path):
+    service, s3, processes = _service(endpoint, monkeypatch, tmp_path, fail_on="segment_000.ts")
+    leftover = []
+
+    with pytest.raises(OSError, match="segment_000.ts"):
+        _run(service, tmp_path, "job-upload", leftover)
+
+    assert leftover == []
+    assert processes[0].returncode == -9
+    assert all("segment_000.ts" not in text for text in s3.playlists)
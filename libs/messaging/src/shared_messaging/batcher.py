@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Collects items submitted by concurrent handlers and processes them together.
+
+    A batch is flushed when `max_batch_size` items are pending or `max_wait_ms`
+    has elapsed since the first one arrived. `process_batch` must return one
+    result per item, in order; an Exception in the result list fails only that item.
+    """
+
+    def __init__(
+            self,
+            process_batch: Callable[[list[T]], Awaitable[list[R | Exception]]],
+            *,
+            max_batch_size: int,
+            max_wait_ms: int,
+            name: str = "batcher"
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue: asyncio.Queue[tuple[T, asyncio.Future]] = asyncio.Queue()
+        self._worker: asyncio.Task | None = None
+
+    async def submit(self, item: T) -> R:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def close(self):
+        if self._worker:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    async def _collect(self) -> list[tuple[T, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            logger.debug(f"[{self.name}] Flushing batch of {len(items)}")
+            try:
+                results = await self.process_batch(items)
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Batch returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                logger.exception(f"[{self.name}] Batch of {len(items)} failed: {e}")
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+import aio_pika
+
+logger = logging.getLogger(__name__)
+
+
+class CancellationCache:
+    """In-process view of which jobs are cancelled.
+
+    Cancellations are pushed in (mark_cancelled / listen) and kept for
+    `cancelled_ttl` seconds. When a `lookup` is given, unknown jobs are resolved
+    through it and a "not cancelled" answer is trusted for only `ttl` seconds, so a
+    missed notification delays a cancellation by at most that long.
+    """
+
+    def __init__(
+            self,
+            lookup: Callable[[str], Awaitable[bool]] | None = None,
+            *,
+            ttl: float = 5.0,
+            cancelled_ttl: float = 3600.0,
+            max_entries: int = 10_000
+    ):
+        self.lookup = lookup
+        self.ttl = ttl
+        self.cancelled_ttl = cancelled_ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[bool, float]] = OrderedDict()
+        self._connection: aio_pika.RobustConnection | None = None
+
+    def _store(self, job_id: str, cancelled: bool):
+        ttl = self.cancelled_ttl if cancelled else self.ttl
+        self._entries[job_id] = (cancelled, time.monotonic() + ttl)
+        self._entries.move_to_end(job_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def mark_cancelled(self, job_id: str):
+        self._store(job_id, True)
+
+    def forget(self, job_id: str):
+        self._entries.pop(job_id, None)
+
+    async def is_cancelled(self, job_id: str) -> bool:
+        entry = self._entries.get(job_id)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        if self.lookup is None:
+            self._entries.pop(job_id, None)
+            return False
+        cancelled = await self.lookup(job_id)
+        self._store(job_id, cancelled)
+        return cancelled
+
+    async def skip(self, job_id: str, what: str = "work") -> bool:
+        """Worker-side guard: True (and logged) when `what` for `job_id` should be dropped."""
+        if await self.is_cancelled(job_id):
+            logger.info(f"Job {job_id} is cancelled, skipping {what}")
+            return True
+        return False
+
+    async def listen(
+            self,
+            amqp_url: str,
+            exchange_name: str = "audio_events",
+            routing_key: str = "event.job_cancelled"
+    ):
+        """Feed the cache from job-cancelled events.
+
+        Each process binds its own exclusive queue, so every replica sees every
+        cancellation instead of competing for it.
+        """
+        self._connection = await aio_pika.connect_robust(amqp_url, heartbeat=600)
+        channel = await self._connection.channel()
+        exchange = await channel.declare_exchange(exchange_name, type=aio_pika.ExchangeType.TOPIC, durable=True)
+        queue = await channel.declare_queue(exclusive=True, auto_delete=True)
+        await queue.bind(exchange, routing_key=routing_key)
+
+        async def on_message(message: aio_pika.IncomingMessage):
+            async with message.process():
+                try:
+                    job_id = json.loads(message.body.decode()).get("job_id")
+                except ValueError:
+                    logger.warning("Ignoring malformed cancellation event")
+                    return
+                if job_id:
+                    logger.info(f"Job {job_id} cancelled, skipping its remaining work")
+                    self.mark_cancelled(job_id)
+
+        await queue.consume(on_message)
+        logger.info(f"Listening for cancellations on {exchange_name}/{routing_key}")
+
+    async def close(self):
+        if self._connection:
+            await self._connection.close()
+            self._connection = None
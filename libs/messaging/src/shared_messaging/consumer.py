@@ -3,29 +3,84 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
+import time
 import aio_pika
+from dataclasses import dataclass
 from typing import Callable, Awaitable
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class QueueMetrics:
+    concurrency: int
+    in_flight: int = 0
+    processed: int = 0
+    failed: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    def record(self, latency: float, ok: bool):
+        if ok:
+            self.processed += 1
+        else:
+            self.failed += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def snapshot(self) -> dict:
+        handled = self.processed + self.failed
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_latency_ms": (self.total_latency / handled) * 1000 if handled else 0.0,
+            "max_latency_ms": self.max_latency * 1000,
+        }
+
+
 class RabbitMQConsumer:
-    def __init__(self, amqp_url: str, service_name: str):
+    def __init__(self, amqp_url: str, service_name: str, default_concurrency: int = 1):
         self.amqp_url = amqp_url
         self.service_name = service_name
+        self.default_concurrency = max(1, default_concurrency)
         self.connection: aio_pika.RobustConnection | None = None
         self.channel: aio_pika.RobustChannel | None = None
+        self.metrics: dict[str, QueueMetrics] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._consumers: list[tuple[aio_pika.abc.AbstractQueue, str]] = []
 
     async def connect(self):
         self.connection = await aio_pika.connect_robust(self.amqp_url, heartbeat=600)
         self.channel = await self.connection.channel()
-        await self.channel.set_qos(prefetch_count=1)
+        await self.channel.set_qos(prefetch_count=self.default_concurrency)
         logger.info(f"RabbitMQ Consumer ({self.service_name}) connected")
 
-    async def close(self):
+    async def close(self, drain_timeout: float = 30.0):
+        await self._stop_consuming()
+        if self._tasks:
+            logger.info(f"Draining {len(self._tasks)} in-flight handler(s) for {self.service_name}...")
+            _, pending = await asyncio.wait(set(self._tasks), timeout=drain_timeout)
+            if pending:
+                logger.warning(f"{len(pending)} handler(s) still running after {drain_timeout}s, cancelling")
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
         if self.connection:
             await self.connection.close()
 
+    async def _stop_consuming(self):
+        for queue, consumer_tag in self._consumers:
+            try:
+                await queue.cancel(consumer_tag)
+            except Exception as e:
+                logger.warning(f"Failed to cancel consumer on '{queue.name}': {e}")
+        self._consumers = []
+
+    def get_metrics(self) -> dict[str, dict]:
+        return {queue_name: m.snapshot() for queue_name, m in self.metrics.items()}
+
     async def subscribe(
             self,
             exchange_name: str,
@@ -33,7 +88,8 @@ class RabbitMQConsumer:
             handler: Callable[[dict], Awaitable[None]],
             *,
             max_retries: int = 3,
-            dlq_suffix: str = ".dlq"
+            dlq_suffix: str = ".dlq",
+            concurrency: int | None = None
     ):
         if not self.channel:
             raise RuntimeError("Please call connect() before subscribe()")
@@ -63,15 +119,22 @@ class RabbitMQConsumer:
         logger.info(f"Bound queue '{queue_name}' to '{exchange_name}' with key '{routing_key}'")
         logger.info(f"Bound DLQ '{dlq_queue_name}' to '{dlq_exchange_name}' with key '{routing_key}'")
 
+        concurrency = max(1, concurrency or self.default_concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+        metrics = self.metrics.setdefault(queue_name, QueueMetrics(concurrency=concurrency))
+
         async def on_message(message: aio_pika.IncomingMessage):
             should_ack = False
             should_reject = False
 
+            started = time.perf_counter()
             try:
                 data = json.loads(message.body.decode())
                 await handler(data)
                 should_ack = True
+                metrics.record(time.perf_counter() - started, ok=True)
             except Exception as e:
+                metrics.record(time.perf_counter() - started, ok=False)
                 logger.exception(f"Handler failed for queue '{queue_name}': {e}")
                 try:
                     headers = dict(message.headers or {})
@@ -128,8 +191,21 @@ class RabbitMQConsumer:
                 except Exception as ack_error:
                     logger.exception(f"Failed to ack/reject message: {ack_error}")
 
-        def callback(message: aio_pika.IncomingMessage):
-            asyncio.create_task(on_message(message))
+        async def run_bounded(message: aio_pika.IncomingMessage):
+            async with semaphore:
+                metrics.in_flight += 1
+                try:
+                    await on_message(message)
+                finally:
+                    metrics.in_flight -= 1
 
-        await self.channel.set_qos(prefetch_count=1)
-        await queue.consume(callback)
\ No newline at end of file
+        def callback(message: aio_pika.IncomingMessage):
+            task = asyncio.create_task(run_bounded(message))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        # Prefetch applies to consumers created after this call, so each queue gets its own window.
+        await self.channel.set_qos(prefetch_count=concurrency)
+        consumer_tag = await queue.consume(callback)
+        self._consumers.append((queue, consumer_tag))
+        logger.info(f"Consuming '{queue_name}' with concurrency={concurrency}")
\ No newline at end of file
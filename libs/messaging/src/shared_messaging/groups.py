@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import logging
+
+from pydantic import BaseModel
+
+from shared_messaging.producer import RabbitMQProducer
+
+logger = logging.getLogger(__name__)
+
+
+async def retry_failed_members(
+        producer: RabbitMQProducer,
+        exchange_name: str,
+        routing_key: str,
+        group: BaseModel,
+        failed: list[tuple[BaseModel, Exception]],
+        *,
+        max_retries: int = 3,
+        dlq_suffix: str = ".dlq"
+):
+    """Send only the failed members of a chunk group around again.
+
+    The consumer retries a failed message as a whole, which would reprocess (and
+    republish) the members that already succeeded. Instead the handler acks the
+    original and this republishes a group of just the failed members with
+    `attempt` bumped; after `max_retries` that group goes to the same DLQ the
+    consumer would have used.
+    """
+    retry = group.model_copy(update={
+        "items": [item for item, _ in failed],
+        "attempt": group.attempt + 1
+    })
+    summary = f"{len(failed)} member(s) of {routing_key} group for {group.job_id} failed: {failed[0][1]}"
+    if group.attempt < max_retries:
+        await producer.publish(exchange_name, routing_key, retry)
+        logger.warning(f"{summary}. Retry {retry.attempt}/{max_retries}")
+    else:
+        await producer.publish(f"{exchange_name}{dlq_suffix}", routing_key, retry)
+        logger.error(f"{summary}. Moved to DLQ after {group.attempt} retries")
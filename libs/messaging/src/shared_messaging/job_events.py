@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+import logging
+from typing import Callable
+
+import aio_pika
+
+logger = logging.getLogger(__name__)
+
+# (exchange, routing key) of every event that ends a job
+JOB_END_EVENTS = [
+    ("worker_events", "job.finalized"),
+    ("audio_events", "event.job_failed"),
+    ("audio_events", "event.job_cancelled"),
+]
+
+
+class JobEndListener:
+    """Calls `on_end(job_id)` whenever a job is finalized, fails or is cancelled.
+
+    For per-node state such as the local PCM store. As with
+    CancellationCache.listen, each process binds its own exclusive queue, so every
+    replica hears every job end.
+    """
+
+    def __init__(self, on_end: Callable[[str], None]):
+        self.on_end = on_end
+        self._connection: aio_pika.RobustConnection | None = None
+
+    async def listen(self, amqp_url: str):
+        self._connection = await aio_pika.connect_robust(amqp_url, heartbeat=600)
+        channel = await self._connection.channel()
+        queue = await channel.declare_queue(exclusive=True, auto_delete=True)
+        for exchange_name, routing_key in JOB_END_EVENTS:
+            exchange = await channel.declare_exchange(exchange_name, type=aio_pika.ExchangeType.TOPIC, durable=True)
+            await queue.bind(exchange, routing_key=routing_key)
+
+        async def on_message(message: aio_pika.IncomingMessage):
+            async with message.process():
+                try:
+                    job_id = json.loads(message.body.decode()).get("job_id")
+                except ValueError:
+                    logger.warning(f"Ignoring malformed {message.routing_key} event")
+                    return
+                if not job_id:
+                    return
+                try:
+                    self.on_end(job_id)
+                except Exception as e:
+                    logger.error(f"Job end handler failed for {job_id}: {e}")
+
+        await queue.consume(on_message)
+        logger.info(f"Listening for job ends on {[key for _, key in JOB_END_EVENTS]}")
+
+    async def close(self):
+        if self._connection:
+            await self._connection.close()
+            self._connection = None
@@ -17,6 +17,12 @@ class EnhanceCommand(BaseModel):
     s3_path: str
     start_ms: int
     end_ms: int
+    ranged: bool = False
+
+class EnhanceGroupCommand(BaseModel):
+    job_id: str
+    items: List[EnhanceCommand]
+    attempt: int = 0
 
 class DiarizeCommand(BaseModel):
     job_id: str
@@ -28,6 +34,12 @@ class LanguageDetectCommand(BaseModel):
     index: int
     start_ms: int
     end_ms: int
+    ranged: bool = False
+
+class LanguageDetectGroupCommand(BaseModel):
+    job_id: str
+    items: List[LanguageDetectCommand]
+    attempt: int = 0
 
 class RecognizeCommand(BaseModel):
     job_id: str
@@ -36,6 +48,12 @@ class RecognizeCommand(BaseModel):
     start_ms: int
     end_ms: int
     language: str
+    ranged: bool = False
+
+class RecognizeGroupCommand(BaseModel):
+    job_id: str
+    items: List[RecognizeCommand]
+    attempt: int = 0
 
 class TranscodeCommand(BaseModel):
     job_id: str
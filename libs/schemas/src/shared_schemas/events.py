@@ -13,6 +13,8 @@ class FileUploadedEvent(BaseModel):
 class PreprocessCompletedEvent(BaseModel):
     job_id: str
     clean_audio_path: str
+    # Set when the preprocessor also produced the HLS rendition (fused ingest)
+    hls_path: Optional[str] = None
 
 
 class SegmentCompletedEvent(BaseModel):
@@ -28,6 +30,11 @@ class EnhancementCompletedEvent(BaseModel):
     is_denoised: bool
     start_ms: int
     end_ms: int
+    ranged: bool = False
+
+class EnhancementGroupCompletedEvent(BaseModel):
+    job_id: str
+    results: List[EnhancementCompletedEvent]
 
 class DiarizationCompletedEvent(BaseModel):
     job_id: str
@@ -41,6 +48,11 @@ class LanguageDetectionCompletedEvent(BaseModel):
     input_path: str
     start_ms: int
     end_ms: int
+    ranged: bool = False
+
+class LanguageDetectionGroupCompletedEvent(BaseModel):
+    job_id: str
+    results: List[LanguageDetectionCompletedEvent]
 
 class RecognitionCompletedEvent(BaseModel):
     job_id: str
@@ -51,6 +63,10 @@ class RecognitionCompletedEvent(BaseModel):
     end_ms: int
     transcript_s3_path: Optional[str] = None
 
+class RecognitionGroupCompletedEvent(BaseModel):
+    job_id: str
+    results: List[RecognitionCompletedEvent]
+
 class TranscodeCompletedEvent(BaseModel):
     job_id: str
     hls_path: str
@@ -0,0 +1,355 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Any, Optional
+
+import botocore.session
+from aiobotocore.session import get_session
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from shared_storage.s3 import MB, HeadFinalizer, StreamReader, TransferStats, read_block, stream_parts
+
+logger = logging.getLogger(__name__)
+
+_STREAM_CHUNK = 1 * MB
+
+
+class AsyncS3Client:
+    """S3Client backend on aiobotocore: same methods, no threads per request.
+
+    One client (and its aiohttp keep-alive pool) is opened lazily and reused for
+    the life of the process; call close() on shutdown.
+    """
+
+    def __init__(
+            self,
+            bucket: str,
+            endpoint: str,
+            access_key: str,
+            secret_key: str,
+            *,
+            region: Optional[str] = None,
+            bulk_concurrency: int = 16,
+            transfer_threads: int = 8,
+            multipart_threshold_mb: int = 16,
+            multipart_chunksize_mb: int = 8,
+            max_pool_connections: Optional[int] = None
+    ):
+        self.bucket = bucket
+        self.bulk_concurrency = max(1, bulk_concurrency)
+        self.part_concurrency = max(1, transfer_threads)
+        self.multipart_threshold = multipart_threshold_mb * MB
+        self.multipart_chunksize = multipart_chunksize_mb * MB
+        pool_size = max_pool_connections or max(10, self.bulk_concurrency + transfer_threads)
+        self._client_kwargs = dict(
+            endpoint_url=endpoint,
+            region_name=region,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            config=Config(signature_version='s3v4', max_pool_connections=pool_size)
+        )
+        # Presigning is pure local signing, so a plain botocore client serves it without I/O.
+        self._signer = botocore.session.get_session().create_client('s3', **self._client_kwargs)
+        self._exit_stack: AsyncExitStack | None = None
+        self._client = None
+        self._client_lock = asyncio.Lock()
+        self.stats = {"upload": TransferStats(), "download": TransferStats()}
+
+    async def _get_client(self):
+        if self._client is None:
+            async with self._client_lock:
+                if self._client is None:
+                    self._exit_stack = AsyncExitStack()
+                    self._client = await self._exit_stack.enter_async_context(
+                        get_session().create_client('s3', **self._client_kwargs)
+                    )
+        return self._client
+
+    async def close(self):
+        if self._exit_stack:
+            await self._exit_stack.aclose()
+        self._exit_stack = None
+        self._client = None
+
+    def generate_presigned_url(self, object_key: str, content_type: str) -> str:
+        return self._signer.generate_presigned_url(
+            ClientMethod='put_object',
+            Params={'Bucket': self.bucket, 'Key': object_key, 'ContentType': content_type},
+            ExpiresIn=900
+        )
+
+    def generate_presigned_get_url(self, object_key: str, expires_in: int = 3600) -> str:
+        return self._signer.generate_presigned_url(
+            ClientMethod='get_object',
+            Params={'Bucket': self.bucket, 'Key': object_key},
+            ExpiresIn=expires_in
+        )
+
+    async def _put_multipart(self, client, local_path: str, object_key: str, size: int):
+        upload = await client.create_multipart_upload(Bucket=self.bucket, Key=object_key)
+        upload_id = upload['UploadId']
+        semaphore = asyncio.Semaphore(self.part_concurrency)
+
+        async def _part(number: int, offset: int):
+            async with semaphore:
+                def _read():
+                    with open(local_path, 'rb') as f:
+                        f.seek(offset)
+                        return f.read(self.multipart_chunksize)
+                body = await asyncio.to_thread(_read)
+                resp = await client.upload_part(
+                    Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                    PartNumber=number, Body=body
+                )
+                return {'PartNumber': number, 'ETag': resp['ETag']}
+
+        try:
+            offsets = range(0, size, self.multipart_chunksize)
+            parts = await asyncio.gather(*[_part(i + 1, off) for i, off in enumerate(offsets)])
+            await client.complete_multipart_upload(
+                Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+        except Exception:
+            await client.abort_multipart_upload(Bucket=self.bucket, Key=object_key, UploadId=upload_id)
+            raise
+
+    async def _put_multipart_bytes(self, client, data: bytes, object_key: str, content_type: str):
+        upload = await client.create_multipart_upload(Bucket=self.bucket, Key=object_key, ContentType=content_type)
+        upload_id = upload['UploadId']
+        semaphore = asyncio.Semaphore(self.part_concurrency)
+        view = memoryview(data)
+
+        async def _part(number: int, offset: int):
+            async with semaphore:
+                resp = await client.upload_part(
+                    Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                    PartNumber=number, Body=bytes(view[offset:offset + self.multipart_chunksize])
+                )
+                return {'PartNumber': number, 'ETag': resp['ETag']}
+
+        try:
+            offsets = range(0, len(data), self.multipart_chunksize)
+            parts = await asyncio.gather(*[_part(i + 1, off) for i, off in enumerate(offsets)])
+            await client.complete_multipart_upload(
+                Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+        except Exception:
+            await client.abort_multipart_upload(Bucket=self.bucket, Key=object_key, UploadId=upload_id)
+            raise
+
+    async def put_bytes(self, data: bytes, object_key: str, content_type: str = "application/octet-stream") -> None:
+        started = time.perf_counter()
+        try:
+            client = await self._get_client()
+            if len(data) >= self.multipart_threshold:
+                await self._put_multipart_bytes(client, data, object_key, content_type)
+            else:
+                await client.put_object(Bucket=self.bucket, Key=object_key, Body=data, ContentType=content_type)
+            self.stats["upload"].record(len(data), time.perf_counter() - started)
+            logger.info(f"Uploaded {len(data)} bytes -> s3://{self.bucket}/{object_key}")
+        except ClientError as e:
+            self.stats["upload"].errors += 1
+            logger.error(f"Failed to upload bytes to {object_key}: {e}")
+            raise
+
+    async def upload_stream(
+            self,
+            read: StreamReader,
+            object_key: str,
+            content_type: str = "application/octet-stream",
+            finalize: HeadFinalizer | None = None
+    ) -> int:
+        started = time.perf_counter()
+        try:
+            client = await self._get_client()
+            head = await read_block(read, self.multipart_chunksize)
+            if len(head) < self.multipart_chunksize:
+                if finalize:
+                    head = await finalize(head, len(head))
+                await client.put_object(Bucket=self.bucket, Key=object_key, Body=head, ContentType=content_type)
+                total = len(head)
+            else:
+                upload = await client.create_multipart_upload(
+                    Bucket=self.bucket, Key=object_key, ContentType=content_type
+                )
+                upload_id = upload['UploadId']
+
+                async def _part(number: int, body: bytes) -> dict:
+                    resp = await client.upload_part(
+                        Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                        PartNumber=number, Body=body
+                    )
+                    return {'PartNumber': number, 'ETag': resp['ETag']}
+
+                try:
+                    parts, total = await stream_parts(
+                        read, head, self.multipart_chunksize, self.part_concurrency, _part, finalize
+                    )
+                    await client.complete_multipart_upload(
+                        Bucket=self.bucket, Key=object_key, UploadId=upload_id,
+                        MultipartUpload={'Parts': parts}
+                    )
+                except BaseException:
+                    await client.abort_multipart_upload(Bucket=self.bucket, Key=object_key, UploadId=upload_id)
+                    raise
+        except Exception as e:
+            self.stats["upload"].errors += 1
+            logger.error(f"Failed to stream upload to {object_key}: {e}")
+            raise
+        self.stats["upload"].record(total, time.perf_counter() - started)
+        logger.info(f"Streamed {total} bytes -> s3://{self.bucket}/{object_key}")
+        return total
+
+    async def put_text(self, text: str, object_key: str, encoding: str = 'utf-8') -> None:
+        await self.put_bytes(text.encode(encoding), object_key, f"text/plain; charset={encoding}")
+
+    async def put_json(self, obj: Any, object_key: str, indent: Optional[int] = None) -> None:
+        data = json.dumps(obj, ensure_ascii=False, indent=indent).encode('utf-8')
+        await self.put_bytes(data, object_key, "application/json")
+
+    async def get_bytes(self, object_key: str) -> bytes:
+        try:
+            client = await self._get_client()
+            response = await client.get_object(Bucket=self.bucket, Key=object_key)
+            async with response['Body'] as stream:
+                return await stream.read()
+        except ClientError as e:
+            logger.error(f"Failed to read {object_key}: {e}")
+            raise
+
+    async def upload_file(self, local_path: str, object_key: str) -> None:
+        started = time.perf_counter()
+        try:
+            client = await self._get_client()
+            size = await asyncio.to_thread(os.path.getsize, local_path)
+            if size >= self.multipart_threshold:
+                await self._put_multipart(client, local_path, object_key, size)
+            else:
+                body = await asyncio.to_thread(Path(local_path).read_bytes)
+                await client.put_object(Bucket=self.bucket, Key=object_key, Body=body)
+            self.stats["upload"].record(size, time.perf_counter() - started)
+            logger.info(f"Uploaded {local_path} -> s3://{self.bucket}/{object_key}")
+        except ClientError as e:
+            self.stats["upload"].errors += 1
+            logger.error(f"Failed to upload {local_path} to {object_key}: {e}")
+            raise
+
+    async def download_file(self, object_key: str, local_path: str) -> None:
+        started = time.perf_counter()
+        try:
+            path_obj = Path(local_path).resolve()
+            await asyncio.to_thread(path_obj.parent.mkdir, parents=True, exist_ok=True)
+            client = await self._get_client()
+            response = await client.get_object(Bucket=self.bucket, Key=object_key)
+            size = 0
+            # Disk writes go to a worker thread so a slow volume doesn't stall the event loop.
+            f = await asyncio.to_thread(open, path_obj, 'wb')
+            try:
+                # Entering the body yields the raw aiohttp response, whose read() takes
+                # no size; chunked reads go through the StreamingBody itself.
+                body = response['Body']
+                async with body:
+                    while chunk := await body.read(_STREAM_CHUNK):
+                        await asyncio.to_thread(f.write, chunk)
+                        size += len(chunk)
+            finally:
+                await asyncio.to_thread(f.close)
+            self.stats["download"].record(size, time.perf_counter() - started)
+            logger.info(f"Downloaded s3://{self.bucket}/{object_key} -> {local_path}")
+        except ClientError as e:
+            self.stats["download"].errors += 1
+            logger.error(f"Failed to download {object_key} to {local_path}: {e}")
+            raise
+
+    async def _bulk(self, fn, pairs: list[tuple[str, str]], concurrency: Optional[int]) -> None:
+        semaphore = asyncio.Semaphore(min(concurrency or self.bulk_concurrency, self.bulk_concurrency))
+
+        async def _one(a: str, b: str):
+            async with semaphore:
+                await fn(a, b)
+
+        results = await asyncio.gather(*[_one(a, b) for a, b in pairs], return_exceptions=True)
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            raise errors[0]
+
+    async def upload_many(self, files: list[tuple[str, str]], concurrency: Optional[int] = None) -> None:
+        await self._bulk(self.upload_file, files, concurrency)
+
+    async def download_many(self, objects: list[tuple[str, str]], concurrency: Optional[int] = None) -> None:
+        await self._bulk(self.download_file, objects, concurrency)
+
+    def get_transfer_stats(self) -> dict[str, dict]:
+        return {op: s.snapshot() for op, s in self.stats.items()}
+
+    async def read_range(self, object_key: str, start: int, end: int) -> bytes:
+        if end <= start:
+            return b""
+        try:
+            client = await self._get_client()
+            response = await client.get_object(
+                Bucket=self.bucket, Key=object_key, Range=f"bytes={start}-{end - 1}"
+            )
+            async with response['Body'] as stream:
+                return await stream.read()
+        except ClientError as e:
+            logger.error(f"Failed to read bytes {start}-{end} of {object_key}: {e}")
+            raise
+
+    async def list_files(self, prefix: str) -> list[str]:
+        try:
+            client = await self._get_client()
+            response = await client.list_objects_v2(Bucket=self.bucket, Prefix=prefix)
+            if 'Contents' not in response:
+                return []
+            return [obj['Key'] for obj in response['Contents'] if not obj['Key'].endswith('/')]
+        except ClientError as e:
+            logger.error(f"Failed to list objects in {prefix}: {e}")
+            raise
+
+    async def read_text(self, object_key: str, encoding: str = 'utf-8') -> Optional[str]:
+        try:
+            client = await self._get_client()
+            response = await client.get_object(Bucket=self.bucket, Key=object_key)
+            async with response['Body'] as stream:
+                return (await stream.read()).decode(encoding)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') == 'NoSuchKey':
+                logger.warning(f"Object not found: s3://{self.bucket}/{object_key}")
+                return None
+            logger.error(f"Failed to read text from {object_key}: {e}")
+            raise
+
+    async def read_json(self, object_key: str) -> dict | None:
+        try:
+            client = await self._get_client()
+            response = await client.get_object(Bucket=self.bucket, Key=object_key)
+            async with response['Body'] as stream:
+                return json.loads(await stream.read())
+        except ClientError as e:
+            logger.warning(f"Could not read JSON at {object_key}: {e}")
+            raise e
+
+    async def delete_folder(self, prefix: str):
+        try:
+            client = await self._get_client()
+            paginator = client.get_paginator('list_objects_v2')
+            delete_us = []
+            async for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+                for obj in page.get('Contents', []):
+                    delete_us.append({'Key': obj['Key']})
+                    if len(delete_us) >= 1000:
+                        await client.delete_objects(Bucket=self.bucket, Delete={'Objects': delete_us})
+                        delete_us = []
+            if delete_us:
+                await client.delete_objects(Bucket=self.bucket, Delete={'Objects': delete_us})
+            logger.info(f"Deleted S3 folder: {prefix}")
+        except ClientError as e:
+            logger.error(f"Failed to delete folder {prefix}: {e}")
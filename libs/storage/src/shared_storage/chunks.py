@@ -0,0 +1,48 @@
+from collections import OrderedDict
+
+from shared_storage.pcm_store import LocalPCMStore, HEADER_PROBE_BYTES
+from shared_storage.s3 import S3Client
+from shared_storage.wav import WavLayout, parse_wav_header
+
+_LAYOUT_CACHE_SIZE = 64
+_layout_cache: OrderedDict[str, WavLayout] = OrderedDict()
+
+
+async def _get_layout(s3: S3Client, s3_path: str) -> WavLayout:
+    layout = _layout_cache.get(s3_path)
+    if layout is None:
+        header = await s3.read_range(s3_path, 0, HEADER_PROBE_BYTES)
+        layout = parse_wav_header(header)
+        _layout_cache[s3_path] = layout
+        if len(_layout_cache) > _LAYOUT_CACHE_SIZE:
+            _layout_cache.popitem(last=False)
+    else:
+        _layout_cache.move_to_end(s3_path)
+    return layout
+
+
+async def read_chunk(
+        s3: S3Client,
+        s3_path: str,
+        *,
+        job_id: str,
+        start_ms: int,
+        end_ms: int,
+        store: LocalPCMStore | None = None
+) -> tuple[memoryview | bytes, WavLayout]:
+    """PCM of a ranged chunk, held in memory rather than written to a local WAV.
+
+    `s3_path` is the job's full clean WAV, of which only [start_ms, end_ms) belongs
+    to the chunk. With a node-local store the result is a view into the job's
+    mapping (release() it once converted); otherwise the range is fetched with an
+    S3 ranged GET, since the WAV is fixed-rate PCM and time maps directly to bytes.
+    Standalone chunk objects (SEGMENT_MODE=files) are still downloaded as files.
+    """
+    if store is not None:
+        await store.ensure_job(job_id, s3, s3_path)
+        return store.read_range(job_id, start_ms, end_ms)
+    layout = await _get_layout(s3, s3_path)
+    start, end = layout.byte_range(start_ms, end_ms)
+    pcm = await s3.read_range(s3_path, start, end)
+    # Ranged GETs clamp at EOF; drop a trailing partial frame if the object was short.
+    return pcm[:len(pcm) - len(pcm) % layout.frame_size], layout
@@ -0,0 +1,21 @@
+from typing import Optional
+
+from shared_storage.s3 import S3Client
+
+
+def create_s3_client(
+        backend: str,
+        *,
+        bucket: str,
+        endpoint: Optional[str],
+        access_key: str,
+        secret_key: str,
+        **options
+):
+    """Build the S3 backend selected by config: "boto3" (threaded) or "aio" (aiobotocore)."""
+    if backend == "aio":
+        from shared_storage.async_s3 import AsyncS3Client
+        return AsyncS3Client(bucket, endpoint, access_key, secret_key, **options)
+    if backend != "boto3":
+        raise ValueError(f"Unknown S3 backend '{backend}'")
+    return S3Client(bucket, endpoint, access_key, secret_key, **options)
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import mmap
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+from shared_storage.s3 import S3Client
+from shared_storage.wav import WavLayout, parse_wav_header
+
+logger = logging.getLogger(__name__)
+
+HEADER_PROBE_BYTES = 4096
+
+
+class LocalPCMStore:
+    """Node-local store of preprocessed job WAVs, read by offset through mmap.
+
+    Workers on the same host share the directory, so each job's clean audio
+    crosses the network at most once per node instead of once per chunk. Jobs are
+    evicted when they end (see shared_messaging.job_events.JobEndListener), and
+    anything left unread for `ttl_seconds` is swept as a fallback.
+    """
+
+    def __init__(self, root_dir: str, ttl_seconds: int = 6 * 3600):
+        self.root = Path(root_dir).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._maps: dict[str, tuple[mmap.mmap, WavLayout]] = {}
+
+    def _job_path(self, job_id: str) -> Path:
+        return self.root / job_id / "audio.wav"
+
+    @staticmethod
+    def _tmp_path(target: Path, suffix: str) -> Path:
+        # Other processes on the node may be writing the same job at the same time.
+        return target.with_name(f"{target.name}.{os.getpid()}.{uuid.uuid4().hex}{suffix}")
+
+    def _touch(self, job_id: str):
+        """Mark the job as used now; the sweep TTL counts from the last use."""
+        try:
+            os.utime(self.root / job_id)
+        except FileNotFoundError:
+            pass
+
+    def has_job(self, job_id: str) -> bool:
+        return self._job_path(job_id).exists()
+
+    def put_job(self, job_id: str, wav_path: str):
+        target = self._job_path(job_id)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._tmp_path(target, ".part")
+        try:
+            try:
+                os.link(wav_path, tmp)
+            except OSError:
+                shutil.copyfile(wav_path, tmp)
+            os.replace(tmp, target)
+        finally:
+            tmp.unlink(missing_ok=True)
+        self._touch(job_id)
+        logger.info(f"PCM store: registered {job_id} ({target.stat().st_size / 1e6:.1f} MB)")
+        self.sweep()
+
+    async def ensure_job(self, job_id: str, s3: S3Client, s3_key: str):
+        if self.has_job(job_id):
+            self._touch(job_id)
+            return
+        lock = self._locks.setdefault(job_id, asyncio.Lock())
+        async with lock:
+            if self.has_job(job_id):
+                self._touch(job_id)
+                return
+            target = self._job_path(job_id)
+            tmp = self._tmp_path(target, ".download")
+            try:
+                await s3.download_file(s3_key, str(tmp))
+                os.replace(tmp, target)
+            finally:
+                tmp.unlink(missing_ok=True)
+            self._touch(job_id)
+            logger.info(f"PCM store: fetched {s3_key} for {job_id}")
+        self.sweep()
+
+    def _open(self, job_id: str) -> tuple[mmap.mmap, WavLayout]:
+        if job_id not in self._maps:
+            with open(self._job_path(job_id), "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            layout = parse_wav_header(mm[:HEADER_PROBE_BYTES])
+            if layout.data_size is None:
+                layout = WavLayout(
+                    layout.sample_rate, layout.channels, layout.sample_width,
+                    layout.data_offset, len(mm) - layout.data_offset
+                )
+            self._maps[job_id] = (mm, layout)
+        return self._maps[job_id]
+
+    def read_range(self, job_id: str, start_ms: int, end_ms: int) -> tuple[memoryview, WavLayout]:
+        """PCM of [start_ms, end_ms) as a view into the job's mapping; no bytes are copied.
+
+        release() the view once done with it, or evicting the job cannot unmap the file.
+        """
+        mm, layout = self._open(job_id)
+        start, end = layout.byte_range(start_ms, end_ms)
+        return memoryview(mm)[start:end], layout
+
+    def read_job(self, job_id: str) -> tuple[memoryview, WavLayout]:
+        """All of the job's PCM as a view into its mapping; see read_range."""
+        mm, layout = self._open(job_id)
+        return memoryview(mm)[layout.data_offset:layout.data_offset + layout.data_size], layout
+
+    def _close_map(self, job_id: str):
+        entry = self._maps.pop(job_id, None)
+        if entry:
+            try:
+                entry[0].close()
+            except BufferError:
+                # A read is still copying out of it; the mapping goes when its last view does.
+                logger.warning(f"PCM store: mapping for {job_id} still referenced")
+
+    def evict_job(self, job_id: str):
+        """Drop a job's mapping and its files. Called on every node when the job ends."""
+        self._close_map(job_id)
+        self._locks.pop(job_id, None)
+        if (self.root / job_id).exists():
+            shutil.rmtree(self.root / job_id, ignore_errors=True)
+            logger.info(f"PCM store: evicted {job_id}")
+
+    def close(self):
+        """Release this process's mappings, leaving the files to the other workers."""
+        for job_id in list(self._maps):
+            self._close_map(job_id)
+
+    def sweep(self):
+        cutoff = time.time() - self.ttl_seconds
+        for job_dir in self.root.iterdir():
+            try:
+                if job_dir.is_dir() and job_dir.stat().st_mtime < cutoff:
+                    logger.info(f"PCM store: expiring {job_dir.name}")
+                    self.evict_job(job_dir.name)
+            except FileNotFoundError:
+                continue
@@ -1,20 +1,142 @@
 import boto3
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import S3Transfer, TransferConfig
 from botocore.config import Config
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import functools
 from pathlib import Path
+import io
+import json
 import logging
-from typing import Any, Optional
+import os
+import time
+from typing import Any, Awaitable, Callable, Optional
 import asyncio
 
 logger = logging.getLogger(__name__)
 
+MB = 1024 * 1024
+
+StreamReader = Callable[[int], Awaitable[bytes]]
+HeadFinalizer = Callable[[bytes, int], Awaitable[bytes]]
+
+
+@dataclass
+class TransferStats:
+    count: int = 0
+    errors: int = 0
+    bytes: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def record(self, nbytes: int, seconds: float):
+        self.count += 1
+        self.bytes += nbytes
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "avg_latency_ms": (self.total_seconds / self.count) * 1000 if self.count else 0.0,
+            "max_latency_ms": self.max_seconds * 1000,
+            "throughput_mb_per_s": (self.bytes / MB) / self.total_seconds if self.total_seconds else 0.0,
+        }
+
+
+async def read_block(read: StreamReader, size: int) -> bytes:
+    """Read `size` bytes, fewer only at end of stream."""
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = await read(size - len(buffer))
+        if not chunk:
+            break
+        buffer += chunk
+    return bytes(buffer)
+
+
+async def stream_parts(
+        read: StreamReader,
+        head: bytes,
+        part_size: int,
+        concurrency: int,
+        upload_part: Callable[[int, bytes], Awaitable[dict]],
+        finalize: HeadFinalizer | None = None
+) -> tuple[list[dict], int]:
+    """Upload the rest of a stream as parts 2..n while it is produced, then part 1.
+
+    At most `concurrency` parts are in flight, which bounds the memory held. `head`
+    (part 1) is uploaded last, after `finalize(head, total_size)` has had a chance to
+    rewrite it or to raise. Returns the completed parts and the total size.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks: list[asyncio.Task] = []
+    total = len(head)
+
+    async def _part(number: int, body: bytes) -> dict:
+        try:
+            return await upload_part(number, body)
+        finally:
+            semaphore.release()
+
+    try:
+        while body := await read_block(read, part_size):
+            total += len(body)
+            await semaphore.acquire()
+            failed = next((t for t in tasks if t.done() and t.exception()), None)
+            if failed:
+                semaphore.release()
+                raise failed.exception()
+            tasks.append(asyncio.create_task(_part(len(tasks) + 2, body)))
+        parts = list(await asyncio.gather(*tasks))
+        if finalize:
+            head = await finalize(head, total)
+        return [await upload_part(1, head)] + parts, total
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
 class S3Client:
-    def __init__(self, bucket: str, endpoint: str, access_key: str, secret_key: str):
+    def __init__(
+            self,
+            bucket: str,
+            endpoint: str,
+            access_key: str,
+            secret_key: str,
+            *,
+            region: Optional[str] = None,
+            bulk_concurrency: int = 16,
+            transfer_threads: int = 8,
+            multipart_threshold_mb: int = 16,
+            multipart_chunksize_mb: int = 8,
+            max_pool_connections: Optional[int] = None
+    ):
         self.bucket = bucket
+        self.bulk_concurrency = max(1, bulk_concurrency)
+        # Every bulk slot may run a multipart transfer with its own worker threads.
+        pool_size = max_pool_connections or max(10, self.bulk_concurrency + transfer_threads)
         self.client = boto3.client('s3', endpoint_url=endpoint,
+                                   region_name=region,
                                    aws_access_key_id=access_key,
                                    aws_secret_access_key=secret_key,
-                                   config=Config(signature_version='s3v4'))
+                                   config=Config(signature_version='s3v4',
+                                                 max_pool_connections=pool_size))
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold_mb * MB,
+            multipart_chunksize=multipart_chunksize_mb * MB,
+            max_concurrency=transfer_threads,
+            use_threads=True
+        )
+        self.transfer = S3Transfer(client=self.client, config=self.transfer_config)
+        self._executor = ThreadPoolExecutor(max_workers=self.bulk_concurrency, thread_name_prefix="s3-transfer")
+        self.stats = {"upload": TransferStats(), "download": TransferStats()}
 
     def generate_presigned_url(self, object_key: str, content_type: str) -> str:
         return self.client.generate_presigned_url(
@@ -23,16 +145,33 @@ class S3Client:
             ExpiresIn=900
         )
 
+    def generate_presigned_get_url(self, object_key: str, expires_in: int = 3600) -> str:
+        return self.client.generate_presigned_url(
+            ClientMethod='get_object',
+            Params={'Bucket': self.bucket, 'Key': object_key},
+            ExpiresIn=expires_in
+        )
+
+    async def _run_transfer(self, op: str, fn, *args, size_path: str | None = None):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            await loop.run_in_executor(self._executor, fn, *args)
+        except Exception:
+            self.stats[op].errors += 1
+            raise
+        nbytes = os.path.getsize(size_path) if size_path and os.path.exists(size_path) else 0
+        self.stats[op].record(nbytes, time.perf_counter() - started)
+
     async def upload_file(self, local_path: str, object_key: str) -> None:
         try:
-            await asyncio.to_thread(
-                self.client.upload_file,
-                Filename=local_path,
-                Bucket=self.bucket,
-                Key=object_key
+            await self._run_transfer(
+                "upload",
+                self.transfer.upload_file, local_path, self.bucket, object_key,
+                size_path=local_path
             )
             logger.info(f"Uploaded {local_path} -> s3://{self.bucket}/{object_key}")
-        except ClientError as e:
+        except (ClientError, S3UploadFailedError) as e:
             logger.error(f"Failed to upload {local_path} to {object_key}: {e}")
             raise
 
@@ -41,20 +180,66 @@ class S3Client:
             path_obj = Path(local_path).resolve()
             path_obj.parent.mkdir(parents=True, exist_ok=True)
             local_path_str = str(path_obj)
-            await asyncio.to_thread(
-                self.client.download_file,
-                Bucket=self.bucket,
-                Key=object_key,
-                Filename=local_path_str
+            await self._run_transfer(
+                "download",
+                self.transfer.download_file, self.bucket, object_key, local_path_str,
+                size_path=local_path_str
             )
             logger.info(f"Downloaded s3://{self.bucket}/{object_key} -> {local_path}")
         except ClientError as e:
             logger.error(f"Failed to download {object_key} to {local_path}: {e}")
             raise
 
-    def list_files(self, prefix: str) -> list[str]:
+    async def _bulk(self, fn, pairs: list[tuple[str, str]], concurrency: Optional[int]) -> None:
+        semaphore = asyncio.Semaphore(min(concurrency or self.bulk_concurrency, self.bulk_concurrency))
+
+        async def _one(a: str, b: str):
+            async with semaphore:
+                await fn(a, b)
+
+        results = await asyncio.gather(*[_one(a, b) for a, b in pairs], return_exceptions=True)
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            raise errors[0]
+
+    async def upload_many(self, files: list[tuple[str, str]], concurrency: Optional[int] = None) -> None:
+        """Upload (local_path, object_key) pairs with bounded parallelism."""
+        started = time.perf_counter()
+        await self._bulk(self.upload_file, files, concurrency)
+        logger.info(f"Uploaded {len(files)} objects in {time.perf_counter() - started:.2f}s")
+
+    async def download_many(self, objects: list[tuple[str, str]], concurrency: Optional[int] = None) -> None:
+        """Download (object_key, local_path) pairs with bounded parallelism."""
+        started = time.perf_counter()
+        await self._bulk(self.download_file, objects, concurrency)
+        logger.info(f"Downloaded {len(objects)} objects in {time.perf_counter() - started:.2f}s")
+
+    def get_transfer_stats(self) -> dict[str, dict]:
+        return {op: s.snapshot() for op, s in self.stats.items()}
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+
+    async def read_range(self, object_key: str, start: int, end: int) -> bytes:
+        """Fetch bytes [start, end) of an object with a single ranged GET."""
+        if end <= start:
+            return b""
+        def _read():
+            response = self.client.get_object(
+                Bucket=self.bucket,
+                Key=object_key,
+                Range=f"bytes={start}-{end - 1}"
+            )
+            return response['Body'].read()
+        try:
+            return await asyncio.to_thread(_read)
+        except ClientError as e:
+            logger.error(f"Failed to read bytes {start}-{end} of {object_key}: {e}")
+            raise
+
+    async def list_files(self, prefix: str) -> list[str]:
         try:
-            response = self.client.list_objects_v2(Bucket=self.bucket, Prefix=prefix)
+            response = await asyncio.to_thread(self.client.list_objects_v2, Bucket=self.bucket, Prefix=prefix)
             if 'Contents' not in response:
                 return []
             return [obj['Key'] for obj in response['Contents'] if not obj['Key'].endswith('/')]
@@ -62,13 +247,104 @@ class S3Client:
             logger.error(f"Failed to list objects in {prefix}: {e}")
             raise
 
+    async def put_bytes(self, data: bytes, object_key: str, content_type: str = "application/octet-stream") -> None:
+        started = time.perf_counter()
+        def _put():
+            if len(data) >= self.transfer_config.multipart_threshold:
+                self.client.upload_fileobj(
+                    io.BytesIO(data), self.bucket, object_key,
+                    ExtraArgs={'ContentType': content_type},
+                    Config=self.transfer_config
+                )
+            else:
+                self.client.put_object(Bucket=self.bucket, Key=object_key, Body=data, ContentType=content_type)
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, _put)
+            self.stats["upload"].record(len(data), time.perf_counter() - started)
+            logger.info(f"Uploaded {len(data)} bytes -> s3://{self.bucket}/{object_key}")
+        except (ClientError, S3UploadFailedError) as e:
+            self.stats["upload"].errors += 1
+            logger.error(f"Failed to upload bytes to {object_key}: {e}")
+            raise
+
+    async def upload_stream(
+            self,
+            read: StreamReader,
+            object_key: str,
+            content_type: str = "application/octet-stream",
+            finalize: HeadFinalizer | None = None
+    ) -> int:
+        """Upload a stream of unknown length (e.g. a process's stdout) as it is produced.
+
+        See stream_parts for how `finalize` is applied; returns the size uploaded.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        part_size = self.transfer_config.multipart_chunksize
+
+        def _call(fn, **kwargs):
+            return loop.run_in_executor(self._executor, functools.partial(fn, **kwargs))
+
+        try:
+            head = await read_block(read, part_size)
+            if len(head) < part_size:
+                if finalize:
+                    head = await finalize(head, len(head))
+                await _call(self.client.put_object, Bucket=self.bucket, Key=object_key,
+                            Body=head, ContentType=content_type)
+                total = len(head)
+            else:
+                upload = await _call(self.client.create_multipart_upload, Bucket=self.bucket,
+                                     Key=object_key, ContentType=content_type)
+                upload_id = upload['UploadId']
+
+                async def _part(number: int, body: bytes) -> dict:
+                    resp = await _call(self.client.upload_part, Bucket=self.bucket, Key=object_key,
+                                       UploadId=upload_id, PartNumber=number, Body=body)
+                    return {'PartNumber': number, 'ETag': resp['ETag']}
+
+                try:
+                    parts, total = await stream_parts(
+                        read, head, part_size, self.transfer_config.max_concurrency, _part, finalize
+                    )
+                    await _call(self.client.complete_multipart_upload, Bucket=self.bucket, Key=object_key,
+                                UploadId=upload_id, MultipartUpload={'Parts': parts})
+                except BaseException:
+                    await _call(self.client.abort_multipart_upload, Bucket=self.bucket,
+                                Key=object_key, UploadId=upload_id)
+                    raise
+        except Exception as e:
+            self.stats["upload"].errors += 1
+            logger.error(f"Failed to stream upload to {object_key}: {e}")
+            raise
+        self.stats["upload"].record(total, time.perf_counter() - started)
+        logger.info(f"Streamed {total} bytes -> s3://{self.bucket}/{object_key}")
+        return total
+
+    async def put_text(self, text: str, object_key: str, encoding: str = 'utf-8') -> None:
+        await self.put_bytes(text.encode(encoding), object_key, f"text/plain; charset={encoding}")
+
+    async def put_json(self, obj: Any, object_key: str, indent: Optional[int] = None) -> None:
+        data = json.dumps(obj, ensure_ascii=False, indent=indent).encode('utf-8')
+        await self.put_bytes(data, object_key, "application/json")
+
+    async def get_bytes(self, object_key: str) -> bytes:
+        def _read():
+            response = self.client.get_object(Bucket=self.bucket, Key=object_key)
+            return response['Body'].read()
+        try:
+            return await asyncio.to_thread(_read)
+        except ClientError as e:
+            logger.error(f"Failed to read {object_key}: {e}")
+            raise
+
     async def read_text(self, object_key: str, encoding: str = 'utf-8') -> Optional[str]:
         def _read():
             response = self.client.get_object(Bucket=self.bucket, Key=object_key)
             body = response['Body'].read()
             return body.decode(encoding)
         try:
-            return await asyncio.to_thread(_read())
+            return await asyncio.to_thread(_read)
         except ClientError as e:
             if e.response.get('Error', {}).get('Code') == 'NoSuchKey':
                 logger.warning(f"Object not found: s3://{self.bucket}/{object_key}")
@@ -78,10 +354,11 @@ class S3Client:
 
     async def read_json(self, object_key: str) -> dict | None:
         def _read():
-            import json
             response = self.client.get_object(Bucket=self.bucket, Key=object_key)
-            content = response['Body'].read().decode('utf-8')
-            return json.loads(content)
+            # Buffered on purpose: json has no incremental decoder (json.load is loads(fp.read())),
+            # and the parsed objects, not the one body-sized bytes copy, dominate the peak.
+            # json.loads takes the UTF-8 bytes directly, skipping an intermediate str copy.
+            return json.loads(response['Body'].read())
         try:
             return await asyncio.to_thread(_read)
         except ClientError as e:
@@ -0,0 +1,69 @@
+import struct
+from dataclasses import dataclass
+
+# ffmpeg writes placeholder sizes when the output is not seekable (e.g. a pipe).
+_UNKNOWN_SIZES = (0, 0xFFFFFFFF)
+
+
+@dataclass(frozen=True)
+class WavLayout:
+    sample_rate: int
+    channels: int
+    sample_width: int
+    data_offset: int
+    data_size: int | None
+
+    @property
+    def frame_size(self) -> int:
+        return self.channels * self.sample_width
+
+    def byte_range(self, start_ms: int, end_ms: int) -> tuple[int, int]:
+        """Absolute [start, end) byte offsets of a time range, aligned to whole frames."""
+        start_frame = (start_ms * self.sample_rate) // 1000
+        end_frame = (end_ms * self.sample_rate) // 1000
+        start = self.data_offset + start_frame * self.frame_size
+        end = self.data_offset + end_frame * self.frame_size
+        if self.data_size is not None:
+            data_end = self.data_offset + self.data_size
+            start = min(start, data_end)
+            end = min(end, data_end)
+        return start, max(start, end)
+
+
+def parse_wav_header(header: bytes) -> WavLayout:
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE file")
+    pos = 12
+    fmt = None
+    while pos + 8 <= len(header):
+        chunk_id = header[pos:pos + 4]
+        chunk_size = struct.unpack("<I", header[pos + 4:pos + 8])[0]
+        body = pos + 8
+        if chunk_id == b"fmt ":
+            audio_format, channels, sample_rate = struct.unpack("<HHI", header[body:body + 8])
+            bits = struct.unpack("<H", header[body + 14:body + 16])[0]
+            # 0xFFFE is WAVE_FORMAT_EXTENSIBLE, which ffmpeg uses for some PCM layouts
+            if audio_format not in (1, 0xFFFE):
+                raise ValueError(f"Unsupported WAV format {audio_format}, expected PCM")
+            fmt = (sample_rate, channels, bits // 8)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk precedes fmt chunk")
+            data_size = None if chunk_size in _UNKNOWN_SIZES else chunk_size
+            return WavLayout(fmt[0], fmt[1], fmt[2], body, data_size)
+        pos = body + chunk_size + (chunk_size & 1)
+    raise ValueError("WAV data chunk not found in header")
+
+
+def patch_wav_sizes(head: bytes, total_size: int) -> bytes:
+    """Fill in the RIFF and data sizes of a streamed WAV once its total length is known.
+
+    `head` must start at byte 0 of the file and contain the whole header.
+    """
+    layout = parse_wav_header(head)
+    patched = bytearray(head)
+    patched[4:8] = struct.pack("<I", min(total_size - 8, 0xFFFFFFFF))
+    patched[layout.data_offset - 4:layout.data_offset] = struct.pack(
+        "<I", min(total_size - layout.data_offset, 0xFFFFFFFF)
+    )
+    return bytes(patched)
@@ -0,0 +1,76 @@
+import asyncio
+import struct
+
+import pytest
+
+from shared_storage.chunks import read_chunk
+from shared_storage.pcm_store import LocalPCMStore
+from shared_storage.wav import parse_wav_header
+
+SAMPLE_RATE = 16000
+
+
+def _write_wav(path, pcm: bytes):
+    header = (
+        b"RIFF" + struct.pack("<I", 36 + len(pcm)) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, SAMPLE_RATE, SAMPLE_RATE * 2, 2, 16)
+        + b"data" + struct.pack("<I", len(pcm))
+    )
+    path.write_bytes(header + pcm)
+
+
+@pytest.fixture
+def job_wav(tmp_path):
+    pcm = bytes(i % 256 for i in range(SAMPLE_RATE * 2 * 3))  # 3 s
+    path = tmp_path / "clean.wav"
+    _write_wav(path, pcm)
+    return path, pcm
+
+
+def test_store_reads_ranges_without_copying(job_wav, tmp_path):
+    path, pcm = job_wav
+    store = LocalPCMStore(str(tmp_path / "store"))
+    store.put_job("job", str(path))
+
+    view, layout = store.read_range("job", 1000, 1500)
+    assert isinstance(view, memoryview) and view.readonly
+    assert bytes(view) == pcm[SAMPLE_RATE * 2:SAMPLE_RATE * 3]
+    view.release()
+
+    whole, _ = store.read_job("job")
+    assert len(whole) == len(pcm)
+    whole.release()
+
+    # With every view released the mapping closes and the job's files go.
+    store.evict_job("job")
+    assert not store.has_job("job")
+
+
+def test_read_chunk_from_store(job_wav, tmp_path):
+    path, pcm = job_wav
+    store = LocalPCMStore(str(tmp_path / "store"))
+    store.put_job("job", str(path))
+
+    # The S3 client is never touched when the job is already in the store.
+    view, layout = asyncio.run(read_chunk(
+        None, "clean/job/audio.wav", job_id="job", start_ms=2500, end_ms=9000, store=store
+    ))
+    assert (layout.sample_rate, layout.channels) == (SAMPLE_RATE, 1)
+    assert bytes(view) == pcm[int(2.5 * SAMPLE_RATE) * 2:]  # clamped at the end of the data
+    view.release()
+    store.close()
+
+
+def test_read_chunk_ranged_get(job_wav):
+    path, pcm = job_wav
+    data = path.read_bytes()
+
+    class _RangeOnlyS3:
+        async def read_range(self, key, start, end):
+            return data[start:end]
+
+    view, layout = asyncio.run(read_chunk(
+        _RangeOnlyS3(), "clean/job/ranged.wav", job_id="job", start_ms=0, end_ms=250
+    ))
+    assert layout == parse_wav_header(data[:64])
+    assert view == pcm[:SAMPLE_RATE // 4 * 2]
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+moto_server = pytest.importorskip("moto.server")
+boto3 = pytest.importorskip("boto3")
+
+from shared_storage.factory import create_s3_client
+
+BUCKET = "voice-diary-test"
+REGION = "us-east-1"
+OPTIONS = dict(region=REGION, multipart_threshold_mb=5, multipart_chunksize_mb=5)
+
+
+@pytest.fixture(scope="module")
+def endpoint():
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    url = f"http://{host}:{port}"
+    boto3.client(
+        "s3", endpoint_url=url, region_name=REGION, aws_access_key_id="test", aws_secret_access_key="test"
+    ).create_bucket(Bucket=BUCKET)
+    yield url
+    server.stop()
+
+
+@pytest.fixture(params=["boto3", "aio"])
+def backend(request, endpoint):
+    if request.param == "aio":
+        pytest.importorskip("aiobotocore")
+    return request.param
+
+
+def _client(backend: str, endpoint: str):
+    # Both backends take the same options, so one config works whichever is selected.
+    return create_s3_client(
+        backend, bucket=BUCKET, endpoint=endpoint, access_key="test", secret_key="test", **OPTIONS
+    )
+
+
+def test_put_get_roundtrip(backend, endpoint):
+    async def run():
+        s3 = _client(backend, endpoint)
+        try:
+            prefix = f"{backend}/roundtrip/"
+            words = [{"word": "xin chào", "start": 0.0, "end": 0.4}]
+            await s3.put_json(words, prefix + "words.json")
+            await s3.put_text("dòng một\n", prefix + "transcript.txt")
+            payload = bytes(range(256)) * (6 * 1024 * 1024 // 256)  # above the multipart threshold
+            await s3.put_bytes(payload, prefix + "big.bin")
+
+            assert await s3.read_json(prefix + "words.json") == words
+            assert await s3.read_text(prefix + "transcript.txt") == "dòng một\n"
+            assert await s3.read_text(prefix + "missing.txt") is None
+            assert await s3.get_bytes(prefix + "big.bin") == payload
+            assert await s3.read_range(prefix + "big.bin", 10, 20) == payload[10:20]
+            assert sorted(await s3.list_files(prefix)) == [
+                prefix + "big.bin", prefix + "transcript.txt", prefix + "words.json"
+            ]
+        finally:
+            await s3.close()
+
+    asyncio.run(run())
+
+
+def test_upload_and_download_many(backend, endpoint, tmp_path):
+    sources = []
+    for i in range(5):
+        path = tmp_path / f"segment_{i}.wav"
+        path.write_bytes(bytes([i]) * (1024 + i))
+        sources.append(path)
+    big = tmp_path / "big.wav"
+    big.write_bytes(b"\x01\x02" * (3 * 1024 * 1024))  # multipart from disk
+    sources.append(big)
+
+    async def run():
+        s3 = _client(backend, endpoint)
+        try:
+            prefix = f"{backend}/bulk/"
+            await s3.upload_many([(str(p), prefix + p.name) for p in sources], concurrency=3)
+            assert sorted(await s3.list_files(prefix)) == sorted(prefix + p.name for p in sources)
+
+            out = tmp_path / "out"
+            await s3.download_many([(prefix + p.name, str(out / p.name)) for p in sources])
+            for p in sources:
+                assert (out / p.name).read_bytes() == p.read_bytes()
+
+            await s3.delete_folder(prefix)
+            assert await s3.list_files(prefix) == []
+        finally:
+            await s3.close()
+
+    asyncio.run(run())